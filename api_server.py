@@ -0,0 +1,240 @@
+# api_server.py
+"""Headless JSON query API for FloatChat.
+
+Runs a small tornado application (tornado ships with Streamlit) next to the
+Streamlit UI, or standalone with ``python api_server.py``. Queries go through
+the same ``run_query`` pipeline and dataset cache as the chat page, without a
+Streamlit script rerun per call.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.web
+from plotly.utils import PlotlyJSONEncoder
+
+from query_handler import (parse_user_input, parse_location_query, parse_time_range, parse_depth,
+                           parse_grid_options, parse_anomaly, parse_rolling, parse_hotspots, parse_quantiles,
+                           coerce_depth, coerce_hotspots, coerce_quantiles, coerce_time_range, run_query, run_float_query, validate_query,
+                           dataset_time_anchor,
+                           warm_caches, AVAILABLE_REGIONS, CHART_TYPES)
+
+DEFAULT_API_PORT = 8601
+
+
+def handle_query(loader, payload):
+    """Answer one query payload and return a JSON-serialisable dict.
+
+    The payload is either ``{"query": "<natural language>"}`` or a structured
+    ``{"parameter": ..., "region": ..., "chart_type": ..., "time_range": [start, end],
+    "depth": metres or [top, bottom], "resolution": degrees, "smooth": bool,
+    "anomaly": bool, "rolling": steps, "above"/"below": value, "top"/"bottom": k,
+    "quantiles": [percentiles]}`` request. Float searches ("nearest floats to
+    15N 88E") return matching ``floats`` instead of stats. Malformed
+    payloads and fields give an ``error`` (served as a 400).
+    """
+    if not isinstance(payload, dict):
+        return {"error": "Invalid request: the body must be a JSON object"}
+    if payload.get("query") is not None and not isinstance(payload["query"], str):
+        return {"error": "Invalid request: query must be a string"}
+    if payload.get("query"):
+        intent, parameter, region, chart_type = parse_user_input(payload["query"])
+        if intent == "find_floats":
+            response, fig, floats = run_float_query(loader(), parse_location_query(payload["query"]))
+            return {
+                "intent": intent,
+                "chart_type": chart_type,
+                "response": response,
+                "floats": floats.to_dict(orient="records") if floats is not None else None,
+                "figure": fig.to_plotly_json() if fig is not None else None,
+            }
+        time_range = None
+        depth = parse_depth(payload["query"])
+        options = dict(parse_grid_options(payload["query"]), anomaly=parse_anomaly(payload["query"]),
+                       rolling=parse_rolling(payload["query"]), hotspots=parse_hotspots(payload["query"]),
+                       quantiles=parse_quantiles(payload["query"]))
+    else:
+        parameter = payload.get("parameter")
+        region = payload.get("region")
+        chart_type = payload.get("chart_type") or "map"
+        intent = "show_data" if parameter and region else "unclear"
+        try:
+            time_range = coerce_time_range(payload.get("time_range"))
+            depth = coerce_depth(payload.get("depth"))
+            resolution = payload.get("resolution")
+            options = {"resolution": float(resolution) if resolution else None,
+                       "smooth": str(payload.get("smooth", "")).lower() in ("1", "true", "yes"),
+                       "anomaly": str(payload.get("anomaly", "")).lower() in ("1", "true", "yes"),
+                       "rolling": int(payload["rolling"]) if payload.get("rolling") else None,
+                       "hotspots": coerce_hotspots(payload),
+                       "quantiles": coerce_quantiles(payload.get("quantiles"))}
+        except (ValueError, TypeError) as e:
+            return {"intent": intent, "parameter": parameter, "region": region, "chart_type": chart_type,
+                    "error": f"Invalid request: {e}"}
+
+    result = {
+        "intent": intent,
+        "parameter": parameter,
+        "region": region,
+        "chart_type": chart_type,
+    }
+    error = validate_query(parameter, region, chart_type) if intent == "show_data" else \
+        "Query needs both a parameter and a region"
+    if error:
+        result["error"] = error
+        return result
+
+    ds = loader()
+    if payload.get("query"):
+        time_range = parse_time_range(payload["query"], anchor=dataset_time_anchor(ds))
+    result["time_range"] = [t.isoformat() for t in time_range] if time_range else None
+    result["depth"] = list(depth) if isinstance(depth, tuple) else depth
+    result.update(options)
+    response, fig, stats = run_query(ds, parameter, region, chart_type, time_range, depth, **options)
+    result["response"] = response
+    result["stats"] = stats
+    result["figure"] = fig.to_plotly_json() if fig is not None else None
+    if stats is None:
+        result["error"] = response
+    return result
+
+
+class QueryHandler(tornado.web.RequestHandler):
+    """GET /api/query?q=... or POST /api/query with a JSON body"""
+
+    def initialize(self, loader, executor):
+        self.loader = loader
+        self.executor = executor
+
+    async def get(self):
+        payload = {
+            "query": self.get_argument("q", None),
+            "parameter": self.get_argument("parameter", None),
+            "region": self.get_argument("region", None),
+            "chart_type": self.get_argument("chart_type", None),
+            "depth": self.get_argument("depth", None),
+            "resolution": self.get_argument("resolution", None),
+            "smooth": self.get_argument("smooth", ""),
+            "anomaly": self.get_argument("anomaly", ""),
+            "rolling": self.get_argument("rolling", None),
+            "above": self.get_argument("above", None),
+            "below": self.get_argument("below", None),
+            "top": self.get_argument("top", None),
+            "bottom": self.get_argument("bottom", None),
+            "quantiles": self.get_argument("quantiles", None),
+        }
+        if self.get_argument("start", None) and self.get_argument("end", None):
+            payload["time_range"] = [self.get_argument("start"), self.get_argument("end")]
+        await self._answer(payload)
+
+    async def post(self):
+        try:
+            payload = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError as e:
+            self.set_status(400)
+            self.finish({"error": f"Invalid JSON body: {e}"})
+            return
+        await self._answer(payload)
+
+    async def _answer(self, payload):
+        # The pipeline is blocking (xarray + plotly), so run it off the IO loop
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(
+                self.executor, functools.partial(handle_query, self.loader, payload))
+        except Exception as e:
+            print(f"❌ API query failed: {type(e).__name__}: {e}")
+            self.set_status(500)
+            result = {"error": f"Internal error: {type(e).__name__}: {e}"}
+        else:
+            if "error" in result:
+                self.set_status(400)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(result, cls=PlotlyJSONEncoder))
+
+    def write_error(self, status_code, **kwargs):
+        # JSON rather than tornado's HTML error page for anything that escapes the handlers
+        self.finish({"error": self._reason})
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    """GET /api/health"""
+
+    def get(self):
+        self.finish({"status": "ok", "regions": AVAILABLE_REGIONS, "chart_types": CHART_TYPES})
+
+
+def make_app(loader, max_workers=None):
+    """Build the tornado application around a dataset loader callable"""
+    executor = ThreadPoolExecutor(max_workers=max_workers or min(8, (os.cpu_count() or 1) + 2),
+                                  thread_name_prefix="floatchat-api")
+    return tornado.web.Application([
+        (r"/api/query", QueryHandler, dict(loader=loader, executor=executor)),
+        (r"/api/health", HealthHandler),
+    ])
+
+
+def start_api_server(loader, port=DEFAULT_API_PORT, address="127.0.0.1"):
+    """Start the API on a daemon thread with its own event loop.
+
+    Used by the Streamlit app so the API lives in the same process and shares
+    its dataset cache. Returns the thread, or None if the port is unavailable.
+    """
+    started = threading.Event()
+    failed = []
+
+    def serve():
+        async def main():
+            app = make_app(loader)
+            try:
+                app.listen(port, address=address)
+            except OSError as e:
+                failed.append(e)
+                started.set()
+                return
+            started.set()
+            await asyncio.Event().wait()
+
+        asyncio.run(main())
+
+    thread = threading.Thread(target=serve, name="floatchat-api", daemon=True)
+    thread.start()
+    started.wait(timeout=10)
+    if failed:
+        print(f"⚠️  JSON API not started on port {port}: {failed[0]}")
+        return None
+    print(f"✅ JSON API listening on http://{address}:{port}/api/query")
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the FloatChat JSON query API")
+    parser.add_argument("--port", type=int, default=DEFAULT_API_PORT)
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--workers", type=int, default=None, help="query worker threads")
+    parser.add_argument("--watch", action="store_true", help="hot-reload the dataset when its files change")
+    args = parser.parse_args()
+
+    from data_handler import load_ocean_data, dataset_sources
+    if args.watch:
+        from hot_reload import DatasetHolder
+        holder = DatasetHolder(load_ocean_data, dataset_sources(), warm=warm_caches).start()
+        loader = lambda: holder.current  # noqa: E731
+    else:
+        loader = functools.lru_cache(maxsize=1)(load_ocean_data)
+        loader()  # warm the dataset before accepting requests
+
+    async def serve():
+        make_app(loader, args.workers).listen(args.port, address=args.address)
+        print(f"✅ JSON API listening on http://{args.address}:{args.port}/api/query")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
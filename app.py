@@ -1,10 +1,11 @@
 import streamlit as st
-import plotly.graph_objects as go
-from data_handler import load_ocean_data, filter_data, get_simple_stats, get_enhanced_stats
-from chart_maker import (create_temperature_map, create_simple_line_chart, 
-                        create_stats_chart, create_3d_surface_plot, 
-                        create_contour_map, create_comparison_chart)
+import os
 import time
+from startup_profile import import_timer, report as report_startup
+
+# The data, query/chart and API stacks are imported on first use (see
+# startup_profile.py), so the page starts painting before they load
+_run_started = time.perf_counter()
 
 # Page configuration
 st.set_page_config(
@@ -449,82 +450,43 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
+@st.cache_resource
+def dataset_holder():
+    # Shared (not copied) across sessions and the JSON API threads
+    with import_timer("data"):
+        from data_handler import load_ocean_data, dataset_sources
+    with import_timer("query"):
+        from query_handler import warm_caches
+        from hot_reload import DatasetHolder
+    # Attach to a loader process's arrays instead of loading a private copy (see shared_dataset.py)
+    shared_root = os.environ.get("FLOATCHAT_SHARED_DATASET")
+    if shared_root:
+        from shared_dataset import SharedDataset
+        try:
+            return SharedDataset(shared_root, warm=warm_caches)
+        except TimeoutError as e:
+            print(f"⚠️  {e}; loading a private copy")
+    # Build the float position index once per dataset version
+    holder = DatasetHolder(load_ocean_data, dataset_sources(), warm=warm_caches)
+    # Swap in new versions of the data as its files change; set FLOATCHAT_HOT_RELOAD=0 to disable
+    if os.environ.get("FLOATCHAT_HOT_RELOAD", "1") != "0":
+        holder.start()
+    return holder
+
 def load_data():
-    return load_ocean_data()
+    # The current dataset version (see hot_reload.py)
+    return dataset_holder().current
+
+@st.cache_resource
+def start_api():
+    # One JSON API per app process; set FLOATCHAT_API_PORT=0 to disable
+    with import_timer("api"):
+        from api_server import start_api_server, DEFAULT_API_PORT
+    port = int(os.environ.get("FLOATCHAT_API_PORT", DEFAULT_API_PORT))
+    if port:
+        return start_api_server(load_data, port=port)
+    return None
 
-def parse_user_input(user_input):
-    """Enhanced natural language parsing with expanded regions and chart types"""
-    # Handle empty or None input
-    if not user_input:
-        return "unknown", None, None, None
-        
-    user_input = user_input.lower().strip()
-    
-    # First check for greetings and help
-    if any(word in user_input for word in ["help", "what can", "how to", "commands"]):
-        return "help", None, None, None
-    elif any(word in user_input for word in ["hello", "hi", "hey", "good morning", "good evening"]):
-        return "greeting", None, None, None
-    
-    # Check if this looks like a data request (has ocean-related keywords)
-    has_parameter = any(word in user_input for word in ["temperature", "temp", "warm", "hot", "cold", "salinity", "salt", "salty", "saline"])
-    has_region = any(word in user_input for word in ["bengal", "bangladesh", "kolkata", "chennai", "arabian", "arabia", "mumbai", "karachi", "oman", "pacific", "atlantic", "indian", "mediterranean", "arctic", "ocean", "sea"])
-    has_action = any(word in user_input for word in ["show", "display", "get", "find", "tell", "what", "give", "trend", "stats", "statistics", "map", "heatmap", "3d", "surface", "contour", "compare", "comparison"])
-    
-    # If it doesn't look like a data request, it's unknown
-    if not (has_parameter or has_region or has_action):
-        return "unknown", None, None, None
-    
-    # Extract parameter (only if found)
-    parameter = None
-    if any(word in user_input for word in ["temperature", "temp", "warm", "hot", "cold"]):
-        parameter = "temperature"
-    elif any(word in user_input for word in ["salinity", "salt", "salty", "saline"]):
-        parameter = "salinity"
-    
-    # Extract region with expanded coverage
-    region = None
-    if any(word in user_input for word in ["bengal", "bangladesh", "kolkata", "chennai"]):
-        region = "bay of bengal"
-    elif any(word in user_input for word in ["arabian", "arabia", "mumbai", "karachi", "oman"]):
-        region = "arabian sea"
-    elif any(word in user_input for word in ["pacific"]):
-        region = "pacific ocean"
-    elif any(word in user_input for word in ["atlantic"]):
-        region = "atlantic ocean"
-    elif any(word in user_input for word in ["indian"]) and any(word in user_input for word in ["ocean"]):
-        region = "indian ocean"
-    elif any(word in user_input for word in ["mediterranean", "med"]):
-        region = "mediterranean sea"
-    elif any(word in user_input for word in ["arctic"]):
-        region = "arctic ocean"
-    
-    # Extract chart type with more options
-    chart_type = "map"  # default for valid data requests
-    if any(word in user_input for word in ["trend", "line", "time", "over time", "change", "history"]):
-        chart_type = "line"
-    elif any(word in user_input for word in ["stats", "statistics", "numbers", "average", "min", "max"]):
-        chart_type = "stats"
-    elif any(word in user_input for word in ["3d", "surface", "three dimensional"]):
-        chart_type = "3d"
-    elif any(word in user_input for word in ["contour", "isolines", "levels"]):
-        chart_type = "contour"
-    elif any(word in user_input for word in ["compare", "comparison", "both", "versus", "vs"]):
-        chart_type = "comparison"
-    elif any(word in user_input for word in ["map", "heatmap", "spatial", "distribution", "show"]):
-        chart_type = "map"
-    
-    # Better validation - need BOTH parameter AND region, OR clear action
-    if parameter and region:
-        return "show_data", parameter, region, chart_type
-    elif parameter and not region:
-        return "need_region", parameter, None, chart_type
-    elif region and not parameter:
-        return "need_parameter", None, region, chart_type
-    else:
-        return "unclear", None, None, None
-    
 def generate_help_response():
     """Generate helpful command examples with expanded regions"""
     help_text = """🌊 **Welcome to FloatChat!** Here's what I can do:
@@ -546,6 +508,14 @@ def generate_help_response():
 - Maps: "show temperature map"  
 - Trends: "temperature trend over time"  
 - Statistics: "temperature stats"
+- Distributions: "temperature histogram in Pacific Ocean", "median salinity in Arabian Sea", "p90 temperature", "IQR"
+- Float search: "nearest floats to 15N 88E", "floats within 200 km of Chennai"
+- Time periods: "last week", "March 2024", "between 1 and 5 Jan"
+- Depths: "at 500 m", "0-200 m average", "between 100 and 1000 m" (surface by default)
+- Gridding: "on a 0.5° grid", "smoothed temperature map"
+- Anomalies: "temperature anomaly in Arabian Sea", "salinity anomaly trend"
+- All regions: "compare temperature across all oceans"
+- Hotspots: "where is temperature above 29 °C in Bay of Bengal", "5 saltiest spots in Arabian Sea"
 
 **💬 Try these commands:**   
 - "Show temperature in Pacific Ocean"  
@@ -608,6 +578,11 @@ Example: "Show temperature in {region}" """
 def generate_response(user_input):
     """Enhanced response generation with better error handling"""
     try:
+        with import_timer("query"):
+            from query_handler import (parse_user_input, parse_location_query, parse_time_range, parse_depth,
+                                       parse_grid_options, parse_anomaly, parse_rolling, parse_hotspots, parse_quantiles,
+                                       run_query, run_float_query, dataset_time_anchor, AVAILABLE_REGIONS, ALL_REGIONS)
+
         # Parse user input
         intent, parameter, region, chart_type = parse_user_input(user_input)
         
@@ -624,11 +599,14 @@ def generate_response(user_input):
             return generate_need_region_response(parameter), None
         elif intent == "need_parameter":
             return generate_need_parameter_response(region), None
+        elif intent == "find_floats":
+            response, fig, floats = run_float_query(load_data(), parse_location_query(user_input))
+            return response, fig
         
         # Handle data requests - now with proper validation
         if intent == "show_data":
             # Check if region is available
-            if region not in ["bay of bengal", "arabian sea", "pacific ocean", "atlantic ocean", "indian ocean", "mediterranean sea", "arctic ocean"]:
+            if region not in AVAILABLE_REGIONS and region != ALL_REGIONS:
                 return f"""🌍 I'd love to show you {region} data, but currently I only have data for:
 • Bay of Bengal
 • Arabian Sea
@@ -642,59 +620,11 @@ Try asking about one of these regions!""", None
             
             # Load and process data
             ds = load_data()
-            if ds is None:
-                return "❌ Sorry, I couldn't load the ocean data right now.", None
-            
-            # Filter data
-            data = filter_data(ds, parameter, region)
-            if data is None:
-                return "❌ Sorry, I couldn't find that data.", None
-            
-            # Get statistics    
-            stats = get_enhanced_stats(data,region)
-            
-            # Create appropriate chart
-            if chart_type == "line":
-                fig = create_simple_line_chart(data, f"{parameter.title()} Trend in {region.title()}")
-                response = f"📈 Here's the {parameter} trend for {region}!"
-            elif chart_type == "stats":
-                fig = create_stats_chart(stats, parameter.title())
-                response = f"📊 Here are the {parameter} statistics for {region}!"
-            elif chart_type == "3d":
-                fig = create_3d_surface_plot(data, f"{parameter.title()} in {region.title()}")
-                response = f"🌐 Here's a 3D surface view of {parameter} in {region}! Rotate and zoom to explore."
-            elif chart_type == "contour":
-                fig = create_contour_map(data, f"{parameter.title()} in {region.title()}")
-                response = f"📈 Here's a contour map of {parameter} in {region}! Lines show equal values."
-            elif chart_type == "comparison":
-                # Need both temperature and salinity data
-                temp_data = filter_data(ds, "temperature", region)
-                salt_data = filter_data(ds, "salinity", region)
-                if temp_data is not None and salt_data is not None:
-                    fig = create_comparison_chart(temp_data, salt_data, region)
-                    response = f"🌊 Here's a side-by-side comparison of temperature and salinity in {region}!"
-                else:
-                    fig = create_temperature_map(data, f"{parameter.title()} in {region.title()}")
-                    response = f"🗺️ Comparison unavailable, showing {parameter} map instead."
-            else:  # map
-                fig = create_temperature_map(data, f"{parameter.title()} in {region.title()}")
-                response = f"🗺️ Here's the {parameter} distribution map for {region}!"
-            # Add detailed statistics
-            if stats:
-                if parameter == "temperature":
-                    unit = "°C"
-                else:
-                    unit = "PSU" if parameter == "salinity" else "units"
-                    
-                response += f"""
-
-            **📋 Enhanced Stats for {region.title()}:**
-            - **Average:** {stats['mean']:.2f}{unit} (±{stats['std']:.2f}{unit})
-            - **Range:** {stats['min']:.2f}{unit} to {stats['max']:.2f}{unit}
-            - **Data Quality:** {stats['data_points']:,} measurements
-            - **Region Info:** {stats['description']}
-            - **Coverage:** {stats['shape'][0]} days, {stats['shape'][1]}×{stats['shape'][2]} grid points"""
-            
+            time_range = parse_time_range(user_input, anchor=dataset_time_anchor(ds))
+            response, fig, stats = run_query(ds, parameter, region, chart_type, time_range,
+                                             parse_depth(user_input), anomaly=parse_anomaly(user_input),
+                                             rolling=parse_rolling(user_input), hotspots=parse_hotspots(user_input),
+                                             quantiles=parse_quantiles(user_input), **parse_grid_options(user_input))
             return response, fig
         
         # Fallback
@@ -730,7 +660,7 @@ def render_dashboard_page():
         ds = load_data()
         if ds is not None:
             # Get real statistics from your data
-            total_points = ds.sizes.get('time', 0) * ds.sizes.get('latitude', 0) * ds.sizes.get('longitude', 0)
+            total_points = ds.sizes.get('time', 0) * ds.sizes.get('depth', 1) * ds.sizes.get('latitude', 0) * ds.sizes.get('longitude', 0)
             regions_available = 7
             parameters_count = len(ds.data_vars)
         else:
@@ -910,6 +840,7 @@ def render_dashboard_page():
             st.markdown("- **Heatmap:** `map`, `show` (default)")
             st.markdown("- **Time Trends:** `trend`, `time`, `history`")
             st.markdown("- **Statistics:** `stats`, `numbers`, `summary`")
+            st.markdown("- **Distribution:** `histogram`, `percentile`, `box plot`")
             st.markdown("- **3D Surface:** `3d`, `surface`")
             st.markdown("- **Contour Map:** `contour`, `isolines`")
             st.markdown("- **Comparison:** `compare`, `both`")
@@ -1022,6 +953,8 @@ def render_chatbot_page():
             time.sleep(0.5)  # Brief pause for better UX
         
         # Parse the command first
+        with import_timer("query"):
+            from query_handler import parse_user_input
         intent, parameter, region, chart_type = parse_user_input(prompt)
         
         # Show different loading messages based on intent
@@ -1078,4 +1011,7 @@ with st.sidebar:
 if st.session_state.page == "Dashboard":
     render_dashboard_page()
 else:
-    render_chatbot_page()
\ No newline at end of file
+    render_chatbot_page()
+# Start the JSON API after the page is out, so its imports don't delay first paint
+start_api()
+report_startup(time.perf_counter() - _run_started)
@@ -0,0 +1,255 @@
+# argo_ingest.py
+"""Parallel, incremental ingestion of a directory tree of Argo profile files.
+
+Files are tracked in a manifest by mtime, size and SHA-256. A re-run only
+parses new or changed files (in a process pool) and appends their rows to the
+partitioned Parquet profile store (see profile_store.py); rows from changed
+or deleted files are dropped first. The store's monthly quantile sketches
+(see quantile_sketch.py) are updated in the same run.
+
+New and rewritten parts are staged and swapped in together with the
+manifest through a commit journal, so an interrupted run leaves either the
+old store or a commit the next run finishes: the manifest never lists rows
+the parts don't hold, or misses rows they do.
+
+    python argo_ingest.py /data/argo/indian_ocean --store argo_store --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from argo_profiles import read_argo_profiles
+from profile_store import write_partitioned, drop_sources, query_profile_store, partition_dirs
+from quantile_sketch import has_sketches, month_of_part, stale_months, store_months, update_store_sketches
+
+PROFILE_STORE_DIR = os.environ.get("FLOATCHAT_PROFILE_STORE", "argo_store")
+MANIFEST_NAME = "manifest.json"
+
+# Store-relative directory for parts written by a run that hasn't committed yet
+STAGING_DIR = "staging"
+JOURNAL_NAME = "commit.json"
+
+# Files per written part; keeps parts large enough to read efficiently
+FILES_PER_PART = 256
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in fixed-size chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_directory(root, suffix=".nc"):
+    """Map relative path → (mtime_ns, size) for every profile file under root"""
+    found = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(suffix):
+                path = os.path.join(dirpath, name)
+                st = os.stat(path)
+                found[os.path.relpath(path, root)] = (st.st_mtime_ns, st.st_size)
+    return found
+
+
+def load_manifest(store):
+    path = os.path.join(store, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"next_source_id": 0, "files": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path, payload):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=1)
+    os.replace(tmp, path)
+
+
+def save_manifest(store, manifest):
+    """Write the manifest atomically so an interrupted run never corrupts it"""
+    _write_json(os.path.join(store, MANIFEST_NAME), manifest)
+
+
+def _roll_forward(store):
+    """Finish a commit an interrupted run had journalled, then clear the staging directory.
+
+    Each move is an os.replace (or a delete) that is skipped once done, so
+    this can itself be interrupted and rerun.
+    """
+    path = os.path.join(store, JOURNAL_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            journal = json.load(f)
+        for staged, target in journal["moves"]:
+            target = os.path.join(store, target)
+            if staged is None:
+                if os.path.exists(target):
+                    os.remove(target)
+            elif os.path.exists(os.path.join(store, staged)):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(os.path.join(store, staged), target)
+        save_manifest(store, journal["manifest"])
+        os.remove(path)
+    shutil.rmtree(os.path.join(store, STAGING_DIR), ignore_errors=True)
+
+
+def _commit(store, manifest, moves):
+    """Swap staged parts and the new manifest into the store: journal first, then the moves"""
+    _write_json(os.path.join(store, JOURNAL_NAME), {"manifest": manifest, "moves": moves})
+    _roll_forward(store)
+
+
+def _ingest_file(path, known_checksum=None):
+    """Worker: checksum and parse one file. Returns (checksum, table, error)"""
+    try:
+        checksum = file_checksum(path)
+        if checksum == known_checksum:
+            return checksum, None, None
+        return checksum, read_argo_profiles(path), None
+    except Exception as e:
+        return None, None, str(e)
+
+
+def _drop_files(store, manifest, stale):
+    """Stage the store's parts without stale files' rows and forget those files in the manifest.
+
+    Returns the months (YYYY-MM) those rows were in and the part moves to commit.
+    """
+    source_ids = {manifest["files"][rel]["source_id"] for rel in stale}
+    paths = set()
+    for rel in stale:
+        paths.update(manifest["files"].pop(rel)["parts"])
+    moves = drop_sources(store, sorted(paths), source_ids, staging=STAGING_DIR)
+    return {month_of_part(rel) for rel in paths} - {None}, moves
+
+
+def ingest_directory(root, store=PROFILE_STORE_DIR, workers=None):
+    """Ingest new or changed profile files under root into the store.
+
+    Returns a summary dict with file counts, rows added and throughput.
+    """
+    start = time.perf_counter()
+    os.makedirs(store, exist_ok=True)
+    _roll_forward(store)
+    manifest = load_manifest(store)
+    files = manifest["files"]
+    found = scan_directory(root)
+
+    deleted = [rel for rel in files if rel not in found]
+    candidates = {rel: stat for rel, stat in found.items()
+                  if rel not in files or (files[rel]["mtime_ns"], files[rel]["size"]) != tuple(stat)}
+
+    summary = {"scanned": len(found), "candidates": len(candidates), "unchanged": 0,
+               "ingested": 0, "failed": 0, "deleted": len(deleted), "rows": 0}
+    # Sketches can't forget values, so months that lose rows are rebuilt; a store without sketches gets all
+    # of them, months sketched with other layers are redone, and so are months a crashed run still owed
+    rebuild = set(stale_months(store)) if has_sketches(store) else set(store_months(store))
+    rebuild |= set(manifest.pop("pending_sketches", []))
+
+    pending, changed = [], []
+    bytes_read = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_ingest_file, os.path.join(root, rel),
+                            files[rel]["sha256"] if rel in files else None): rel
+            for rel in candidates
+        }
+        for future in as_completed(futures):
+            rel = futures[future]
+            mtime_ns, size = candidates[rel]
+            checksum, table, error = future.result()
+            bytes_read += size
+            if error:
+                summary["failed"] += 1
+                print(f"⚠️  Skipping {rel}: {error}")
+                continue
+            if table is None:
+                # Touched but identical: just refresh the stat fingerprint
+                files[rel].update(mtime_ns=mtime_ns, size=size)
+                summary["unchanged"] += 1
+                continue
+            if rel in files:
+                changed.append(rel)
+            pending.append((rel, mtime_ns, size, checksum, table))
+
+    moves = []
+    if deleted or changed:
+        months, moves = _drop_files(store, manifest, deleted + changed)
+        rebuild |= months
+
+    for i in range(0, len(pending), FILES_PER_PART):
+        batch = pending[i:i + FILES_PER_PART]
+        tables = []
+        for rel, mtime_ns, size, checksum, table in batch:
+            source_id = manifest["next_source_id"]
+            manifest["next_source_id"] += 1
+            tables.append(table.assign(source_id=pd.Series(source_id, index=table.index, dtype="int32")))
+            files[rel] = {"mtime_ns": mtime_ns, "size": size, "sha256": checksum,
+                          "source_id": source_id, "rows": len(table), "parts": []}
+            summary["rows"] += len(table)
+        # Paths under the staging directory mirror the store's
+        written = write_partitioned(os.path.join(store, STAGING_DIR), pd.concat(tables, ignore_index=True))
+        moves += [(os.path.join(STAGING_DIR, p), p) for p in written]
+        # Remember which of the batch's partition files hold each source's rows
+        for (rel, *_), table in zip(batch, tables):
+            dirs = partition_dirs(table)
+            files[rel]["parts"] = [p for p in written if os.path.dirname(p) in dirs]
+        summary["ingested"] += len(batch)
+
+    added = pd.concat([table for *_, table in pending], ignore_index=True) if pending else pd.DataFrame()
+    # Until the sketches are updated, the manifest records the months they owe
+    owed = rebuild | (set(added["time"].dt.strftime("%Y-%m")) if pending else set())
+    if owed:
+        manifest["pending_sketches"] = sorted(owed)
+    _commit(store, manifest, moves)
+    summary["sketched_months"] = update_store_sketches(store, added, rebuild)
+    if manifest.pop("pending_sketches", None):
+        save_manifest(store, manifest)
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = round(elapsed, 3)
+    summary["files_per_second"] = round(len(candidates) / elapsed, 1) if elapsed else 0.0
+    summary["mb_per_second"] = round(bytes_read / 1e6 / elapsed, 2) if elapsed else 0.0
+    return summary
+
+
+def has_profile_store(store=PROFILE_STORE_DIR):
+    return os.path.exists(os.path.join(store, MANIFEST_NAME))
+
+
+def profile_store_version(store=PROFILE_STORE_DIR):
+    """Token that changes whenever an ingestion run rewrites the manifest"""
+    path = os.path.join(store, MANIFEST_NAME)
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+
+def load_profile_store(store=PROFILE_STORE_DIR, **query):
+    """Load ingested measurements, optionally restricted by query_profile_store filters"""
+    return query_profile_store(store, **query)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally ingest a directory of Argo profile files")
+    parser.add_argument("root", help="directory tree containing Argo .nc profile files")
+    parser.add_argument("--store", default=PROFILE_STORE_DIR, help="profile store directory")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    summary = ingest_directory(args.root, args.store, args.workers)
+    print(f"✅ Ingested {summary['ingested']} of {summary['scanned']} files "
+          f"({summary['unchanged']} unchanged, {summary['deleted']} deleted, {summary['failed']} failed), "
+          f"{summary['rows']:,} rows, {summary['sketched_months']} months sketched in {summary['seconds']:.2f}s "
+          f"→ {summary['files_per_second']} files/s, {summary['mb_per_second']} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# batch_query.py
+"""Batch query CLI: evaluate a file of FloatChat queries across CPU cores.
+
+Each line of the query file is either a chat-style question
+("temperature trend in bay of bengal") or a structured query written as a
+JSON list/object, e.g. ``["salinity", "arabian sea", "map"]`` or
+``{"parameter": "salinity", "region": "arabian sea", "chart_type": "map"}``,
+optionally with a ``time_range`` of ``[start, end]`` dates, a ``depth`` in
+metres or ``[top, bottom]`` layer, a grid ``resolution`` in degrees,
+``smooth``, ``anomaly``, a ``rolling`` mean window in time steps and a
+hotspot selection (``above``/``below`` a value, ``top``/``bottom`` k cells;
+objects only) and ``quantiles`` (a list of percentiles).
+Blank lines and lines starting with ``#`` are skipped.
+
+    python batch_query.py queries.txt --out reports --figures html
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import xarray as xr
+from plotly.utils import PlotlyJSONEncoder
+
+from data_handler import load_ocean_data, set_dataset_version
+from query_handler import (parse_user_input, parse_location_query, parse_time_range, parse_depth,
+                           parse_grid_options, parse_anomaly, parse_rolling, parse_hotspots, parse_quantiles,
+                           coerce_depth, coerce_hotspots, coerce_quantiles, coerce_time_range, run_query, run_float_query, validate_query,
+                           dataset_time_anchor)
+
+# Per-process dataset, attached once by the pool initializer
+_worker_ds = None
+
+
+def _parse_structured(line):
+    spec = json.loads(line)
+    if isinstance(spec, dict):
+        spec = [spec.get("parameter"), spec.get("region"), spec.get("chart_type"),
+                spec.get("time_range"), spec.get("depth"), spec.get("resolution"),
+                spec.get("smooth"), spec.get("anomaly"), spec.get("rolling"), coerce_hotspots(spec),
+                spec.get("quantiles")]
+    if not isinstance(spec, list) or len(spec) < 2:
+        raise ValueError("expected a JSON object or a [parameter, region, ...] list")
+    parameter, region = spec[0], spec[1]
+    chart_type = spec[2] if len(spec) > 2 and spec[2] else "map"
+    time_range = coerce_time_range(spec[3]) if len(spec) > 3 else None
+    depth = coerce_depth(spec[4]) if len(spec) > 4 else None
+    options = {"resolution": float(spec[5]) if len(spec) > 5 and spec[5] else None,
+               "smooth": bool(spec[6]) if len(spec) > 6 else False,
+               "anomaly": bool(spec[7]) if len(spec) > 7 else False,
+               "rolling": int(spec[8]) if len(spec) > 8 and spec[8] else None,
+               "hotspots": spec[9] if len(spec) > 9 else None,
+               "quantiles": coerce_quantiles(spec[10]) if len(spec) > 10 else None}
+    return line, parameter, region, chart_type, time_range, depth, options
+
+
+def read_queries(path):
+    """Read a query file into a list of
+    (query_text, parameter, region, chart_type, time_range, depth, options).
+
+    A structured line that doesn't parse keeps its place with the reason
+    in options["error"], so it gets an error report and the rest still run.
+    """
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line[0] in "[{":
+                try:
+                    queries.append(_parse_structured(line))
+                except (ValueError, TypeError) as e:
+                    # json.JSONDecodeError and pandas' DateParseError are ValueErrors
+                    queries.append((line, None, None, None, None, None, {"error": f"Line {number}: {e}"}))
+            else:
+                intent, parameter, region, chart_type = parse_user_input(line)
+                if intent not in ("show_data", "find_floats"):
+                    parameter = region = None
+                options = dict(parse_grid_options(line), anomaly=parse_anomaly(line), rolling=parse_rolling(line),
+                               hotspots=parse_hotspots(line), quantiles=parse_quantiles(line))
+                queries.append((line, parameter, region, chart_type, None, parse_depth(line), options))
+    return queries
+
+
+def _init_worker(path, version_source=None, version_token=None, store=None):
+    global _worker_ds
+    _worker_ds = xr.open_dataset(path)
+    # Reopening drops the runtime version tag; without it no version-keyed cache is ever hit
+    if version_source:
+        set_dataset_version(_worker_ds, version_source, version_token, store=store)
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:60] or "query"
+
+
+def _run_one(job):
+    """Answer one query and write its report; any failure becomes that report's error"""
+    index, (query, parameter, region, chart_type, time_range, depth, options), out_dir, figures = job
+    name = f"{index:04d}_{_slug(query)}"
+    result = {"query": query, "parameter": parameter, "region": region, "chart_type": chart_type}
+    options = dict(options)
+    error = options.pop("error", None)
+    if error:
+        result["error"] = error
+    else:
+        try:
+            _answer(result, name, query, parameter, region, chart_type, time_range, depth, options, out_dir, figures)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+
+    with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+        json.dump(result, f, cls=PlotlyJSONEncoder, indent=2)
+    return name, "error" not in result
+
+
+def _answer(result, name, query, parameter, region, chart_type, time_range, depth, options, out_dir, figures):
+    if time_range is None and query[0] not in "[{":
+        # Relative dates in chat-style lines count back from the dataset's latest time
+        time_range = parse_time_range(query, anchor=dataset_time_anchor(_worker_ds))
+
+    location = parse_location_query(query) if chart_type in ("nearest", "radius") else None
+    error = None if location else validate_query(parameter, region, chart_type)
+    if error:
+        result["error"] = error
+    else:
+        if location:
+            response, fig, floats = run_float_query(_worker_ds, location)
+            result["floats"] = floats.to_dict(orient="records") if floats is not None else None
+            stats = floats
+        else:
+            response, fig, stats = run_query(_worker_ds, parameter, region, chart_type, time_range, depth,
+                                             **options)
+            result["stats"] = stats
+            result["time_range"] = [t.isoformat() for t in time_range] if time_range else None
+            result["depth"] = list(depth) if isinstance(depth, tuple) else depth
+        result["response"] = response
+        if stats is None:
+            result["error"] = response
+        if fig is not None and figures == "json":
+            with open(os.path.join(out_dir, f"{name}.fig.json"), "w") as f:
+                json.dump(fig.to_plotly_json(), f, cls=PlotlyJSONEncoder)
+        elif fig is not None and figures == "html":
+            fig.write_html(os.path.join(out_dir, f"{name}.html"), include_plotlyjs="cdn")
+
+
+def _dataset_path(ds, tmp_dir):
+    """Return a file the workers can open; in-memory datasets are written out once"""
+    source = ds.encoding.get("source")
+    if source and os.path.exists(source):
+        return source
+    path = os.path.join(tmp_dir, "batch_dataset.nc")
+    ds.to_netcdf(path)
+    return path
+
+
+def run_batch(queries, out_dir, figures="none", workers=None):
+    """Evaluate queries in a process pool; returns the list of (name, ok)"""
+    os.makedirs(out_dir, exist_ok=True)
+    ds = load_ocean_data()
+    if ds is None:
+        raise RuntimeError("Could not load ocean data")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = _dataset_path(ds, tmp_dir)
+        source = ds.attrs.get("version_source")
+        version = (source, ds.attrs["version"].removeprefix(f"{source}-") if source else None, ds.attrs.get("store"))
+        # Don't carry open file handles into the forked workers
+        ds.close()
+
+        jobs = [(i, q, out_dir, figures) for i, q in enumerate(queries)]
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(path, *version)) as executor:
+            return list(executor.map(_run_one, jobs, chunksize=chunksize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a file of FloatChat queries in parallel")
+    parser.add_argument("query_file", help="one query per line (chat text or JSON list/object)")
+    parser.add_argument("--out", default="batch_output", help="output directory")
+    parser.add_argument("--figures", choices=["none", "json", "html"], default="none",
+                        help="also write each figure as Plotly JSON or standalone HTML")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    queries = read_queries(args.query_file)
+    start = time.perf_counter()
+    results = run_batch(queries, args.out, args.figures, args.workers)
+    elapsed = time.perf_counter() - start
+
+    failed = [name for name, ok in results if not ok]
+    print(f"✅ {len(results) - len(failed)}/{len(results)} queries answered in {elapsed:.1f}s "
+          f"({len(results) / max(elapsed, 1e-9):.1f} queries/s) → {args.out}")
+    for name in failed:
+        print(f"⚠️  {name} failed, see {name}.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/bench_bulk_fetch.py
+"""Throughput of bulk_fetch against one bare requests.get per file.
+
+Serves a small NetCDF file under many names from a local HTTP/1.1 server
+that adds a fixed per-request latency (standing in for the round trip to a
+GDAC mirror) and answers the first request for every Nth file with a 503,
+so the retry path is exercised too. The baseline fetches sequentially with
+a new connection per file, as download_sample_data used to.
+
+    python benchmarks/bench_bulk_fetch.py --files 200 --latency 0.02 --workers 8
+"""
+import argparse
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_fetch import fetch_files  # noqa: E402
+
+
+def sample_bytes(tmp):
+    path = os.path.join(tmp, "sample.nc")
+    xr.Dataset({"TEMP": (("N_PROF", "N_LEVELS"), np.random.default_rng(0).normal(20, 5, (4, 500)))}) \
+        .to_netcdf(path, format="NETCDF3_CLASSIC")
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def serve(body, latency, fail_every):
+    """Start the stand-in GDAC server; returns (server, base URL, request counter)"""
+    seen, counter, lock = set(), {"requests": 0, "failed": 0}, threading.Lock()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            index = int(self.path.rsplit("_", 1)[1].split(".")[0])
+            with lock:
+                counter["requests"] += 1
+                first = self.path not in seen
+                seen.add(self.path)
+            if fail_every and index % fail_every == 0 and first:
+                with lock:
+                    counter["failed"] += 1
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/", counter
+
+
+def bare_gets(base_url, names, dest):
+    """One bare requests.get per file, sequential; no retry"""
+    fetched = 0
+    for name in names:
+        response = requests.get(base_url + name, timeout=30)
+        if response.ok:
+            with open(os.path.join(dest, os.path.basename(name)), "wb") as f:
+                f.write(response.content)
+            fetched += 1
+    return fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200, help="files in the list")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every request")
+    parser.add_argument("--workers", type=int, default=8, help="bulk_fetch concurrency")
+    parser.add_argument("--fail-every", type=int, default=10, help="every Nth file fails once with 503 (0: never)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        body = sample_bytes(tmp)
+        names = [f"dac/test/{n // 100}/R590000_{n:03d}.nc" for n in range(1, args.files + 1)]
+
+        server, base_url, counter = serve(body, args.latency, args.fail_every)
+        os.makedirs(os.path.join(tmp, "bare"))
+        start = time.perf_counter()
+        fetched = bare_gets(base_url, names, os.path.join(tmp, "bare"))
+        bare_seconds = time.perf_counter() - start
+        server.shutdown()
+
+        server, base_url, counter = serve(body, args.latency, args.fail_every)
+        summary = fetch_files(names, os.path.join(tmp, "pooled"), base_url=base_url, workers=args.workers, rate=0)
+        server.shutdown()
+
+        print(f"{len(body):,}-byte files, {args.latency * 1000:.0f} ms latency, 1 in {args.fail_every} fails once")
+        print(f"bare requests.get: {fetched}/{len(names)} files in {bare_seconds:.2f}s "
+              f"→ {fetched / bare_seconds:.1f} files/s")
+        print(f"bulk_fetch ({args.workers} workers): {summary['fetched']}/{len(names)} files in "
+              f"{summary['seconds']:.2f}s → {summary['files_per_second']} files/s, "
+              f"{summary['mb_per_second']} MB/s ({counter['failed']} retried)")
+
+
+if __name__ == "__main__":
+    main()
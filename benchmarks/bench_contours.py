@@ -0,0 +1,96 @@
+# benchmarks/bench_contours.py
+"""Contour map payload and build time: browser-side vs. server-side contours.
+
+On a synthetic, smooth-but-busy field (a dense regional grid), compares
+the previous create_contour_map (the full z grid in a go.Contour trace, to
+be contoured in the browser) with server-side marching squares (simplified
+line traces). Reports the figure's JSON size, the time to build it, and the
+time for a cached repeat. Also checks that every unsimplified contour point
+lies on its level (bilinear interpolation of the grid) and that simplified
+lines stay within the tolerance.
+
+    python benchmarks/bench_contours.py --resolution 0.1
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+import xarray as xr
+from scipy.interpolate import RegularGridInterpolator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chart_maker import create_contour_map  # noqa: E402
+from contours import cached_contours, contour_lines, default_levels, SIMPLIFY_CELLS  # noqa: E402
+
+
+def make_field(resolution):
+    lat = np.arange(-50, 30 + resolution / 2, resolution)
+    lon = np.arange(20, 120 + resolution / 2, resolution)
+    la, lo = np.meshgrid(np.deg2rad(lat), np.deg2rad(lon), indexing="ij")
+    z = 28 * np.cos(la) ** 2 + 1.5 * np.sin(6 * lo) * np.cos(5 * la) + 0.5 * np.sin(17 * lo + 11 * la)
+    z[(np.abs(lat[:, None] + 10) < 3) & (np.abs(lon[None, :] - 60) < 4)] = np.nan  # an island
+    return xr.DataArray(z, dims=("latitude", "longitude"), coords={"latitude": lat, "longitude": lon})
+
+
+def browser_contour(data):
+    """The previous create_contour_map: the whole grid, contoured client-side"""
+    fig = go.Figure(go.Contour(z=data.values, x=data.longitude.values, y=data.latitude.values,
+                               colorscale="Viridis", contours=dict(showlabels=True)))
+    return fig
+
+
+def payload_mb(fig):
+    return len(fig.to_json()) / 2**20
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def check(data, tolerance):
+    z, x, y = data.values, data.longitude.values, data.latitude.values
+    levels = default_levels(z)
+    interpolate = RegularGridInterpolator((y, x), z)
+    exact = contour_lines(z, x, y, levels, tolerance=0)
+    simplified = contour_lines(z, x, y, levels, tolerance=tolerance)
+    on_level = max(np.nanmax(np.abs(interpolate(np.concatenate(lines)[:, ::-1]) - level))
+                   for level, lines in exact.items() if lines)
+    points = (sum(len(line) for lines in exact.values() for line in lines),
+              sum(len(line) for lines in simplified.values() for line in lines))
+    return on_level, points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolution", type=float, default=0.1, help="grid spacing in degrees")
+    args = parser.parse_args()
+
+    data = make_field(args.resolution)
+    tolerance = SIMPLIFY_CELLS * args.resolution
+    print(f"grid {data.shape[0]}×{data.shape[1]} ({data.size:,} cells)")
+
+    on_level, (raw, kept) = check(data, tolerance)
+    print(f"max |z(point) - level| {on_level:.2e}; points {raw:,} → {kept:,} after simplifying "
+          f"to {tolerance:g}°")
+
+    browser, browser_s = timed(lambda: browser_contour(data))
+    key = ("bench", "temperature", "indian ocean", None, None, False, False)
+    server_lines, first_s = timed(lambda: cached_contours(key, data.values, data.longitude.values,
+                                                          data.latitude.values))
+    server, chart_s = timed(lambda: create_contour_map(data, "bench", server_lines))
+    _, cached_s = timed(lambda: cached_contours(key, data.values, data.longitude.values, data.latitude.values))
+
+    print(f"{'approach':<16}{'JSON MB':>9}{'build s':>9}{'cached s':>10}")
+    print(f"{'browser-side':<16}{payload_mb(browser):>9.2f}{browser_s:>9.3f}{'-':>10}")
+    print(f"{'server-side':<16}{payload_mb(server):>9.2f}{first_s + chart_s:>9.3f}{cached_s + chart_s:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
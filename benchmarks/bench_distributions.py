@@ -0,0 +1,82 @@
+# benchmarks/bench_distributions.py
+"""Distribution queries: percentiles of raw cells vs. precomputed histograms.
+
+On a synthetic global grid, times a region's percentiles the direct way
+(filter_data, then np.percentile, which partitions every cell) and from
+distributions.region_distribution: building the histogram table once (at
+load), then a query (summing the window's bins). Also reports the largest
+percentile error, in bin widths.
+
+    python benchmarks/bench_distributions.py --resolution 0.25 --times 60
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_handler import filter_data  # noqa: E402
+from distributions import PERCENTILES, region_distribution, region_histograms  # noqa: E402
+from regions import REGION_BOUNDS  # noqa: E402
+
+
+def make_dataset(resolution, times):
+    rng = np.random.default_rng(0)
+    lat = np.arange(-80, 90, resolution)
+    lon = np.arange(0, 360, resolution)
+    shape = (times, len(lat), len(lon))
+    values = 28 * np.cos(np.deg2rad(lat))[None, :, None] ** 2 + rng.normal(0, 1, shape)
+    values[:, rng.random(shape[1:]) < 0.3] = np.nan  # land
+    return xr.Dataset({"temperature": (("time", "latitude", "longitude"), values.astype("float32"))},
+                      coords={"time": pd.date_range("2020-01-01", periods=times, freq="D"),
+                              "latitude": lat, "longitude": lon},
+                      attrs={"version": "bench"})
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def direct(ds, region, time_range):
+    values = filter_data(ds, "temperature", region, time_range).values
+    return np.percentile(values[~np.isnan(values)], PERCENTILES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolution", type=float, default=0.25)
+    parser.add_argument("--times", type=int, default=60)
+    args = parser.parse_args()
+
+    ds = make_dataset(args.resolution, args.times)
+    window = (ds.time.values[10], ds.time.values[40])
+    print(f"grid {dict(ds.sizes)}")
+
+    _, build_s = timed(lambda: region_histograms(ds, "temperature"))
+    worst, direct_s, query_s = 0.0, 0.0, 0.0
+    for region in REGION_BOUNDS:
+        exact, seconds = timed(lambda: direct(ds, region, window))
+        direct_s += seconds
+        summary, seconds = timed(lambda: region_distribution(ds, "temperature", region, window))
+        query_s += seconds
+        error = np.abs(exact - np.array(list(summary["percentiles"].values()))).max()
+        worst = max(worst, error / summary["bin_width"])
+
+    print(f"max percentile error {worst:.2f} bin widths")
+    print(f"{'method':<40}{'seconds':>9}")
+    for name, seconds in ((f"filter_data + np.percentile, {len(REGION_BOUNDS)} regions", direct_s),
+                          ("histogram table, build once", build_s),
+                          (f"histogram query, {len(REGION_BOUNDS)} regions", query_s)):
+        print(f"{name:<40}{seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
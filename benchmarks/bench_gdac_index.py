@@ -0,0 +1,126 @@
+# benchmarks/bench_gdac_index.py
+"""Parse and selection speed for the GDAC profile index, on a synthetic index.
+
+Writes an index file in the GDAC layout (comment header, CSV with
+YYYYMMDDHHMMSS dates, some blank dates and positions), parses it with
+gdac_index, and checks every selection against a plain pandas reference.
+
+    python benchmarks/bench_gdac_index.py --rows 1000000
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gdac_index import index_to_parquet, load_index, parse_index, select_profiles, file_list  # noqa: E402
+from regions import get_region_bounds  # noqa: E402
+
+HEADER = """# Title : Profile directory file of the Argo Global Data Assembly Center
+# Description : The directory file describes all individual profile files of the argo GDAC ftp site.
+# Project : ARGO
+# Format version : 2.0
+# Date of update : 20240101000000
+# FTP root number 1 : ftp://ftp.ifremer.fr/ifremer/argo/dac
+# FTP root number 2 : ftp://usgodae.org/pub/outgoing/argo/dac
+# GDAC node : CORIOLIS
+file,date,latitude,longitude,ocean,profiler_type,institution,date_update
+"""
+
+SELECTIONS = [
+    ("bay of bengal", ["bay of bengal"], None, None),
+    ("pacific 2023 (wraps 180)", ["pacific ocean"], ("2023-01-01", "2023-12-31"), None),
+    ("atlantic, ocean A, Dec", ["atlantic ocean"], ("2023-12-01", "2023-12-31"), ["A"]),
+    ("all regions", ["bay of bengal", "arabian sea", "pacific ocean", "atlantic ocean", "indian ocean",
+                     "mediterranean sea", "arctic ocean"], None, None),
+]
+
+
+def write_synthetic_index(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 10 * 365 * 86400, rows), unit="s")
+    date_text = dates.strftime("%Y%m%d%H%M%S").to_numpy(dtype=object)
+    latitude = np.round(rng.uniform(-78, 89, rows), 3)
+    longitude = np.round(rng.uniform(-180, 180, rows), 3)
+    # Real indexes have a few profiles without a date or position
+    date_text[rng.random(rows) < 0.001] = ""
+    lat_text = latitude.astype(str).astype(object)
+    lon_text = longitude.astype(str).astype(object)
+    missing = rng.random(rows) < 0.001
+    lat_text[missing], lon_text[missing] = "", ""
+    ocean = rng.choice(np.array(["A", "I", "P"], dtype=object), rows)
+    institution = rng.choice(np.array(["AO", "IF", "IN", "JA", "CS", "BO"], dtype=object), rows)
+    platform = rng.integers(1900000, 7900000, rows)
+    files = [f"{i}/{p}/profiles/R{p}_{c:03d}.nc"
+             for i, p, c in zip(rng.choice(["aoml", "coriolis", "incois", "jma"], rows), platform,
+                                rng.integers(1, 300, rows))]
+    frame = pd.DataFrame({"file": files, "date": date_text, "latitude": lat_text, "longitude": lon_text,
+                          "ocean": ocean, "profiler_type": rng.choice([845, 846, 851, 869], rows),
+                          "institution": institution, "date_update": "20240101000000"})
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt") as f:
+        f.write(HEADER)
+        frame.to_csv(f, header=False, index=False)
+
+
+def reference(path, regions, time_range, oceans):
+    """The same selection with pandas over the text file"""
+    frame = pd.read_csv(path, comment="#", dtype={"date": str})
+    dates = pd.to_datetime(frame["date"], format="%Y%m%d%H%M%S", errors="coerce")
+    mask = np.zeros(len(frame), dtype=bool)
+    for region in regions:
+        (lat0, lat1), (lon0, lon1) = get_region_bounds(region)
+        lon = frame["longitude"]
+        if lon1 - lon0 >= 360:
+            inside_lon = lon.notna()
+        else:
+            inside_lon = ((lon >= lon0) & (lon <= lon1)) | ((lon + 360 >= lon0) & (lon + 360 <= lon1))
+        mask |= (frame["latitude"] >= lat0) & (frame["latitude"] <= lat1) & inside_lon
+    if time_range:
+        # Date-only ends include the whole day
+        mask &= (dates >= pd.Timestamp(time_range[0])) & (dates < pd.Timestamp(time_range[1]) + pd.Timedelta(days=1))
+    if oceans:
+        mask &= frame["ocean"].isin(oceans)
+    return sorted(frame.loc[mask, "file"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="index rows")
+    parser.add_argument("--gzip", action="store_true", help="write the index gzipped, as the GDAC serves it")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ar_index_global_prof.txt" + (".gz" if args.gzip else ""))
+        write_synthetic_index(path, args.rows)
+
+        start = time.perf_counter()
+        index = parse_index(path)
+        parse_seconds = time.perf_counter() - start
+        parquet = os.path.join(tmp, "index.parquet")
+        index_to_parquet(path, parquet)
+        start = time.perf_counter()
+        index = load_index(parquet)
+        load_seconds = time.perf_counter() - start
+
+        print(f"{args.rows:,} rows, {os.path.getsize(path) / 1e6:.1f} MB text → "
+              f"{os.path.getsize(parquet) / 1e6:.1f} MB Parquet, {index.nbytes / 1e6:.1f} MB in memory")
+        print(f"parse {parse_seconds:.2f}s ({args.rows / parse_seconds / 1e6:.2f} M rows/s), "
+              f"Parquet load {load_seconds * 1000:.0f} ms")
+        print(f"{'selection':<28}{'rows':>10}{'ms':>8}")
+        for label, regions, time_range, oceans in SELECTIONS:
+            start = time.perf_counter()
+            selected = select_profiles(index, regions, time_range, oceans)
+            ms = (time.perf_counter() - start) * 1000
+            assert sorted(file_list(selected)) == reference(path, regions, time_range, oceans), label
+            print(f"{label:<28}{selected.num_rows:>10,}{ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_layout.py
+"""Read amplification and latency per query type: default vs tuned NetCDF layout.
+
+Writes the same synthetic (time, depth, latitude, longitude) grid twice,
+once with xarray's defaults (contiguous, uncompressed) and once with
+nc_layout's chunked zlib/shuffle layout, then runs FloatChat's query shapes
+against both. Bytes read come from the process's read syscalls
+(/proc/self/io rchar), so they include HDF5 metadata and whole-chunk reads.
+
+    python benchmarks/bench_layout.py --resolution 1.0 --days 30
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_handler import filter_data  # noqa: E402
+from nc_layout import write_chunked_netcdf  # noqa: E402
+from vertical import DEPTH_LEVELS  # noqa: E402
+
+# (label, region, latest step only, depth)
+QUERIES = [
+    ("map bengal", "bay of bengal", True, None),
+    ("trend bengal", "bay of bengal", False, None),
+    ("map bengal 500 m", "bay of bengal", True, 500.0),
+    ("map 0-200 m arabian", "arabian sea", True, (0.0, 200.0)),
+    ("trend pacific", "pacific ocean", False, None),
+    ("map indian ocean", "indian ocean", True, None),
+]
+
+
+def synthetic_grid(resolution, days):
+    """Smooth, realistic-looking temperature field with a little noise"""
+    lats = np.arange(-80 + resolution / 2, 90, resolution)
+    lons = np.arange(-180 + resolution / 2, 180, resolution)
+    times = pd.date_range("2024-01-01", periods=days, freq="D")
+    rng = np.random.default_rng(0)
+    surface = 28 - 25 * (np.abs(lats)[:, None] / 90) ** 1.5 + np.zeros(len(lons))[None, :]
+    seasonal = np.sin(np.arange(days) / 365 * 2 * np.pi)[:, None, None] * 2
+    depth = DEPTH_LEVELS[None, :, None, None]
+    field = 2.5 + ((surface[None] + seasonal)[:, None] - 2.5) * np.exp(-depth / 300)
+    field = field + rng.normal(0, 0.05, field.shape)
+    return xr.Dataset(
+        {"temperature": (("time", "depth", "latitude", "longitude"), field.astype("float32"))},
+        coords={"time": times, "depth": DEPTH_LEVELS, "latitude": lats, "longitude": lons},
+    )
+
+
+def _rchar():
+    with open("/proc/self/io") as f:
+        for line in f:
+            if line.startswith("rchar:"):
+                return int(line.split()[1])
+    return 0
+
+
+def open_cost(path):
+    """Bytes read and seconds to open a file, paid once per process in the app"""
+    before, start = _rchar(), time.perf_counter()
+    xr.open_dataset(path).close()
+    return _rchar() - before, time.perf_counter() - start
+
+
+def run_query(path, region, latest, depth):
+    """Filter and materialise one query on a freshly opened file.
+
+    Returns (result bytes, bytes read, seconds), excluding the open itself.
+    """
+    with xr.open_dataset(path) as ds:
+        before, start = _rchar(), time.perf_counter()
+        if latest:
+            ds = ds.isel(time=[-1])
+        data = filter_data(ds, "temperature", region, depth=depth)
+        values = data.values
+        return values.nbytes, _rchar() - before, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolution", type=float, default=1.0, help="grid spacing in degrees")
+    parser.add_argument("--days", type=int, default=30, help="time steps")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query (median reported)")
+    args = parser.parse_args()
+
+    ds = synthetic_grid(args.resolution, args.days)
+    with tempfile.TemporaryDirectory() as tmp:
+        layouts = {"default": os.path.join(tmp, "default.nc"), "tuned": os.path.join(tmp, "tuned.nc")}
+        ds.to_netcdf(layouts["default"], engine="netcdf4")
+        write_chunked_netcdf(ds, layouts["tuned"])
+        for name, path in layouts.items():
+            read, seconds = open_cost(path)
+            print(f"{name:>8}: {os.path.getsize(path) / 1e6:8.2f} MB on disk, "
+                  f"open reads {read / 1024:.0f} KB in {seconds * 1000:.1f} ms")
+        print()
+        print(f"{'query':<22}{'layout':>9}{'needed KB':>11}{'read KB':>11}{'amplif.':>9}{'ms':>9}")
+        for label, region, latest, depth in QUERIES:
+            for name, path in layouts.items():
+                runs = [run_query(path, region, latest, depth) for _ in range(args.repeat)]
+                needed, read = runs[0][0], statistics.median(r[1] for r in runs)
+                ms = statistics.median(r[2] for r in runs) * 1000
+                print(f"{label:<22}{name:>9}{needed / 1024:>11.1f}{read / 1024:>11.1f}"
+                      f"{read / max(needed, 1):>9.1f}{ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
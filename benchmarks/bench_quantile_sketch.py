@@ -0,0 +1,64 @@
+# benchmarks/bench_quantile_sketch.py
+"""Quantile sketch accuracy, memory and merge time versus an exact sort.
+
+Splits a synthetic, skewed stream of measurements into monthly chunks,
+sketches each chunk (as ingestion does), merges them all (as a query
+does) and compares median, p90 and IQR with np.percentile over the raw
+values. Reports the worst rank error next to the sketch's own ~95% bound,
+items kept versus values seen, and the time to merge versus the time to
+sort.
+
+    python benchmarks/bench_quantile_sketch.py --sizes 10000 1000000 10000000 --chunks 120
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from quantile_sketch import QuantileSketch, SKETCH_K  # noqa: E402
+
+QUANTILES = np.array([25.0, 50.0, 75.0, 90.0])
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def merge_all(sketches):
+    merged = QuantileSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--chunks", type=int, default=120, help="monthly chunks (10 years)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"k = {SKETCH_K}, {args.chunks} chunks")
+    print(f"{'values':>11}{'kept':>7}{'rank err':>10}{'bound':>8}{'IQR err':>9}{'merge s':>9}{'sort s':>8}")
+    for size in args.sizes:
+        values = 4 + rng.gamma(2.0, 3.0, size)
+        chunks = [QuantileSketch().update(chunk) for chunk in np.array_split(values, args.chunks)]
+        merged, merge_s = timed(lambda: merge_all(chunks))
+        exact, sort_s = timed(lambda: np.percentile(values, QUANTILES))
+        approx = merged.quantiles(QUANTILES)
+        ranks = np.searchsorted(np.sort(values), approx) / size
+        rank_error = np.abs(ranks - QUANTILES / 100).max()
+        iqr_error = abs((approx[2] - approx[0]) - (exact[2] - exact[0])) / (exact[2] - exact[0])
+        print(f"{size:>11,}{merged.size():>7}{rank_error:>10.2%}{merged.rank_error():>8.2%}"
+              f"{iqr_error:>9.2%}{merge_s:>9.3f}{sort_s:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
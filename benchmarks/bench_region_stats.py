@@ -0,0 +1,83 @@
+# benchmarks/bench_region_stats.py
+"""All-region statistics: one bincount pass vs. seven filter_data calls.
+
+On a synthetic global grid, times filter_data + get_enhanced_stats for one
+region and for every region (the old way to "compare all oceans"), and
+region_stats.all_region_stats cold (building the table for every time
+step, once per dataset version) and warm (a time window over the cached
+table). Results are checked against each other.
+
+    python benchmarks/bench_region_stats.py --resolution 0.5 --times 60
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_handler import filter_data, get_enhanced_stats  # noqa: E402
+from region_stats import all_region_stats  # noqa: E402
+from regions import REGION_BOUNDS  # noqa: E402
+
+
+def make_dataset(resolution, times):
+    rng = np.random.default_rng(0)
+    lat = np.arange(-80, 90, resolution)
+    lon = np.arange(0, 360, resolution)
+    shape = (times, len(lat), len(lon))
+    values = 28 * np.cos(np.deg2rad(lat))[None, :, None] ** 2 + rng.normal(0, 1, shape)
+    values[:, rng.random(shape[1:]) < 0.3] = np.nan  # land
+    return xr.Dataset({"temperature": (("time", "latitude", "longitude"), values.astype("float32"))},
+                      coords={"time": pd.date_range("2020-01-01", periods=times, freq="D"),
+                              "latitude": lat, "longitude": lon},
+                      attrs={"version": "bench"})
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def per_region(ds, regions, time_range=None):
+    return {region: get_enhanced_stats(filter_data(ds, "temperature", region, time_range), region)
+            for region in regions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolution", type=float, default=0.5)
+    parser.add_argument("--times", type=int, default=60)
+    args = parser.parse_args()
+
+    ds = make_dataset(args.resolution, args.times)
+    regions = list(REGION_BOUNDS)
+    window = (ds.time.values[10], ds.time.values[40])
+    print(f"grid {dict(ds.sizes)}")
+
+    _, one_s = timed(lambda: per_region(ds, regions[:1], window))
+    reference, seven_s = timed(lambda: per_region(ds, regions, window))
+    _, seven_full_s = timed(lambda: per_region(ds, regions))
+    _, cold_s = timed(lambda: all_region_stats(ds, "temperature"))
+    stats, warm_s = timed(lambda: all_region_stats(ds, "temperature", window))
+
+    worst = max(abs(stats[r][k] - reference[r][k]) for r in regions for k in ("mean", "std", "min", "max"))
+    counts_match = all(stats[r]["data_points"] == reference[r]["data_points"] for r in regions)
+    print(f"max difference {worst:.1e}; counts match: {counts_match}")
+    print(f"{'method':<34}{'seconds':>9}")
+    for name, seconds in (("filter_data + stats, one region", one_s),
+                          ("filter_data + stats, all regions", seven_s),
+                          ("  ... over all time steps", seven_full_s),
+                          ("all_region_stats, cold (all steps)", cold_s),
+                          ("all_region_stats, cached table", warm_s)):
+        print(f"{name:<34}{seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_shared_dataset.py
+"""Memory of N app workers: private dataset copies vs. one shared copy.
+
+Builds a synthetic grid, then starts N worker processes that each answer
+a query touching every value (a full-grid mean of each variable), first
+with their own in-memory copy (what load_ocean_data gives every worker
+today), then attached to a copy published with shared_dataset.publish.
+Reports each worker's PSS (resident memory with shared pages split between
+the processes mapping them) from /proc, so the shared copy counts once.
+
+    python benchmarks/bench_shared_dataset.py --workers 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from shared_dataset import publish  # noqa: E402
+
+WORKER = r"""
+import sys, time
+sys.path.insert(0, {root!r})
+import xarray as xr
+if {shared!r}:
+    from shared_dataset import SharedDataset
+    ds = SharedDataset({path!r}).current
+else:
+    ds = xr.load_dataset({path!r})
+for name in ds.data_vars:
+    float(ds[name].mean())
+print("ready", flush=True)
+time.sleep(60)
+"""
+
+
+def make_dataset(times, depths, lats, lons):
+    rng = np.random.default_rng(0)
+    shape = (times, depths, lats, lons)
+    coords = {"time": pd.date_range("2020-01-01", periods=times, freq="MS"),
+              "depth": np.linspace(0, 2000, depths), "latitude": np.linspace(-30, 30, lats),
+              "longitude": np.linspace(40, 100, lons)}
+    dims = ("time", "depth", "latitude", "longitude")
+    return xr.Dataset({"temperature": (dims, rng.normal(20, 5, shape).astype("float32")),
+                       "salinity": (dims, rng.normal(35, 1, shape).astype("float32"))},
+                      coords=coords, attrs={"version": "bench"})
+
+
+def pss_mb(pid):
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def run_workers(count, path, shared):
+    code = WORKER.format(root=ROOT, path=path, shared=shared)
+    start = time.perf_counter()
+    procs = [subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+             for _ in range(count)]
+    try:
+        for proc in procs:
+            for line in proc.stdout:
+                if line.strip() == "ready":
+                    break
+        seconds = time.perf_counter() - start
+        return [pss_mb(proc.pid) for proc in procs], seconds
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--times", type=int, default=24)
+    parser.add_argument("--depths", type=int, default=40)
+    args = parser.parse_args()
+
+    ds = make_dataset(args.times, args.depths, 121, 121)
+    data_mb = sum(v.nbytes for v in ds.data_vars.values()) / 2**20
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory(dir=base) as shared_root:
+        private_path = os.path.join(tmp, "grid.nc")
+        ds.to_netcdf(private_path)
+        # The tmpfs pages workers map are counted in their PSS, split between them
+        publish(ds, shared_root)
+
+        print(f"dataset {data_mb:.0f} MB, {args.workers} workers")
+        print(f"{'mode':<10}{'PSS/worker MB':>15}{'total MB':>10}{'startup s':>11}")
+        for mode, path, shared in (("private", private_path, False), ("shared", shared_root, True)):
+            pss, seconds = run_workers(args.workers, path, shared)
+            print(f"{mode:<10}{np.mean(pss):>15.1f}{sum(pss):>10.1f}{seconds:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_slab_read.py
+"""Per-query filter_data latency: h5py hyperslab fast path vs the xarray path.
+
+Both paths run against the same open dataset; the xarray path is forced by
+hiding the dataset's source file. Results are checked to be identical.
+
+    python benchmarks/bench_slab_read.py --repeat 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_layout import synthetic_grid  # noqa: E402
+from data_handler import filter_data  # noqa: E402
+from nc_layout import write_chunked_netcdf  # noqa: E402
+
+# (label, parameter, region, depth)
+QUERIES = [
+    ("bengal surface", "temperature", "bay of bengal", None),
+    ("bengal 500 m", "temperature", "bay of bengal", 500.0),
+    ("arabian 0-200 m", "temperature", "arabian sea", (0.0, 200.0)),
+    ("indian ocean surface", "temperature", "indian ocean", None),
+]
+
+
+def timed(fn, repeat):
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def xarray_path(ds, *args):
+    """filter_data with the fast path disabled"""
+    source = ds.encoding.pop("source")
+    try:
+        return filter_data(ds, *args)
+    finally:
+        ds.encoding["source"] = source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolution", type=float, default=1.0, help="grid spacing in degrees")
+    parser.add_argument("--days", type=int, default=30, help="time steps")
+    parser.add_argument("--repeat", type=int, default=100, help="runs per query (median reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_chunked_netcdf(synthetic_grid(args.resolution, args.days), os.path.join(tmp, "grid.nc"))
+        with xr.open_dataset(path) as ds:
+            print(f"{'query':<22}{'xarray ms':>11}{'h5py ms':>10}{'ratio':>8}")
+            for label, parameter, region, depth in QUERIES:
+                fast = filter_data(ds, parameter, region, None, depth)
+                slow = xarray_path(ds, parameter, region, None, depth)
+                assert fast.shape == slow.shape and np.allclose(fast.values, slow.values, equal_nan=True)
+                slow_ms = timed(lambda: xarray_path(ds, parameter, region, None, depth), args.repeat)
+                fast_ms = timed(lambda: filter_data(ds, parameter, region, None, depth), args.repeat)
+                print(f"{label:<22}{slow_ms:>11.2f}{fast_ms:>10.2f}{fast_ms / slow_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
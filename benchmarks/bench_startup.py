@@ -0,0 +1,127 @@
+# benchmarks/bench_startup.py
+"""Cold-start cost of the Streamlit app, with a time budget.
+
+Each sample is a fresh Python process (a cold worker) that runs app.py once
+through Streamlit's AppTest on the Dashboard page and records:
+
+  first paint   seconds from the start of the script run to the first
+                page element being sent to the browser
+  first run     seconds for the whole first script run (data loaded)
+  chat query    seconds for the first chart query on the Chatbot page
+
+The median of each is compared with its budget, and none of
+DEFERRED_MODULES may be imported by first paint; the script exits non-zero
+otherwise. tests/test_startup.py runs the same check under pytest.
+--importtime also prints the slowest modules imported before first paint
+(python -X importtime).
+
+    python benchmarks/bench_startup.py --samples 3
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Seconds, on one core; cold means a fresh process, but with a warm OS file cache
+BUDGETS = {"first_paint": 0.5, "first_run": 4.0, "chat_query": 4.0}
+
+# Heavy stacks app.py imports on first use; loading one before first paint is a regression
+# (Streamlit itself imports plotly for its chart theme, so what it loads doesn't count)
+DEFERRED_MODULES = ("xarray", "plotly", "scipy")
+
+SAMPLE = r"""
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+os.chdir({root!r})
+from streamlit.delta_generator import DeltaGenerator
+from streamlit.testing.v1 import AppTest
+
+# Loaded by Streamlit before app.py runs at all
+baseline = set(sys.modules)
+marks, loaded = {{}}, []
+enqueue = DeltaGenerator._enqueue
+def timed_enqueue(self, *args, **kwargs):
+    # The CSS block is sent first but paints nothing; count the first visible element
+    if "first_paint" not in marks and "<style>" not in str(args[1]):
+        marks["first_paint"] = time.perf_counter()
+        loaded.extend(m for m in {deferred!r} if m in sys.modules and m not in baseline)
+    return enqueue(self, *args, **kwargs)
+DeltaGenerator._enqueue = timed_enqueue
+
+app = AppTest.from_file("app.py", default_timeout=120)
+start = time.perf_counter()
+app.run()
+marks["first_run"] = time.perf_counter()
+assert not app.exception, app.exception
+app.session_state.page = "Chatbot"
+app.run()
+before = time.perf_counter()
+app.chat_input[0].set_value("show temperature in bay of bengal").run()
+# generate_response sleeps 0.8 s on purpose for the loading spinners
+marks["chat_query"] = time.perf_counter() - before - 0.8 + start
+assert not app.exception, app.exception
+print(json.dumps(dict({{name: mark - start for name, mark in marks.items()}}, loaded_before_paint=loaded)))
+"""
+
+
+def sample(env):
+    out = subprocess.run([sys.executable, "-c", SAMPLE.format(root=ROOT, deferred=DEFERRED_MODULES)],
+                         capture_output=True, text=True, env=env, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(top):
+    """Slowest non-stdlib imports of app.py before it renders (cumulative microseconds)"""
+    code = ("import re, sys; src = open('app.py').read(); "
+            "head = src[:src.index('st.set_page_config')]; "
+            "exec(compile(head, 'app.py', 'exec'))")
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                         cwd=ROOT, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        # Only modules imported directly by app.py's header, not their dependencies
+        if match and len(match.group(2)) <= 2 and match.group(3).split(".")[0] not in sys.stdlib_module_names:
+            rows.append((int(match.group(1)), match.group(3)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=3, help="cold processes to start (median reported)")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest pre-render imports")
+    args = parser.parse_args()
+
+    # No JSON API port clashes between samples
+    env = dict(os.environ, FLOATCHAT_API_PORT="0")
+    runs = [sample(env) for _ in range(args.samples)]
+    over = []
+    print(f"{'metric':<14}{'median s':>10}{'budget s':>10}")
+    for name, budget in BUDGETS.items():
+        value = statistics.median(run[name] for run in runs)
+        print(f"{name:<14}{value:>10.2f}{budget:>10.2f}{'  OVER' if value > budget else ''}")
+        if value > budget:
+            over.append(name)
+    early = sorted({m for run in runs for m in run["loaded_before_paint"]})
+    if early:
+        print(f"imported before first paint: {', '.join(early)}")
+        over.append("deferred imports")
+
+    if args.importtime:
+        print("\nslowest imports before first paint:")
+        for micros, module in slowest_imports(10):
+            print(f"  {micros / 1e6:6.3f}s  {module}")
+
+    if over:
+        print(f"❌ Over budget: {', '.join(over)}")
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_surface.py
+"""3D surface figure size and build time versus grid size.
+
+For Pacific-sized grids at several resolutions, compares the previous
+create_3d_surface_plot (full float64 z plus 2-D meshgrid x and y) with the
+current one (float32 z on 1-D axes, block-averaged to the vertex budget).
+Reports vertices sent, figure JSON bytes and the time to build and
+serialise the figure.
+
+    python benchmarks/bench_surface.py --resolutions 1 0.5 0.25 0.1
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+import xarray as xr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chart_maker import create_3d_surface_plot, SURFACE_VERTEX_BUDGET  # noqa: E402
+
+
+def make_grid(resolution):
+    lat = np.arange(-40, 60 + resolution / 2, resolution)
+    lon = np.arange(120, 240 + resolution / 2, resolution)
+    la, lo = np.meshgrid(np.deg2rad(lat), np.deg2rad(lon), indexing="ij")
+    z = 28 * np.cos(la) ** 2 + 1.5 * np.sin(6 * lo) * np.cos(5 * la)
+    return xr.DataArray(z, dims=("latitude", "longitude"), coords={"latitude": lat, "longitude": lon})
+
+
+def meshgrid_surface(data):
+    """The previous create_3d_surface_plot"""
+    lon_mesh, lat_mesh = np.meshgrid(data.longitude.values, data.latitude.values)
+    return go.Figure(data=[go.Surface(z=data.values, x=lon_mesh, y=lat_mesh, colorscale="Viridis")])
+
+
+def measure(build, data):
+    start = time.perf_counter()
+    fig = build(data)
+    payload = fig.to_json()
+    seconds = time.perf_counter() - start
+    vertices = np.asarray(fig.data[0].z).size
+    return vertices, len(payload), seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolutions", type=float, nargs="+", default=[1.0, 0.5, 0.25, 0.1])
+    args = parser.parse_args()
+
+    # Warm up Plotly's validators so the first row isn't charged for them
+    measure(meshgrid_surface, make_grid(5.0))
+    print(f"vertex budget {SURFACE_VERTEX_BUDGET:,}")
+    print(f"{'grid':>12}{'old MB':>9}{'old s':>8}{'new verts':>11}{'new MB':>9}{'new s':>8}")
+    for resolution in args.resolutions:
+        data = make_grid(resolution)
+        _, old_bytes, old_s = measure(meshgrid_surface, data)
+        vertices, new_bytes, new_s = measure(lambda d: create_3d_surface_plot(d, "bench"), data)
+        print(f"{data.shape[0]:>5}×{data.shape[1]:<6}{old_bytes / 2**20:>9.2f}{old_s:>8.3f}"
+              f"{vertices:>11,}{new_bytes / 2**20:>9.2f}{new_s:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# bulk_fetch.py
+"""Pooled, concurrent fetching of Argo GDAC file lists.
+
+Files are fetched by a bounded pool of threads sharing one requests.Session,
+so connections to each host are kept alive and reused instead of set up
+per file. Every file goes through downloader.download_file (streaming,
+resume, validation); transient failures are retried with exponential
+backoff, and requests to each host are spaced to a rate limit. Fetched
+files land in a directory tree that argo_ingest picks up incrementally.
+
+    python bulk_fetch.py filelist.txt --dest argo_files --workers 8 --rate 10 --ingest
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+from argo_ingest import ingest_directory, PROFILE_STORE_DIR
+from downloader import download_file, looks_like_netcdf, DownloadError
+
+GDAC_URL = "https://data-argo.ifremer.fr/dac/"
+
+DEFAULT_WORKERS = 8
+
+# Requests per second per host; polite for the public GDAC mirrors
+DEFAULT_RATE = 10.0
+
+RETRY_ATTEMPTS = 4
+
+
+class HostRateLimiter:
+    """Spaces requests to each host at least 1/rate seconds apart, across threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def make_session(workers=DEFAULT_WORKERS):
+    """Session whose connection pool keeps one connection per worker alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _url_and_dest(entry, base_url, dest_root):
+    """A list entry is a full URL or a path relative to base_url; it keeps that path locally.
+
+    Raises ValueError for a path that names no file or climbs out of dest_root with "..".
+    """
+    url = entry if "://" in entry else base_url.rstrip("/") + "/" + entry.lstrip("/")
+    relative = urlsplit(url).path.lstrip("/") if "://" in entry else entry.lstrip("/")
+    parts = relative.replace("\\", "/").split("/")
+    if ".." in parts or not parts[-1]:
+        raise ValueError(f"Unsafe or empty path in file list: {entry}")
+    return url, os.path.join(dest_root, relative)
+
+
+def _fetch_one(session, limiter, url, dest, attempts):
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    host = urlsplit(url).netloc
+    retrying = Retrying(stop=stop_after_attempt(attempts),
+                        wait=wait_exponential(multiplier=0.5, max=8),
+                        retry=retry_if_exception(lambda e: isinstance(e, DownloadError) and e.retryable),
+                        reraise=True)
+    for attempt in retrying:
+        with attempt:
+            limiter.wait(host)
+            return download_file(url, dest, session=session)
+
+
+def fetch_files(entries, dest_root, base_url=GDAC_URL, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+                attempts=RETRY_ATTEMPTS, refresh=False):
+    """Fetch many files concurrently into dest_root, mirroring their paths.
+
+    Files already present (and valid NetCDF) are skipped unless refresh.
+    Entries with unsafe paths, and files that fail to download or to be
+    written, are counted as failed with their error; the rest still run.
+    Returns a summary dict with counts, failures and throughput.
+    """
+    start = time.perf_counter()
+    entries = [entry.strip() for entry in entries if entry.strip()]
+    jobs, errors = [], {}
+    for entry in entries:
+        try:
+            jobs.append(_url_and_dest(entry, base_url, dest_root))
+        except ValueError as e:
+            errors[entry] = str(e)
+            print(f"⚠️  {e}")
+    todo = [(url, dest) for url, dest in jobs if refresh or not looks_like_netcdf(dest)]
+    summary = {"requested": len(entries), "skipped": len(jobs) - len(todo), "fetched": 0,
+               "failed": len(errors), "bytes": 0, "errors": errors}
+
+    limiter = HostRateLimiter(rate)
+    with make_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_fetch_one, session, limiter, url, dest, attempts): url for url, dest in todo}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except (DownloadError, OSError) as e:
+                # OSError: the file couldn't be written (disk full, permissions, a file in the way)
+                summary["failed"] += 1
+                summary["errors"][futures[future]] = str(e)
+                print(f"⚠️  {e}")
+                continue
+            summary["fetched"] += 1
+            summary["bytes"] += result["received"]
+
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = round(elapsed, 3)
+    summary["files_per_second"] = round(summary["fetched"] / elapsed, 1) if elapsed else 0.0
+    summary["mb_per_second"] = round(summary["bytes"] / 1e6 / elapsed, 2) if elapsed else 0.0
+    return summary
+
+
+def fetch_and_ingest(entries, dest_root, store=PROFILE_STORE_DIR, ingest_workers=None, **fetch_options):
+    """Fetch a file list, then ingest whatever is new under dest_root into the profile store"""
+    fetched = fetch_files(entries, dest_root, **fetch_options)
+    return fetched, ingest_directory(dest_root, store, ingest_workers)
+
+
+def read_file_list(path):
+    """One GDAC path or URL per line; blank lines and # comments are ignored"""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch a list of Argo GDAC files with pooled, concurrent downloads")
+    parser.add_argument("file_list", help="text file with one GDAC path (relative to --base-url) or URL per line")
+    parser.add_argument("--dest", default="argo_files", help="directory the files are mirrored into")
+    parser.add_argument("--base-url", default=GDAC_URL, help="prefix for relative paths")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent downloads")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="max requests per second per host (0: unlimited)")
+    parser.add_argument("--refresh", action="store_true", help="re-download files that already exist")
+    parser.add_argument("--ingest", action="store_true", help="ingest the fetched files into the profile store")
+    parser.add_argument("--store", default=PROFILE_STORE_DIR, help="profile store directory (with --ingest)")
+    args = parser.parse_args()
+
+    options = dict(base_url=args.base_url, workers=args.workers, rate=args.rate, refresh=args.refresh)
+    entries = read_file_list(args.file_list)
+    if args.ingest:
+        summary, ingested = fetch_and_ingest(entries, args.dest, args.store, **options)
+    else:
+        summary, ingested = fetch_files(entries, args.dest, **options), None
+    print(f"✅ Fetched {summary['fetched']} of {summary['requested']} files "
+          f"({summary['skipped']} already present, {summary['failed']} failed), "
+          f"{summary['bytes'] / 1e6:.2f} MB in {summary['seconds']:.2f}s "
+          f"→ {summary['files_per_second']} files/s, {summary['mb_per_second']} MB/s")
+    if ingested:
+        print(f"✅ Ingested {ingested['ingested']} files, {ingested['rows']:,} rows into {args.store}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
 # chart_maker.py
 import plotly.graph_objects as go
-import plotly.express as px
+from plotly.colors import sample_colorscale
 import numpy as np
 import pandas as pd
 
-def create_temperature_map(data, title="Ocean Temperature"):
-    """Create an interactive temperature heatmap"""
+from contours import contour_lines
+from gridding import decimate_grid
+from timeseries import weighted_series, rolling_mean
+
+def create_temperature_map(data, title="Ocean Temperature", markers=None):
+    """Create an interactive temperature heatmap.
+
+    markers (a DataFrame of latitude, longitude, value) are drawn over it,
+    e.g. the cells picked by a threshold or hotspot query.
+    """
     try:
         # Get the most recent time slice
         if len(data.shape) == 3:  # time, lat, lon
@@ -26,6 +34,16 @@ def create_temperature_map(data, title="Ocean Temperature"):
             colorbar=dict(title="Temperature (°C)"),
             hovertemplate='Longitude: %{x}<br>Latitude: %{y}<br>Temperature: %{z:.2f}°C<extra></extra>'
         ))
+        if markers is not None and len(markers):
+            fig.add_trace(go.Scatter(
+                x=markers['longitude'],
+                y=markers['latitude'],
+                customdata=markers['value'],
+                mode='markers',
+                name='Matches',
+                marker=dict(size=9, color='rgba(0,0,0,0)', line=dict(color='#d62728', width=2)),
+                hovertemplate='Longitude: %{x}<br>Latitude: %{y}<br>Value: %{customdata:.2f}<extra></extra>'
+            ))
         
         fig.update_layout(
             title=title,
@@ -42,30 +60,33 @@ def create_temperature_map(data, title="Ocean Temperature"):
         print(f"❌ Error creating temperature map: {e}")
         return None
 
-def create_simple_line_chart(data, title="Ocean Data Trend"):
-    """Create a simple line chart showing data over time"""
+def create_simple_line_chart(data, title="Ocean Data Trend", window=None):
+    """Create a simple line chart showing data over time.
+
+    data is a DataArray (averaged over the region with cos(latitude) area
+    weights) or an already computed pd.Series. window adds a rolling mean
+    over that many time steps.
+    """
     try:
-        # Calculate average over space for each time step
-        if len(data.shape) == 3:  # time, lat, lon
-            time_series = data.mean(dim=['latitude', 'longitude'])
-        else:
-            time_series = data.mean()
-            
-        # Get time coordinates
-        if hasattr(data, 'time'):
-            times = data.time.values
-        else:
-            times = pd.date_range('2024-01-01', periods=len(time_series), freq='D')
-            
+        time_series = data if isinstance(data, pd.Series) else weighted_series(data)
+
         fig = go.Figure()
         fig.add_trace(go.Scatter(
-            x=times,
+            x=time_series.index,
             y=time_series.values,
             mode='lines+markers',
-            name='Average Value',
+            name='Area-weighted Average',
             line=dict(color='#006989', width=3),
             marker=dict(size=6)
         ))
+        if window and window > 1 and len(time_series) >= window:
+            fig.add_trace(go.Scatter(
+                x=time_series.index,
+                y=rolling_mean(time_series, window).values,
+                mode='lines',
+                name=f'{window}-step Rolling Mean',
+                line=dict(color='#004d66', width=3, dash='dash')
+            ))
         
         fig.update_layout(
             title=title,
@@ -112,8 +133,110 @@ def create_stats_chart(stats, parameter="Temperature"):
         print(f"❌ Error creating stats chart: {e}")
         return None
 
-def create_3d_surface_plot(data, title="Ocean Data 3D View"):
-    """Create a 3D surface plot of ocean data"""
+def create_regions_chart(stats, parameter="Temperature", unit="°C"):
+    """Compare every region: mean ± std bars with min/max markers.
+
+    stats is {region: stats dict}, as from region_stats.all_region_stats.
+    """
+    try:
+        regions = list(stats)
+        names = [region.title() for region in regions]
+        means = [stats[r]['mean'] for r in regions]
+        
+        fig = go.Figure()
+        fig.add_trace(go.Bar(
+            x=names,
+            y=means,
+            error_y=dict(type='data', array=[stats[r]['std'] for r in regions], color='#004d66'),
+            marker_color='#006989',
+            name='Average ± std',
+            text=[f'{v:.2f}' for v in means],
+            textposition='inside',
+            hovertemplate='%{x}<br>Average: %{y:.2f}' + unit + '<extra></extra>'
+        ))
+        for key, label, symbol in (('min', 'Minimum', 'triangle-down'), ('max', 'Maximum', 'triangle-up')):
+            fig.add_trace(go.Scatter(
+                x=names,
+                y=[stats[r][key] for r in regions],
+                mode='markers',
+                name=label,
+                marker=dict(symbol=symbol, size=11, color='#004d66'),
+                hovertemplate='%{x}<br>' + label + ': %{y:.2f}' + unit + '<extra></extra>'
+            ))
+        
+        fig.update_layout(
+            title=f"{parameter} Across All Regions",
+            yaxis_title=f"{parameter} ({unit})",
+            width=800,
+            height=450,
+            font=dict(color="#006989")
+        )
+        
+        return fig
+        
+    except Exception as e:
+        print(f"❌ Error creating regions chart: {e}")
+        return None
+
+def create_distribution_chart(summary, title="Ocean Data Distribution", unit="°C"):
+    """Histogram with a box plot above it and percentile lines.
+
+    summary is a distributions.summarize dict: bin counts and edges,
+    percentiles and fences, so nothing is recomputed from raw cells.
+    """
+    try:
+        from plotly.subplots import make_subplots
+
+        edges = summary['edges']
+        centers = (edges[:-1] + edges[1:]) / 2
+        p = summary['percentiles']
+
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.03)
+        fig.add_trace(go.Box(
+            q1=[p[25]], median=[p[50]], q3=[p[75]],
+            lowerfence=[summary['fences'][0]], upperfence=[summary['fences'][1]],
+            y=['Box'], orientation='h',
+            marker_color='#006989',
+            name='Quartiles',
+            showlegend=False
+        ), row=1, col=1)
+        fig.add_trace(go.Bar(
+            x=centers,
+            y=summary['counts'],
+            width=summary['bin_width'],
+            marker_color='#006989',
+            name='Cells',
+            hovertemplate='%{x:.2f}' + unit + '<br>%{y:,} cells<extra></extra>'
+        ), row=2, col=1)
+        for q, value in p.items():
+            fig.add_vline(x=value, line=dict(color='#004d66', dash='solid' if q == 50 else 'dot', width=1),
+                          annotation_text=f'p{q}', annotation_position='top', row=2, col=1)
+
+        fig.update_layout(
+            title=title,
+            xaxis2_title=f"Value ({unit})",
+            yaxis2_title="Grid cells",
+            bargap=0,
+            width=800,
+            height=500,
+            font=dict(color="#006989")
+        )
+
+        return fig
+
+    except Exception as e:
+        print(f"❌ Error creating distribution chart: {e}")
+        return None
+
+# Most surface vertices sent to the browser; WebGL stalls well beyond this
+SURFACE_VERTEX_BUDGET = 40_000
+
+def create_3d_surface_plot(data, title="Ocean Data 3D View", max_vertices=SURFACE_VERTEX_BUDGET):
+    """Create a 3D surface plot of ocean data.
+
+    Larger grids are block-averaged down to max_vertices; the surface is
+    sent as float32 values on 1-D longitude/latitude axes.
+    """
     try:
         # Get the most recent time slice
         if len(data.shape) == 3:
@@ -125,13 +248,12 @@ def create_3d_surface_plot(data, title="Ocean Data 3D View"):
         lats = data.latitude.values if hasattr(data, 'latitude') else np.linspace(5, 25, latest_data.shape[0])
         lons = data.longitude.values if hasattr(data, 'longitude') else np.linspace(80, 100, latest_data.shape[1])
         
-        # Create meshgrid for 3D plotting
-        lon_mesh, lat_mesh = np.meshgrid(lons, lats)
+        z, lons, lats = decimate_grid(np.asarray(latest_data), lons, lats, max_vertices)
         
         fig = go.Figure(data=[go.Surface(
-            z=latest_data.values,
-            x=lon_mesh,
-            y=lat_mesh,
+            z=z.astype('float32'),
+            x=lons.astype('float32'),
+            y=lats.astype('float32'),
             colorscale='Viridis',
             hovertemplate='Longitude: %{x:.2f}°<br>Latitude: %{y:.2f}°<br>Value: %{z:.2f}<extra></extra>'
         )])
@@ -156,8 +278,12 @@ def create_3d_surface_plot(data, title="Ocean Data 3D View"):
         return None
 
 
-def create_contour_map(data, title="Ocean Data Contours"):
-    """Create a contour map with isolines"""
+def create_contour_map(data, title="Ocean Data Contours", lines=None):
+    """Create a contour map with isolines.
+
+    Contours are traced on the server (see contours.py) and sent as one
+    line trace per level; lines is a precomputed {level: [polylines]}.
+    """
     try:
         # Get the most recent time slice
         if len(data.shape) == 3:
@@ -168,26 +294,48 @@ def create_contour_map(data, title="Ocean Data Contours"):
         # Get coordinates
         lats = data.latitude.values if hasattr(data, 'latitude') else np.linspace(5, 25, latest_data.shape[0])
         lons = data.longitude.values if hasattr(data, 'longitude') else np.linspace(80, 100, latest_data.shape[1])
+        if lines is None:
+            lines = contour_lines(np.asarray(latest_data), lons, lats)
         
         fig = go.Figure()
-        
-        # Add filled contours
-        fig.add_trace(go.Contour(
-            z=latest_data.values,
-            x=lons,
-            y=lats,
-            colorscale='Viridis',
-            contours=dict(
-                showlabels=True,
-                labelfont=dict(size=12, color='white')
-            ),
-            hovertemplate='Longitude: %{x:.2f}°<br>Latitude: %{y:.2f}°<br>Value: %{z:.2f}<extra></extra>'
-        ))
+        levels = sorted(lines)
+        colors = sample_colorscale('Viridis', [i / max(len(levels) - 1, 1) for i in range(len(levels))])
+        labels = []
+        for level, color in zip(levels, colors):
+            if not lines[level]:
+                continue
+            # All of a level's lines in one trace, separated by gaps
+            joined = np.concatenate([np.vstack([line, [np.nan, np.nan]]) for line in lines[level]])
+            fig.add_trace(go.Scatter(
+                x=np.round(joined[:, 0], 3),
+                y=np.round(joined[:, 1], 3),
+                mode='lines',
+                name=f"{level:g}",
+                line=dict(color=color, width=2),
+                hovertemplate=f'Value: {level:g}<br>Longitude: %{{x:.2f}}°<br>Latitude: %{{y:.2f}}°<extra></extra>'
+            ))
+            longest = max(lines[level], key=len)
+            labels.append((*longest[len(longest) // 2], level))
+
+        # Level labels at the middle of each level's longest line
+        if labels:
+            fig.add_trace(go.Scatter(
+                x=[x for x, _, _ in labels],
+                y=[y for _, y, _ in labels],
+                text=[f"{level:g}" for _, _, level in labels],
+                mode='text',
+                textfont=dict(size=12, color='#006989'),
+                showlegend=False,
+                hoverinfo='skip'
+            ))
         
         fig.update_layout(
             title=f"📈 {title} - Contour Map",
             xaxis_title="Longitude (°)",
             yaxis_title="Latitude (°)",
+            xaxis=dict(range=[float(lons.min()), float(lons.max())]),
+            yaxis=dict(range=[float(lats.min()), float(lats.max())]),
+            legend_title_text="Level",
             width=800,
             height=600,
             font=dict(color="#006989")
@@ -264,6 +412,70 @@ def create_comparison_chart(temp_data, salt_data, region_name):
         return None
 
 
+def create_float_map(floats, center_lat, center_lon, title="Nearby Argo Floats", radius_km=None):
+    """Create a map of floats around a query point, optionally with the search radius"""
+    try:
+        fig = go.Figure()
+        
+        # Search radius as a great-circle ring around the query point
+        if radius_km:
+            bearing = np.radians(np.linspace(0, 360, 121))
+            angular = radius_km / 6371.0088
+            lat0, lon0 = np.radians(center_lat), np.radians(center_lon)
+            ring_lat = np.arcsin(np.sin(lat0) * np.cos(angular) + np.cos(lat0) * np.sin(angular) * np.cos(bearing))
+            ring_lon = lon0 + np.arctan2(np.sin(bearing) * np.sin(angular) * np.cos(lat0),
+                                         np.cos(angular) - np.sin(lat0) * np.sin(ring_lat))
+            fig.add_trace(go.Scattergeo(
+                lat=np.degrees(ring_lat),
+                lon=np.degrees(ring_lon),
+                mode='lines',
+                line=dict(color='#006989', width=1, dash='dash'),
+                name=f'{radius_km:g} km radius',
+                hoverinfo='skip'
+            ))
+        
+        fig.add_trace(go.Scattergeo(
+            lat=floats['latitude'],
+            lon=floats['longitude'],
+            mode='markers',
+            marker=dict(size=9, color=floats['distance_km'], colorscale='Viridis',
+                        colorbar=dict(title="Distance (km)")),
+            text=[f"Float {p}" for p in floats['platform_number']],
+            customdata=floats['distance_km'],
+            name='Floats',
+            hovertemplate='%{text}<br>Lat: %{lat:.2f}°<br>Lon: %{lon:.2f}°<br>Distance: %{customdata:.0f} km<extra></extra>'
+        ))
+        
+        fig.add_trace(go.Scattergeo(
+            lat=[center_lat],
+            lon=[center_lon],
+            mode='markers',
+            marker=dict(size=14, color='#d62728', symbol='star'),
+            name='Query point',
+            hovertemplate='Query point<br>Lat: %{lat:.2f}°<br>Lon: %{lon:.2f}°<extra></extra>'
+        ))
+        
+        fig.update_layout(
+            title=f"📍 {title}",
+            geo=dict(
+                projection_type='natural earth',
+                showland=True,
+                landcolor='#e8e8e8',
+                center=dict(lat=center_lat, lon=center_lon),
+                projection_scale=4
+            ),
+            width=800,
+            height=600,
+            font=dict(color="#006989")
+        )
+        
+        return fig
+        
+    except Exception as e:
+        print(f"Error creating float map: {e}")
+        return None
+
+
 # Test the chart maker
 if __name__ == "__main__":
     from data_handler import load_ocean_data, filter_data, get_simple_stats
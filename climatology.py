@@ -0,0 +1,162 @@
+# climatology.py
+"""Per-cell, day-of-year climatology and anomalies.
+
+The climatology is built once per dataset version by a chunked pass over
+time that accumulates sums and counts per day of year, then smoothed with a
+circular running window. It is saved next to the data it came from, so
+anomaly queries only load it and subtract.
+"""
+import glob
+import os
+
+import numpy as np
+import xarray as xr
+
+from regions import lon_positions
+from vertical import select_depth
+
+CLIMATOLOGY_DIR = os.environ.get("FLOATCHAT_CLIMATOLOGY_DIR", "climatology")
+
+DAYS_IN_YEAR = 366
+
+# Running window (days) over the day-of-year axis, so sparse years still give a smooth seasonal cycle
+DOY_WINDOW = 15
+
+# Time steps read per chunk of the reduction
+CHUNK_STEPS = 32
+
+# In-memory climatologies by dataset version (or object id for unversioned data)
+_climatologies = {}
+
+
+def _window_sums(days, values, window):
+    """Sum values over a centred day-of-year window that wraps around the year.
+
+    days are the sorted observed days (0-based) labelling axis 0 of values;
+    a cumulative sum over just those days gives every window total with two
+    lookups, without expanding to a dense 366-day axis.
+    """
+    half = window // 2
+    head, tail = days < half, days >= DAYS_IN_YEAR - half
+    extended_days = np.concatenate([days[tail] - DAYS_IN_YEAR, days, days[head] + DAYS_IN_YEAR])
+    extended = np.concatenate([values[tail], values, values[head]])
+    cumulative = np.concatenate([np.zeros_like(extended[:1]), np.cumsum(extended, axis=0)])
+    hi = np.searchsorted(extended_days, days + half, side="right")
+    lo = np.searchsorted(extended_days, days - half, side="left")
+    return cumulative[hi] - cumulative[lo]
+
+
+def compute_climatology(data, window=DOY_WINDOW, chunk_steps=CHUNK_STEPS):
+    """Climatology of a (time, ...) DataArray on a ``dayofyear`` axis (1-366).
+
+    Only days of year present in the data are computed; those are the days
+    any anomaly query against it can ask for. Sums and counts are
+    accumulated chunk by chunk, so only chunk_steps time steps are in memory
+    at once.
+    """
+    days, step_day = np.unique(data["time"].dt.dayofyear.values - 1, return_inverse=True)
+    shape = (len(days),) + data.shape[1:]
+    sums = np.zeros(shape, dtype="float64")
+    counts = np.zeros(shape, dtype="int32")
+    for start in range(0, data.sizes["time"], chunk_steps):
+        block = data.isel(time=slice(start, start + chunk_steps)).values
+        valid = ~np.isnan(block)
+        chunk_days = step_day[start:start + chunk_steps]
+        np.add.at(sums, chunk_days, np.where(valid, block, 0.0))
+        np.add.at(counts, chunk_days, valid)
+
+    sums = _window_sums(days, sums, window)
+    counts = _window_sums(days, counts, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(counts > 0, sums / counts, np.nan)
+
+    dims = ("dayofyear",) + data.dims[1:]
+    coords = {dim: data[dim].values for dim in data.dims[1:]}
+    coords["dayofyear"] = days + 1
+    return xr.DataArray(mean.astype("float32"), dims=dims, coords=coords, name=data.name)
+
+
+def climatology_path(ds):
+    """Where a versioned dataset's climatology is stored, or None if unversioned"""
+    version = ds.attrs.get("version")
+    if not version:
+        return None
+    directory = ds.attrs.get("store") or CLIMATOLOGY_DIR
+    return os.path.join(directory, f"climatology-{version}.nc")
+
+
+def _save(climatology, path, source):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    climatology.to_netcdf(tmp)
+    os.replace(tmp, path)
+    # Older versions of the same source are stale now
+    for old in glob.glob(os.path.join(os.path.dirname(path) or ".", f"climatology-{source}-*.nc")):
+        if old != path:
+            os.remove(old)
+
+
+def get_climatology(ds):
+    """Load or build the climatology of every time-varying variable in a dataset.
+
+    Only variables missing from the cached climatology are computed, so
+    after a hot reload that carried unchanged variables over (see
+    retain_climatology) just the changed ones are recomputed.
+    """
+    key = ds.attrs.get("version") or id(ds)
+    climatology = _climatologies.get(key)
+    path = climatology_path(ds)
+    if climatology is None and path and os.path.exists(path):
+        climatology = xr.load_dataset(path)
+
+    missing = [name for name in ds.data_vars
+               if ds[name].dims[:1] == ("time",) and (climatology is None or name not in climatology)]
+    if climatology is None or missing:
+        computed = xr.Dataset({name: compute_climatology(ds[name]) for name in missing})
+        climatology = computed if climatology is None else climatology.assign(computed.data_vars)
+    climatology.attrs.update(window_days=DOY_WINDOW, version=str(key))
+    if path and (missing or not os.path.exists(path)):
+        try:
+            _save(climatology, path, ds.attrs.get("version_source", "data"))
+        except OSError as e:
+            print(f"⚠️  Couldn't save climatology to {path}: {e}")
+
+    # One live dataset at a time, as with the spatial index
+    _climatologies.clear()
+    _climatologies[key] = climatology
+    return climatology
+
+
+def retain_climatology(old_ds, new_ds, changed_variables):
+    """Carry the in-memory climatology of unchanged variables over to a reloaded dataset.
+
+    Only valid when those variables' values are identical in both. A grid
+    whose extent changed (see hot_reload.diff_datasets) gets the
+    climatology reindexed onto it; cells it gained are empty for an
+    unchanged variable. Returns the names carried over.
+    """
+    climatology = _climatologies.get(old_ds.attrs.get("version") or id(old_ds))
+    if climatology is None:
+        return []
+    keep = [name for name in climatology.data_vars if name not in changed_variables and name in new_ds]
+    if keep:
+        extent = {dim: new_ds[dim].values for dim in ("latitude", "longitude") if dim in climatology.dims}
+        _climatologies[new_ds.attrs.get("version") or id(new_ds)] = climatology[keep].reindex(extent)
+    return keep
+
+
+def anomaly(data, climatology, depth=None):
+    """Departure of filtered data from its climatology: one lookup and one subtraction.
+
+    data is the output of filter_data (time/lat/lon, depth already reduced);
+    the climatology is cut to the same cells and days before subtracting.
+    Wrapped longitudes (filter_data labels the Pacific 180..240 on a
+    -180..180 grid) are looked up by position.
+    """
+    normal = climatology[data.name].sel(latitude=data["latitude"])
+    columns = lon_positions(normal["longitude"].values, data["longitude"].values)
+    normal = normal.isel(longitude=columns).assign_coords(longitude=data["longitude"].values)
+    normal = select_depth(normal.sel(dayofyear=data["time"].dt.dayofyear), depth)
+    result = data - normal.drop_vars("dayofyear")
+    result.name = data.name
+    return result
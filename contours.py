@@ -0,0 +1,185 @@
+# contours.py
+"""Server-side contour lines: marching squares over NumPy.
+
+Instead of sending the whole grid for the browser to contour, each level is
+traced here. Every cell's corners are classified above/below the level at
+once, crossing points are interpolated along all grid edges in one pass,
+and the per-cell segments (joined by the edge they share) are chained into
+polylines. Lines are then simplified with Douglas-Peucker to a fraction of
+the grid spacing, so the chart's size follows contour length, not grid size.
+
+Results are cached per (dataset version, parameter, region, depth, time
+step, options, levels) and carried over on hot reload like the other caches.
+"""
+import numpy as np
+
+from regions import REGION_BOUNDS, get_region_bounds
+
+# Levels drawn when none are given
+CONTOUR_LEVELS = 10
+
+# Simplification tolerance as a fraction of the grid spacing
+SIMPLIFY_CELLS = 0.25
+
+# Contour sets keyed by (dataset version, parameter, region, ..., levels)
+_contour_cache = {}
+CONTOUR_CACHE_SIZE = 64
+
+# Segments per marching-squares case, as pairs of cell edges (0 bottom, 1 right,
+# 2 top, 3 left). Corner bits: 1 bottom-left, 2 bottom-right, 4 top-right, 8 top-left.
+# The saddles (5, 10) are resolved by the cell-centre value, see _SADDLES.
+_SEGMENTS = {1: [(3, 0)], 2: [(0, 1)], 3: [(3, 1)], 4: [(1, 2)], 6: [(0, 2)], 7: [(3, 2)],
+             8: [(2, 3)], 9: [(0, 2)], 11: [(1, 2)], 12: [(3, 1)], 13: [(0, 1)], 14: [(3, 0)]}
+# (centre above the level, centre below)
+_SADDLES = {5: ([(0, 1), (2, 3)], [(3, 0), (1, 2)]),
+            10: ([(3, 0), (1, 2)], [(0, 1), (2, 3)])}
+
+
+def default_levels(z, count=CONTOUR_LEVELS):
+    """count evenly spaced levels strictly inside the data range"""
+    finite = z[np.isfinite(z)]
+    if finite.size == 0 or finite.min() == finite.max():
+        return []
+    return [float(level) for level in np.round(np.linspace(finite.min(), finite.max(), count + 2)[1:-1], 2)]
+
+
+def _crossings(z, x, y, level):
+    """Level crossing points on every horizontal edge, then every vertical edge, as one (n, 2) array"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = (level - z[:, :-1]) / (z[:, 1:] - z[:, :-1])
+        horizontal = np.stack([x[:-1] + t * np.diff(x), np.broadcast_to(y[:, None], t.shape)], axis=-1)
+        t = (level - z[:-1, :]) / (z[1:, :] - z[:-1, :])
+        vertical = np.stack([np.broadcast_to(x[None, :], t.shape), y[:-1, None] + t * np.diff(y)[:, None]],
+                            axis=-1)
+    return np.concatenate([horizontal.reshape(-1, 2), vertical.reshape(-1, 2)])
+
+
+def _segments(z, level):
+    """(m, 2) array of crossing-point ids (see _crossings) joined by a segment in some cell"""
+    ny, nx = z.shape
+    above = z > level
+    bl, br, tr, tl = above[:-1, :-1], above[:-1, 1:], above[1:, 1:], above[1:, :-1]
+    cases = bl * 1 + br * 2 + tr * 4 + tl * 8
+    corners = np.stack([z[:-1, :-1], z[:-1, 1:], z[1:, 1:], z[1:, :-1]])
+    cases[~np.isfinite(corners).all(axis=0)] = 0
+
+    rows, cols = np.nonzero((cases > 0) & (cases < 15))
+    cell_cases = cases[rows, cols]
+    horizontal = ny * (nx - 1)
+    # Crossing-point id of each edge of the selected cells
+    edge_ids = np.stack([rows * (nx - 1) + cols, horizontal + rows * nx + cols + 1,
+                         (rows + 1) * (nx - 1) + cols, horizontal + rows * nx + cols])
+
+    centre_above = corners[:, rows, cols].mean(axis=0) > level
+    pairs = []
+    for case, segments in _SEGMENTS.items():
+        picked = np.flatnonzero(cell_cases == case)
+        pairs += [np.stack([edge_ids[a, picked], edge_ids[b, picked]], axis=1) for a, b in segments]
+    for case, (if_above, if_below) in _SADDLES.items():
+        for segments, centre in ((if_above, True), (if_below, False)):
+            picked = np.flatnonzero((cell_cases == case) & (centre_above == centre))
+            pairs += [np.stack([edge_ids[a, picked], edge_ids[b, picked]], axis=1) for a, b in segments]
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+
+def _chain(segments):
+    """Join segments sharing an endpoint into polylines (lists of point ids), open lines first"""
+    ends = {}
+    for k, (a, b) in enumerate(segments.tolist()):
+        ends.setdefault(a, []).append(k)
+        ends.setdefault(b, []).append(k)
+    used = np.zeros(len(segments), dtype=bool)
+    pairs = segments.tolist()
+    lines = []
+    # Each point is on at most two segments; start from line ends so open lines aren't split
+    for start in [p for p, ks in ends.items() if len(ks) == 1] + list(ends):
+        for first in ends[start]:
+            if used[first]:
+                continue
+            path, point, k = [start], start, first
+            while k is not None:
+                used[k] = True
+                a, b = pairs[k]
+                point = b if a == point else a
+                path.append(point)
+                k = next((k2 for k2 in ends[point] if not used[k2]), None)
+            lines.append(path)
+    return lines
+
+
+def simplify(points, tolerance):
+    """Douglas-Peucker: drop points closer than tolerance to the simplified line"""
+    if len(points) < 3 or tolerance <= 0:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        chord = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*chord)
+        if length == 0:  # closed ring: distance from the shared end point
+            distance = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distance = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / length
+        i = int(np.argmax(distance))
+        if distance[i] > tolerance:
+            middle = start + 1 + i
+            keep[middle] = True
+            stack += [(start, middle), (middle, end)]
+    return points[keep]
+
+
+def contour_lines(z, x, y, levels=None, tolerance=None):
+    """Contour polylines of a (latitude, longitude) grid on ascending x (lon) and y (lat) axes.
+
+    Returns {level: [(n, 2) arrays of (x, y)]}. tolerance defaults to
+    SIMPLIFY_CELLS of the grid spacing; 0 keeps every crossing point.
+    """
+    z = np.asarray(z, dtype="float64")
+    x, y = np.asarray(x, dtype="float64"), np.asarray(y, dtype="float64")
+    if levels is None:
+        levels = default_levels(z)
+    if tolerance is None:
+        spacing = [np.median(np.diff(a)) for a in (x, y) if len(a) > 1]
+        tolerance = SIMPLIFY_CELLS * min(spacing) if spacing else 0.0
+    result = {}
+    if z.ndim != 2 or min(z.shape) < 2:
+        return {level: [] for level in levels}
+    for level in levels:
+        points = _crossings(z, x, y, level)
+        result[level] = [simplify(points[path], tolerance) for path in _chain(_segments(z, level))]
+    return result
+
+
+def cached_contours(key, z, x, y, levels=None, tolerance=None):
+    """contour_lines, cached under key (a tuple starting with the dataset version), if key is given"""
+    if key is not None:
+        key = key + (None if levels is None else tuple(levels), tolerance)
+        if key in _contour_cache:
+            return _contour_cache[key]
+    lines = contour_lines(z, x, y, levels, tolerance)
+    if key is not None:
+        if len(_contour_cache) >= CONTOUR_CACHE_SIZE:
+            _contour_cache.pop(next(iter(_contour_cache)))
+        _contour_cache[key] = lines
+    return lines
+
+
+def retain_contours(old_ds, new_ds, changed_variables, changed_regions):
+    """Re-key cached contours to a reloaded dataset, except changed variables and regions.
+
+    Keys are (version, parameter, region, ...). Returns the number carried over.
+    """
+    old_version, new_version = old_ds.attrs.get("version"), new_ds.attrs.get("version")
+    changed = [REGION_BOUNDS[name] for name in changed_regions]
+    carried = 0
+    for key in [k for k in _contour_cache if k[0] == old_version]:
+        lines = _contour_cache.pop(key)
+        if new_version and key[1] not in changed_variables and get_region_bounds(key[2]) not in changed:
+            _contour_cache[(new_version,) + key[1:]] = lines
+            carried += 1
+    return carried
@@ -2,8 +2,31 @@
 import xarray as xr
 import pandas as pd
 import numpy as np
-import requests
 import os
+from argo_profiles import is_argo_profile_dataset, read_argo_profiles, profiles_to_dataset
+from argo_ingest import has_profile_store, load_profile_store, profile_store_version, PROFILE_STORE_DIR, MANIFEST_NAME
+from downloader import download_file, looks_like_netcdf, DownloadError
+from nc_layout import write_chunked_netcdf
+from quantile_sketch import merged_sketch, store_months
+from regions import REGION_BOUNDS, REGION_CONTEXT, get_region_bounds, region_columns
+from slab_reader import get_slab_reader, drop_empty
+from vertical import DEPTH_LEVELS, select_depth
+
+# Deepest pressure (dbar) read from the profile store: the bottom standard level plus a margin
+MAX_PROFILE_PRESSURE = DEPTH_LEVELS[-1] + 50.0
+
+# Days of the profile store gridded at startup, back from its latest measurement (0: all of it).
+# Earlier data is gridded on demand per region and time window (see load_gridded_region)
+LOAD_WINDOW_DAYS = int(os.environ.get("FLOATCHAT_LOAD_DAYS", "90"))
+
+# Most time × depth × lat × lon cells of the startup grid; float32, so 4 bytes per cell per variable
+MAX_GRID_CELLS = int(os.environ.get("FLOATCHAT_MAX_GRID_CELLS", "20000000"))
+
+# Dummy water column: deep-water values and e-folding depths (m)
+DEEP_TEMPERATURE = 2.5
+DEEP_SALINITY = 34.7
+THERMOCLINE_SCALE = 300.0
+HALOCLINE_SCALE = 500.0
 
 def download_sample_data():
     """Download a small sample Argo dataset"""
@@ -11,21 +34,19 @@ def download_sample_data():
     url = "https://data-argo.ifremer.fr/geo/indian_ocean/2023/12/D5906241_001.nc"
     filename = "sample_argo_data.nc"
     
-    if not os.path.exists(filename):
-        print("Downloading sample Argo data...")
-        try:
-            response = requests.get(url, timeout=30)
-            with open(filename, 'wb') as f:
-                f.write(response.content)
-            print("✅ Sample data downloaded!")
-            return filename
-        except:
-            print("⚠️  Download failed, using dummy data instead")
-            return create_dummy_data()
-    else:
+    if os.path.exists(filename) and looks_like_netcdf(filename):
         print("✅ Sample data already exists!")
         return filename
 
+    print("Downloading sample Argo data...")
+    try:
+        download_file(url, filename)
+        print("✅ Sample data downloaded!")
+        return filename
+    except DownloadError as e:
+        print(f"⚠️  Download failed ({e}), using dummy data instead")
+        return create_dummy_data()
+
 # In data_handler.py, replace the old create_dummy_data function with this one.
 
 def create_dummy_data():
@@ -123,35 +144,133 @@ def create_dummy_data():
                     temp_data[t, lat_idx, lon_idx] = final_temp
                     salt_data[t, lat_idx, lon_idx] = final_salt
     
+    # Extend the surface fields down the water column: temperature decays
+    # through the thermocline towards deep water, salinity relaxes to 34.7
+    depth = DEPTH_LEVELS[None, :, None, None]
+    temp_profile = DEEP_TEMPERATURE + (temp_data[:, None] - DEEP_TEMPERATURE) * np.exp(-depth / THERMOCLINE_SCALE)
+    salt_profile = DEEP_SALINITY + (salt_data[:, None] - DEEP_SALINITY) * np.exp(-depth / HALOCLINE_SCALE)
+
     # Create xarray dataset
     ds = xr.Dataset({
-        'temperature': (['time', 'latitude', 'longitude'], temp_data),
-        'salinity': (['time', 'latitude', 'longitude'], salt_data)
+        'temperature': (['time', 'depth', 'latitude', 'longitude'], temp_profile.astype('float32')),
+        'salinity': (['time', 'depth', 'latitude', 'longitude'], salt_profile.astype('float32'))
     }, coords={
         'time': times,
+        'depth': DEPTH_LEVELS,
         'latitude': all_lats,
         'longitude': all_lons
     })
+    ds['depth'].attrs.update(units='m', positive='down')
     
-    ds.to_netcdf('comprehensive_dummy_data.nc')
+    # Chunked and compressed for region/time-slice reads (see nc_layout.py)
+    write_chunked_netcdf(ds, 'comprehensive_dummy_data.nc')
     print("✅ Enhanced realistic dummy data created with seasonal and latitude effects!")
     return 'comprehensive_dummy_data.nc'
 
+def dataset_version(source, token):
+    return f"{source}-{token}"
+
+def set_dataset_version(ds, source, token, store=None):
+    """Tag a dataset with a version that changes whenever its source data does.
+
+    Derived products such as the climatology are stored under this version.
+    """
+    ds.attrs['version_source'] = source
+    ds.attrs['version'] = dataset_version(source, token)
+    if store:
+        ds.attrs['store'] = store
+
+def open_data_file(path):
+    """Open a NetCDF file lazily, recording which version of the file it is.
+
+    The mtime is taken before opening, so if the file is replaced meanwhile
+    the dataset is treated as stale rather than mixed with the new file.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    ds = xr.open_dataset(path)
+    ds.encoding['source_mtime_ns'] = mtime_ns
+    return ds
+
+def dataset_sources():
+    """Files whose replacement means load_ocean_data would return a new dataset"""
+    return [os.path.join(PROFILE_STORE_DIR, MANIFEST_NAME), 'sample_argo_data.nc']
+
+def load_window(store=PROFILE_STORE_DIR, days=LOAD_WINDOW_DAYS):
+    """(start, end) of the store's last `days` days of data, or None to load all of it"""
+    months = store_months(store)
+    if not days or not months:
+        return None
+    month = pd.Period(months[-1], freq='M')
+    # Only the latest month's partition is read to find the latest measurement
+    times = load_profile_store(store, time_range=(month.start_time, month.end_time), columns=['time'])['time']
+    if times.empty:
+        return None
+    end = times.max()
+    return end.floor('D') - pd.Timedelta(days=days - 1), end
+
+def trim_to_grid_budget(table, resolution=1.0, levels=DEPTH_LEVELS, max_cells=MAX_GRID_CELLS):
+    """Drop a profile table's oldest days until its daily grid fits in max_cells.
+
+    profiles_to_dataset allocates every (day, level, lat, lon) cell of the
+    data's extent, so memory follows the days and the extent rather than
+    the number of profiles.
+    """
+    if table.empty or not max_cells:
+        return table
+    lat = np.floor(table['latitude'].to_numpy() / resolution)
+    lon = np.floor(table['longitude'].to_numpy() / resolution)
+    plane = (np.ptp(lat) + 1) * (np.ptp(lon) + 1) * len(levels)
+    days = table['time'].dt.floor('D')
+    unique = np.sort(days.unique())
+    keep = max(1, int(max_cells // plane))
+    if len(unique) <= keep:
+        return table
+    print(f"⚠️  Gridding the latest {keep} of {len(unique)} days to stay within {max_cells:,} grid cells")
+    return table[days >= unique[-keep]]
+
 def load_ocean_data():
     """Load and return ocean dataset"""
     try:
-        # First try the real data
+        # Prefer the ingested profile store (see argo_ingest.py)
+        if has_profile_store():
+            # Rows below the deepest standard level are never gridded, so push the limit down to Parquet
+            window = load_window()
+            rows = load_profile_store(time_range=window, max_pressure=MAX_PROFILE_PRESSURE)
+            table = trim_to_grid_budget(rows)
+            if not table.empty:
+                ds = profiles_to_dataset(table)
+                set_dataset_version(ds, "argo_store", profile_store_version(), store=PROFILE_STORE_DIR)
+                # Where the loaded grid starts; queries reaching further back are gridded on demand
+                if len(table) < len(rows):
+                    ds.attrs['window_start'] = str(table['time'].min().floor('D'))
+                elif window is not None:
+                    ds.attrs['window_start'] = str(window[0])
+                print(f"✅ Loaded {len(table):,} Argo measurements from the profile store"
+                      + (f" since {ds.attrs['window_start'][:10]}" if 'window_start' in ds.attrs else ""))
+                return ds
+
+        # Then try the real data
         if os.path.exists('sample_argo_data.nc'):
             try:
-                ds = xr.open_dataset('sample_argo_data.nc', engine='h5netcdf')
-                print(f"✅ Loaded real Argo data with variables: {list(ds.data_vars)}")
+                # No engine pinned: GDAC profile files are often classic NetCDF3
+                ds = open_data_file('sample_argo_data.nc')
+                if is_argo_profile_dataset(ds):
+                    table = read_argo_profiles(ds)
+                    if table.empty:
+                        raise ValueError("no measurements passed QC")
+                    ds = profiles_to_dataset(table)
+                    print(f"✅ Loaded {len(table):,} real Argo measurements from {ds.sizes['profile']} profiles")
+                else:
+                    print(f"✅ Loaded real Argo data with variables: {list(ds.data_vars)}")
+                set_dataset_version(ds, 'sample_argo_data', ds.encoding.get('source_mtime_ns'))
                 return ds
-            except:
-                print("⚠️  Real data failed to load, using dummy data")
+            except Exception as e:
+                print(f"⚠️  Real data failed to load ({e}), using dummy data")
         
         # Fallback to dummy data
         filename = create_dummy_data()
-        ds = xr.open_dataset(filename)
+        ds = open_data_file(filename)
+        set_dataset_version(ds, 'dummy', ds.encoding['source_mtime_ns'])
         print(f"✅ Loaded dummy data with variables: {list(ds.data_vars)}")
         return ds
         
@@ -159,30 +278,169 @@ def load_ocean_data():
         print(f"❌ Error loading data: {e}")
         return None
 
-def filter_data(ds, parameter, region=None, time_range=None):
-    """Filter ocean data based on parameters with expanded regions"""
+def load_region_profiles(region, time_range=None, max_pressure=None):
+    """Read profile-store measurements for a named region and optional time range.
+
+    Only partitions and row groups overlapping the region box and time range
+    are read from disk.
+    """
+    bounds = get_region_bounds(region) if region else None
+    lat_range, lon_range = bounds if bounds else (None, None)
+    return load_profile_store(lat_range=lat_range, lon_range=lon_range,
+                              time_range=time_range, max_pressure=max_pressure)
+
+# Gridded store products keyed by (dataset version, region, resolution, time window)
+_gridded_cache = {}
+GRID_CACHE_SIZE = 16
+
+def load_gridded_region(region, resolution=1.0, time_range=None):
+    """Grid a region's profile-store measurements at the given resolution (degrees).
+
+    Results are cached per region, resolution and time window, and dropped
+    when the store is re-ingested. Returns None without a profile store.
+    """
+    if not has_profile_store():
+        return None
+    window = tuple(pd.Timestamp(t) for t in time_range) if time_range else None
+    key = (dataset_version("argo_store", profile_store_version()), region, float(resolution), window)
+    if key in _gridded_cache:
+        return _gridded_cache[key]
+
+    table = load_region_profiles(region, time_range, max_pressure=MAX_PROFILE_PRESSURE)
+    if table.empty:
+        return None
+    bounds = get_region_bounds(region) if region else None
+    lat_range, lon_range = bounds if bounds else (None, None)
+    if lon_range is not None and lon_range[1] > 180:
+        lon_range = None  # wrapped boxes keep the data extent
+    ds = profiles_to_dataset(table, resolution, lat_range=lat_range, lon_range=lon_range)
+
+    if len(_gridded_cache) >= GRID_CACHE_SIZE:
+        _gridded_cache.pop(next(iter(_gridded_cache)))
+    _gridded_cache[key] = ds
+    return ds
+
+def retain_gridded_regions(old_version, new_version, changed_regions):
+    """Re-key cached gridded regions to a reloaded store version, except changed regions.
+
+    changed_regions are REGION_BOUNDS names; entries for their boxes are
+    dropped and the rest move to new_version. Returns the number carried over.
+    """
+    changed = [REGION_BOUNDS[name] for name in changed_regions]
+    carried = 0
+    for key in [k for k in _gridded_cache if k[0] == old_version]:
+        ds = _gridded_cache.pop(key)
+        if get_region_bounds(key[1]) not in changed:
+            _gridded_cache[(new_version,) + key[1:]] = ds
+            carried += 1
+    return carried
+
+# Merged archive sketches keyed by (store version, parameter, region, time window, depth)
+_sketch_cache = {}
+SKETCH_CACHE_SIZE = 64
+
+def load_archive_sketch(parameter, region, time_range=None, depth=None):
+    """Quantile sketch of a region's profile-store measurements (see quantile_sketch.py).
+
+    Covers the whole months overlapping time_range and the pressure layers
+    covering depth. Cached per store version; None without a profile store
+    or its sketches.
+    """
+    if not has_profile_store():
+        return None
+    window = tuple(pd.Timestamp(t) for t in time_range) if time_range else None
+    key = (dataset_version("argo_store", profile_store_version()), parameter, region, window,
+           tuple(depth) if isinstance(depth, (list, tuple)) else depth)
+    if key not in _sketch_cache:
+        if len(_sketch_cache) >= SKETCH_CACHE_SIZE:
+            _sketch_cache.pop(next(iter(_sketch_cache)))
+        _sketch_cache[key] = merged_sketch(PROFILE_STORE_DIR, parameter, region, time_range, depth)
+    return _sketch_cache[key]
+
+def time_slice(times, time_range):
+    """Index slice of the steps of a sorted time axis inside an inclusive (start, end) range"""
+    start, end = (np.datetime64(pd.Timestamp(t), 'ns') for t in time_range)
+    times = np.asarray(times, dtype='datetime64[ns]')
+    # Binary search on the sorted axis instead of a mask over every step
+    return slice(int(np.searchsorted(times, start, side='left')),
+                 int(np.searchsorted(times, end, side='right')))
+
+def read_region_slab(ds, name, bounds, time_range=None, depth=None):
+    """Fast path for filter_data: read a region straight from an HDF5-backed file.
+
+    Returns the region with empty cells trimmed, or None (use the xarray
+    path) unless ds is an untouched view of a NetCDF4 file that holds the
+    variable with the same shape.
+    """
+    path = ds.encoding.get('source')
+    if not path or name not in ds:
+        return None
+    # Once the file is replaced (e.g. during a hot reload) only xarray's open handle has the old data
+    reader = get_slab_reader(path, ds.encoding.get('source_mtime_ns'))
+    if reader is None or not reader.can_read(name, ds[name].shape):
+        return None
+
+    dims = ds[name].dims
+    time_index = slice(None)
+    if time_range is not None and 'time' in dims:
+        time_index = time_slice(reader.axes['time'], time_range)
+    depth_index = slice(None)
+    if 'depth' in dims:
+        depths = reader.axes['depth']
+        if depth is None:
+            depth_index = 0
+        elif np.isscalar(depth) and depth in depths:
+            depth_index = int(np.flatnonzero(depths == depth)[0])
+        else:
+            # Only the levels bracketing the requested depth or layer
+            top, bottom = (depth, depth) if np.isscalar(depth) else sorted(depth)
+            first = max(int(np.searchsorted(depths, top, side='right')) - 1, 0)
+            last = min(int(np.searchsorted(depths, bottom, side='left')), len(depths) - 1)
+            depth_index = slice(first, last + 1)
+
+    lat_range, lon_range = bounds
+    # The slab is one contiguous longitude range; boxes that wrap on this axis take the xarray path
+    longitude = reader.axes['longitude']
+    columns, labels = region_columns(longitude, lon_range)
+    if not np.array_equal(labels, longitude[columns]):
+        return None
+    if isinstance(depth_index, slice) and 'depth' in dims:
+        return drop_empty(select_depth(reader.read(name, dims, lat_range, lon_range, time_index, depth_index),
+                                       depth))
+    # Single level: trim empty rows and columns in NumPy before wrapping
+    return reader.read(name, dims, lat_range, lon_range, time_index, depth_index, drop_empty=True)
+
+def filter_data(ds, parameter, region=None, time_range=None, depth=None):
+    """Filter ocean data based on parameters with expanded regions.
+
+    depth is None (surface), a level in metres or a (top, bottom) layer; see
+    vertical.select_depth.
+    """
     try:
         if ds is None:
             return None
             
-        # Expanded region filtering
+        # HDF5-backed files: read the region's hyperslab directly
+        bounds = get_region_bounds(region) if region else None
+        if bounds and parameter.lower() in ('temperature', 'salinity'):
+            data = read_region_slab(ds, parameter.lower(), bounds, time_range, depth)
+            if data is not None:
+                return data
+
+        # Time filtering first, so only the matching steps are ever read
         filtered_ds = ds
+        if time_range is not None and 'time' in ds.dims:
+            filtered_ds = ds.isel(time=time_slice(ds['time'].values, time_range))
+            
+        # Expanded region filtering
         if region:
-            region_lower = region.lower()
-            if "bengal" in region_lower:
-                filtered_ds = ds.sel(latitude=slice(5, 25), longitude=slice(80, 100))
-            elif "arabian" in region_lower:
-                filtered_ds = ds.sel(latitude=slice(5, 25), longitude=slice(50, 80))
-            elif "pacific" in region_lower:
-                filtered_ds = ds.sel(latitude=slice(-40, 60), longitude=slice(120, 240))
-            elif "atlantic" in region_lower:
-                filtered_ds = ds.sel(latitude=slice(-60, 70), longitude=slice(280, 380))
-            elif "indian" in region_lower and "ocean" in region_lower:
-                filtered_ds = ds.sel(latitude=slice(-50, 30), longitude=slice(20, 120))
-            elif "mediterranean" in region_lower:
-                filtered_ds = ds.sel(latitude=slice(30, 46), longitude=slice(-5, 36))
-            elif "arctic" in region_lower:
-                filtered_ds = ds.sel(latitude=slice(65, 90), longitude=slice(-180, 180))
+            bounds = get_region_bounds(region)
+            if bounds:
+                lat_range, lon_range = bounds
+                # Wrap-aware, so -180..180 grids keep boxes given past 180°E (see regions.region_columns)
+                columns, labels = region_columns(filtered_ds['longitude'].values, lon_range)
+                filtered_ds = filtered_ds.sel(latitude=slice(*lat_range)).isel(longitude=columns)
+                filtered_ds = filtered_ds.assign_coords(longitude=labels)
             
         # Get the requested parameter
         if parameter.lower() == 'temperature' and 'temperature' in filtered_ds:
@@ -198,6 +456,9 @@ def filter_data(ds, parameter, region=None, time_range=None):
                 var_name = list(filtered_ds.data_vars)[0]
                 data = filtered_ds[var_name]
                 print(f"Using variable: {var_name}")
+
+        # Reduce the water column to the requested level or layer
+        data = select_depth(data, depth)
                 
         # Remove NaN values (areas with no data)
         data = data.where(~np.isnan(data), drop=True)
@@ -258,17 +519,7 @@ def get_enhanced_stats(data, region_name="Unknown Region"):
         }
         
         # Regional context
-        region_context = {
-            'bay of bengal': 'Tropical region with monsoon effects',
-            'arabian sea': 'High evaporation, elevated salinity',
-            'pacific ocean': 'World\'s largest ocean with diverse conditions',
-            'atlantic ocean': 'Meridional circulation patterns',
-            'indian ocean': 'Monsoon-driven seasonal patterns',
-            'mediterranean sea': 'Enclosed sea with high salinity',
-            'arctic ocean': 'Ice-covered, extreme seasonal variation',
-        }
-        
-        stats['description'] = region_context.get(region_name.lower(), 'Ocean region')
+        stats['description'] = REGION_CONTEXT.get(region_name.lower(), 'Ocean region')
         return stats
         
     except Exception as e:
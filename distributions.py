@@ -0,0 +1,165 @@
+# distributions.py
+"""Value distributions of every region, from fixed-bin histograms.
+
+Each variable's range (per dataset version and depth) is split into
+HISTOGRAM_BINS equal bins. One ``np.bincount`` pass over (time step,
+label, bin), on region_stats's label raster, counts every region's cells
+per bin and time step. The table is built when a dataset version is
+loaded, so a query only sums the bins of its time window and reads
+percentiles off the cumulative counts: O(bins), with no sort of raw cells.
+A percentile is exact to within one bin width.
+"""
+import numpy as np
+
+from data_handler import time_slice
+from region_stats import region_labels, REGION_NAMES
+from vertical import select_depth
+
+HISTOGRAM_BINS = 256
+
+# Percentiles reported (and drawn) for a distribution
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+
+# Histogram tables keyed by (dataset version, parameter, depth)
+_histogram_cache = {}
+HISTOGRAM_CACHE_SIZE = 16
+
+
+def bin_edges(values, bins=HISTOGRAM_BINS):
+    """bins + 1 equal-width edges spanning the finite values (one unit wide if they are all equal)"""
+    low, high = float(np.nanmin(values)), float(np.nanmax(values))
+    if high <= low:
+        high = low + 1.0
+    return np.linspace(low, high, bins + 1)
+
+
+def bin_index(values, edges):
+    """Bin of each value; values on or past the outer edges go to the first or last bin"""
+    width = edges[1] - edges[0]
+    return np.clip(((values - edges[0]) / width).astype(np.intp), 0, len(edges) - 2)
+
+
+def label_histograms(values, labels, n_labels, edges):
+    """(time, label, bin) cell counts of a (time, lat, lon) array"""
+    steps, bins = values.shape[0], len(edges) - 1
+    flat = values.reshape(steps, -1)
+    valid = ~np.isnan(flat)
+    cell = (np.arange(steps)[:, None] * n_labels + labels.ravel()[None, :])[valid]
+    index = cell * bins + bin_index(flat[valid], edges)
+    return np.bincount(index, minlength=steps * n_labels * bins).reshape(steps, n_labels, bins)
+
+
+def region_histograms(ds, parameter, depth=None):
+    """Per-time-step histograms of every region, cached per dataset version, parameter and depth.
+
+    Returns {"counts": (time, region, bin) array, "edges", "times"}, or None
+    if the dataset lacks the parameter or it has no data.
+    """
+    if parameter not in ds:
+        return None
+    version = ds.attrs.get("version")
+    key = (version, parameter, tuple(depth) if isinstance(depth, (list, tuple)) else depth)
+    if version and key in _histogram_cache:
+        return _histogram_cache[key]
+
+    data = select_depth(ds[parameter], depth)
+    if "time" not in data.dims:
+        data = data.expand_dims("time")
+    data = data.transpose("time", "latitude", "longitude")
+    values = data.values
+    if np.isnan(values).all():
+        return None
+    labels, membership = region_labels(data["latitude"].values, data["longitude"].values)
+    edges = bin_edges(values)
+    counts = label_histograms(values, labels, len(membership), edges)
+    table = {"counts": np.einsum("tlb,lr->trb", counts, membership.astype(np.int64)),
+             "edges": edges, "times": data["time"].values}
+
+    if version:
+        if len(_histogram_cache) >= HISTOGRAM_CACHE_SIZE:
+            _histogram_cache.pop(next(iter(_histogram_cache)))
+        _histogram_cache[key] = table
+    return table
+
+
+def percentiles(counts, edges, q=PERCENTILES):
+    """Percentiles q (0-100) of a histogram, interpolating linearly inside the bin that holds each"""
+    cumulative = np.cumsum(counts)
+    targets = np.asarray(q, dtype="float64") / 100 * cumulative[-1]
+    first = int(np.flatnonzero(counts)[0])
+    index = np.maximum(np.searchsorted(cumulative, targets, side="left"), first)
+    before = cumulative[index] - counts[index]
+    fraction = np.clip((targets - before) / counts[index], 0.0, 1.0)
+    return edges[index] + fraction * (edges[1] - edges[0])
+
+
+def summarize(counts, edges):
+    """Distribution summary of a histogram: counts, edges, percentiles, box-plot fences and range.
+
+    Fences are Tukey's (1.5 × IQR past the quartiles), clipped to the
+    occupied bins. Returns None for an empty histogram.
+    """
+    total = int(counts.sum())
+    if total == 0:
+        return None
+    occupied = np.flatnonzero(counts)
+    low, high = float(edges[occupied[0]]), float(edges[occupied[-1] + 1])
+    values = percentiles(counts, edges)
+    named = {q: float(v) for q, v in zip(PERCENTILES, values)}
+    q1, q3 = named[25], named[75]
+    centers = (edges[:-1] + edges[1:]) / 2
+    return {
+        "counts": counts,
+        "edges": edges,
+        "count": total,
+        "mean": float(counts @ centers / total),
+        "percentiles": named,
+        "iqr": q3 - q1,
+        "fences": (max(low, q1 - 1.5 * (q3 - q1)), min(high, q3 + 1.5 * (q3 - q1))),
+        "range": (low, high),
+        "bin_width": float(edges[1] - edges[0]),
+    }
+
+
+def region_distribution(ds, parameter, region, time_range=None, depth=None):
+    """Distribution summary of a region over a time window, from the cached histogram table"""
+    table = region_histograms(ds, parameter, depth)
+    if table is None or region not in REGION_NAMES:
+        return None
+    steps = slice(None)
+    if time_range is not None and np.issubdtype(table["times"].dtype, np.datetime64):
+        steps = time_slice(table["times"], time_range)
+    counts = table["counts"][steps, REGION_NAMES.index(region)].sum(axis=0)
+    return summarize(counts, table["edges"])
+
+
+def data_distribution(data, bins=HISTOGRAM_BINS):
+    """Distribution summary of a DataArray (re-gridded or anomaly data, which has no cached table)"""
+    values = np.asarray(data.values, dtype="float64").ravel()
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return None
+    edges = bin_edges(values, bins)
+    return summarize(np.bincount(bin_index(values, edges), minlength=bins), edges)
+
+
+def warm_histograms(ds):
+    """Build the surface histogram table of every gridded variable of a newly loaded dataset"""
+    for name, variable in ds.data_vars.items():
+        if {"latitude", "longitude"} <= set(variable.dims):
+            region_histograms(ds, name)
+
+
+def retain_histograms(old_ds, new_ds, changed_variables):
+    """Re-key cached tables of unchanged variables to a reloaded dataset. Returns the number carried over.
+
+    Bin edges span the whole variable, so any change to it drops its tables.
+    """
+    old_version, new_version = old_ds.attrs.get("version"), new_ds.attrs.get("version")
+    carried = 0
+    for key in [k for k in _histogram_cache if k[0] == old_version]:
+        table = _histogram_cache.pop(key)
+        if new_version and key[1] not in changed_variables:
+            _histogram_cache[(new_version,) + key[1:]] = table
+            carried += 1
+    return carried
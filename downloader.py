@@ -0,0 +1,205 @@
+# downloader.py
+"""Streaming, resumable, checksummed downloads of Argo files.
+
+The body is streamed in fixed-size chunks to ``<dest>.part`` and hashed as
+it arrives, so memory stays bounded whatever the file size. An interrupted
+download is resumed with an HTTP Range request from the end of the .part
+file, guarded by If-Range with the first response's ETag or Last-Modified
+(kept in ``<dest>.part.validator``), so a file that changed on the server
+is downloaded afresh rather than spliced onto the old bytes. Only once the
+size, checksum and NetCDF signature all check out is the .part file
+renamed over the destination.
+
+    python downloader.py https://data-argo.ifremer.fr/dac/.../R5906241_001.nc profile.nc
+"""
+import argparse
+import hashlib
+import os
+import time
+
+import requests
+
+CHUNK_SIZE = 1 << 20
+
+# Leading bytes of NetCDF3 (classic / 64-bit offset) and NetCDF4 (HDF5) files
+NETCDF_SIGNATURES = (b"CDF\x01", b"CDF\x02", b"\x89HDF\r\n\x1a\n")
+
+
+class DownloadError(Exception):
+    """A download that failed or didn't validate; the message says why.
+
+    retryable is True for failures worth another attempt: network errors,
+    HTTP 429/5xx and bodies cut short (which resume from the .part file).
+    """
+
+    def __init__(self, message, retryable=False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def looks_like_netcdf(path):
+    """True if the file starts with a NetCDF3 or NetCDF4/HDF5 signature"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(8)
+    except OSError:
+        return False
+    return any(head.startswith(signature) for signature in NETCDF_SIGNATURES)
+
+
+def _parse_checksum(checksum):
+    """'sha256:<hex>' or bare hex (SHA-256) → (algorithm, hex digest)"""
+    if checksum is None:
+        return None, None
+    algorithm, _, digest = checksum.rpartition(":")
+    return (algorithm or "sha256").lower(), digest.lower()
+
+
+def _hash_existing(digest, path):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+
+def _total_size(response, offset):
+    """Full file size from Content-Range (partial or 416 reply) or Content-Length, if the server says"""
+    content_range = response.headers.get("Content-Range", "")
+    if response.status_code in (206, 416):
+        total = content_range.rsplit("/", 1)[1] if "/" in content_range else ""
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return offset + int(length) if length and length.isdigit() else None
+
+
+def _validator(response):
+    """Strong ETag or Last-Modified of a response (what If-Range accepts), or None"""
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _discard(part):
+    for path in (part, f"{part}.validator"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def download_file(url, dest, expected_size=None, checksum=None, session=None, timeout=30,
+                  chunk_size=CHUNK_SIZE, require_netcdf=True):
+    """Download url to dest, resuming a previous partial download.
+
+    checksum is 'sha256:<hex>' (any hashlib algorithm works) or a bare
+    SHA-256 hex digest. Returns a summary dict; raises DownloadError with
+    the reason on an HTTP error, a size or checksum mismatch, or a body
+    that isn't NetCDF (e.g. an HTML error page). The .part file is kept
+    after network errors so the next call resumes, and removed when the
+    content itself is wrong.
+    """
+    algorithm, expected_digest = _parse_checksum(checksum)
+    try:
+        digest = hashlib.new(algorithm or "sha256")
+    except ValueError as e:
+        raise DownloadError(f"unsupported checksum algorithm {algorithm!r}") from e
+
+    part = f"{dest}.part"
+    validator_path = f"{part}.validator"
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    validator = None
+    if os.path.exists(validator_path):
+        with open(validator_path) as f:
+            validator = f.read().strip() or None
+    if (expected_size is not None and offset > expected_size) or (offset and validator is None):
+        # Too long, or no way to tell whether the remote file changed since: start over
+        _discard(part)
+        offset = 0
+
+    http = session or requests.Session()
+    headers = {"Range": f"bytes={offset}-", "If-Range": validator} if offset else {}
+    start = time.perf_counter()
+    restart = False
+    received = 0
+    try:
+        with http.get(url, headers=headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 416 and offset:
+                # Complete only if the server's size (Content-Range: bytes */N) is what we hold
+                total, mode = _total_size(response, offset), "ab"
+                restart = total != offset
+            elif response.status_code in (200, 206):
+                if response.status_code == 200:
+                    # Fresh download, no range support, or If-Range failed (the file changed): start over
+                    offset, mode = 0, "wb"
+                    validator = _validator(response)
+                    _discard(part)
+                    if validator:
+                        with open(validator_path, "w") as f:
+                            f.write(validator)
+                else:
+                    mode = "ab"
+                total = _total_size(response, offset)
+            else:
+                raise DownloadError(f"HTTP {response.status_code} {response.reason} for {url}",
+                                    retryable=response.status_code == 429 or response.status_code >= 500)
+
+            if not restart:
+                if mode == "ab" and offset:
+                    _hash_existing(digest, part)
+                with open(part, mode) as f:
+                    if response.status_code != 416:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            received += len(chunk)
+    except requests.RequestException as e:
+        raise DownloadError(f"{type(e).__name__} while fetching {url}: {e}", retryable=True) from e
+    finally:
+        if session is None:
+            http.close()
+
+    if restart:
+        _discard(part)
+        return download_file(url, dest, expected_size, checksum, session, timeout, chunk_size, require_netcdf)
+
+    size = os.path.getsize(part)
+    problem = None
+    if total is not None and size != total:
+        problem = f"got {size} bytes, server announced {total}"
+    elif expected_size is not None and size != expected_size:
+        problem = f"got {size} bytes, expected {expected_size}"
+    elif expected_digest and digest.hexdigest() != expected_digest:
+        problem = f"{algorithm} mismatch: got {digest.hexdigest()}, expected {expected_digest}"
+    elif require_netcdf and not looks_like_netcdf(part):
+        problem = "response is not a NetCDF file"
+    if problem:
+        # A short body can still be resumed; anything else is bad content
+        short = total is not None and size < total
+        if not short:
+            _discard(part)
+        raise DownloadError(f"{url}: {problem}", retryable=short)
+
+    os.replace(part, dest)
+    _discard(part)
+    seconds = time.perf_counter() - start
+    return {"path": dest, "bytes": size, "resumed_from": offset, "received": received,
+            "seconds": seconds, algorithm or "sha256": digest.hexdigest()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download an Argo file with resume and integrity checks")
+    parser.add_argument("url", help="file URL")
+    parser.add_argument("dest", help="destination path")
+    parser.add_argument("--size", type=int, default=None, help="expected size in bytes")
+    parser.add_argument("--checksum", default=None, help="expected digest, e.g. sha256:<hex>")
+    args = parser.parse_args()
+
+    try:
+        result = download_file(args.url, args.dest, args.size, args.checksum)
+    except DownloadError as e:
+        print(f"❌ Download failed: {e}")
+        raise SystemExit(1)
+    resumed = f", resumed at {result['resumed_from']:,} bytes" if result["resumed_from"] else ""
+    print(f"✅ Downloaded {args.dest}: {result['bytes']:,} bytes in {result['seconds']:.2f}s{resumed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# gdac_index.py
+"""Streaming parser and vectorized selection for the Argo GDAC profile index.
+
+``ar_index_global_prof.txt`` lists every profile file on the GDAC with its
+date, position, ocean, profiler type and institution: millions of CSV rows
+behind a block of ``#`` comments. It is parsed block by block with
+pyarrow's streaming CSV reader into a compact typed table (float32
+positions, dictionary-encoded codes, second-resolution timestamps), which
+is cached as Parquet. Selecting files by region box, date range and ocean
+is then a handful of NumPy masks, and the selected paths go straight to
+bulk_fetch.
+
+    python gdac_index.py ar_index_global_prof.txt.gz --region "bay of bengal" \\
+        --start 2023-12-01 --end 2023-12-31 --fetch --dest argo_files --ingest
+"""
+import argparse
+import datetime
+import gzip
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from regions import REGION_BOUNDS, get_region_bounds, region_mask
+
+GDAC_ROOT = "https://data-argo.ifremer.fr/"
+INDEX_NAME = "ar_index_global_prof.txt"
+INDEX_URL = f"{GDAC_ROOT}{INDEX_NAME}.gz"
+
+OCEAN_CODES = {"A": "Atlantic", "I": "Indian", "P": "Pacific"}
+
+# Bytes of CSV text parsed per streamed block
+BLOCK_SIZE = 4 << 20
+
+INDEX_DATE_FORMAT = "%Y%m%d%H%M%S"
+
+_CSV_TYPES = {"file": pa.string(), "date": pa.string(), "latitude": pa.float32(), "longitude": pa.float32(),
+              "ocean": pa.string(), "profiler_type": pa.int16(), "institution": pa.string(),
+              "date_update": pa.string()}
+
+
+def _comment_lines(path):
+    """Number of leading '#' lines before the CSV header"""
+    count = 0
+    with (gzip.open if path.endswith(".gz") else open)(path, "rb") as f:
+        for line in f:
+            if not line.startswith(b"#"):
+                break
+            count += 1
+    return count
+
+
+def _convert_block(batch):
+    """Typed, compact columns for one parsed CSV block"""
+    columns = {
+        "file": batch.column("file"),
+        "date": pc.strptime(batch.column("date"), format=INDEX_DATE_FORMAT, unit="s", error_is_null=True),
+        "latitude": batch.column("latitude"),
+        "longitude": batch.column("longitude"),
+        "ocean": pc.dictionary_encode(batch.column("ocean")),
+        "profiler_type": batch.column("profiler_type"),
+        "institution": pc.dictionary_encode(batch.column("institution")),
+        "date_update": pc.strptime(batch.column("date_update"), format=INDEX_DATE_FORMAT, unit="s",
+                                   error_is_null=True),
+    }
+    return pa.table(columns)
+
+
+def parse_index(path, block_size=BLOCK_SIZE):
+    """Parse a (optionally gzipped) GDAC profile index into a columnar table.
+
+    The text is streamed block by block, so only one block of raw CSV is in
+    memory at a time alongside the compact typed columns.
+    """
+    read_options = pacsv.ReadOptions(skip_rows=_comment_lines(path), block_size=block_size)
+    convert_options = pacsv.ConvertOptions(column_types=_CSV_TYPES, strings_can_be_null=True)
+    blocks = []
+    with pa.input_stream(path, compression="detect") as stream:
+        reader = pacsv.open_csv(stream, read_options=read_options, convert_options=convert_options)
+        for batch in reader:
+            blocks.append(_convert_block(batch))
+    if not blocks:
+        return _convert_block(pa.table({name: pa.array([], type) for name, type in _CSV_TYPES.items()}))
+    # Blocks have their own dictionaries; unify so the table stays dictionary-encoded
+    return pa.concat_tables(blocks).unify_dictionaries().combine_chunks()
+
+
+def index_to_parquet(src, dst, block_size=BLOCK_SIZE):
+    """Parse a text index and save it as Parquet (atomically replacing dst)"""
+    table = parse_index(src, block_size)
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, dst)
+    return table
+
+
+def load_index(path):
+    """Load an index from Parquet, or from text via a Parquet cache kept next to it"""
+    if path.endswith(".parquet"):
+        return pq.read_table(path)
+    cache = os.path.splitext(path[:-3] if path.endswith(".gz") else path)[0] + ".parquet"
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        return pq.read_table(cache)
+    try:
+        return index_to_parquet(path, cache)
+    except OSError as e:
+        print(f"⚠️  Couldn't cache the index as {cache}: {e}")
+        return parse_index(path)
+
+
+def _range_end(end):
+    """Inclusive end of a date range; a date without a time means the end of that day"""
+    stamp = pd.Timestamp(end)
+    date_only = isinstance(end, str) and len(end.strip()) <= len("YYYY-MM-DD")
+    if date_only or (isinstance(end, datetime.date) and not isinstance(end, datetime.datetime)):
+        stamp = stamp.normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return stamp
+
+
+def select_profiles(index, regions=None, time_range=None, oceans=None):
+    """Index rows inside any of the named regions, a date range and ocean codes.
+
+    regions are free-text names as understood by filter_data (unknown names
+    match nothing); time_range is a (start, end) pair, inclusive (a
+    date-only end covers that whole day); oceans is an iterable of codes
+    like "I". Rows with a blank date or position never match a range or
+    region. Returns the matching rows as a table.
+    """
+    mask = np.ones(index.num_rows, dtype=bool)
+    if regions:
+        latitude = index["latitude"].to_numpy(zero_copy_only=False)
+        longitude = index["longitude"].to_numpy(zero_copy_only=False)
+        inside = np.zeros(index.num_rows, dtype=bool)
+        for region in regions:
+            bounds = get_region_bounds(region)
+            if bounds:
+                inside |= region_mask(latitude, longitude, bounds)
+        mask &= inside
+    if time_range is not None:
+        dates = index["date"].to_numpy(zero_copy_only=False).astype("datetime64[s]")
+        start = np.datetime64(pd.Timestamp(time_range[0]).to_datetime64(), "s")
+        end = np.datetime64(_range_end(time_range[1]).to_datetime64(), "s")
+        mask &= (dates >= start) & (dates <= end)
+    if oceans:
+        mask &= pc.is_in(index["ocean"], value_set=pa.array([o.upper() for o in oceans])) \
+            .to_numpy(zero_copy_only=False).astype(bool)
+    return index.filter(mask)
+
+
+def file_list(selection):
+    """GDAC paths (relative to the dac/ directory) of selected index rows"""
+    return selection["file"].to_pylist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Select Argo profile files from the GDAC index")
+    parser.add_argument("index", help=f"{INDEX_NAME}[.gz] or its .parquet cache (downloaded if missing)")
+    parser.add_argument("--region", action="append", default=None,
+                        help="region name (repeatable; default: every known region)")
+    parser.add_argument("--start", default=None, help="first profile date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="last profile date (YYYY-MM-DD)")
+    parser.add_argument("--ocean", action="append", default=None, choices=sorted(OCEAN_CODES),
+                        help="ocean code (repeatable)")
+    parser.add_argument("--output", default=None, help="write the selected paths here, one per line")
+    parser.add_argument("--fetch", action="store_true", help="download the selected files with bulk_fetch")
+    parser.add_argument("--dest", default="argo_files", help="download directory (with --fetch)")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent downloads (with --fetch)")
+    parser.add_argument("--ingest", action="store_true", help="ingest fetched files into the profile store")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.index):
+        from downloader import download_file, DownloadError
+        print(f"Downloading the GDAC index to {args.index}...")
+        try:
+            download_file(INDEX_URL if args.index.endswith(".gz") else INDEX_URL[:-3], args.index,
+                          require_netcdf=False)
+        except DownloadError as e:
+            print(f"❌ Couldn't download the index: {e}")
+            raise SystemExit(1)
+
+    start = time.perf_counter()
+    index = load_index(args.index)
+    loaded = time.perf_counter() - start
+    time_range = (args.start or "1900-01-01", args.end or "2100-01-01") if args.start or args.end else None
+    selection = select_profiles(index, args.region or list(REGION_BOUNDS), time_range, args.ocean)
+    paths = file_list(selection)
+    print(f"✅ {len(paths):,} of {index.num_rows:,} profiles selected "
+          f"(index loaded in {loaded:.2f}s, selected in {time.perf_counter() - start - loaded:.3f}s)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.writelines(f"{path}\n" for path in paths)
+    if args.fetch:
+        # Imported here so selecting files doesn't pull in the network stack
+        from bulk_fetch import fetch_files, fetch_and_ingest
+        if args.ingest:
+            summary, ingested = fetch_and_ingest(paths, args.dest, workers=args.workers)
+            print(f"✅ Ingested {ingested['ingested']} files, {ingested['rows']:,} rows")
+        else:
+            summary = fetch_files(paths, args.dest, workers=args.workers)
+        print(f"✅ Fetched {summary['fetched']} files ({summary['skipped']} already present, "
+              f"{summary['failed']} failed) → {summary['files_per_second']} files/s")
+
+
+if __name__ == "__main__":
+    main()
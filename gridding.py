@@ -0,0 +1,164 @@
+# gridding.py
+"""Bin scattered observations onto a regular time/lat/lon grid.
+
+Every observation gets a flat cell index, and sums, counts and squared
+deviations are accumulated with ``np.bincount``, so gridding is a handful of
+whole-array passes however many profiles there are. Values may carry an extra
+trailing axis (e.g. standard depth levels), which becomes a ``depth``
+dimension of the grid.
+"""
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+STATISTICS = ("mean", "count", "std")
+
+
+def grid_axis(values, resolution, bounds=None):
+    """Cell centres covering bounds (or the data extent) at the given resolution"""
+    lo, hi = bounds if bounds is not None else (np.nanmin(values), np.nanmax(values))
+    first = np.floor(lo / resolution)
+    n = int(np.floor(hi / resolution) - first) + 1
+    return (first + np.arange(n) + 0.5) * resolution
+
+
+def time_bins(times, freq="D"):
+    """Start of the time bin ("D", "W", "M", ...) each timestamp falls in"""
+    index = pd.DatetimeIndex(times)
+    if freq == "D":
+        return index.floor("D")
+    return index.to_period(freq).start_time
+
+
+def bin_observations(lat, lon, times, values, resolution=1.0, lat_range=None, lon_range=None,
+                     freq="D", statistics=STATISTICS):
+    """Aggregate scattered values per (time, lat, lon) cell with NaN-aware statistics.
+
+    values is (n_obs,) or (n_obs, n_levels). Returns a dict of the requested
+    statistics, each (n_times, [n_levels,] n_lat, n_lon), plus the axes under
+    "time", "latitude" and "longitude". Empty cells are NaN (count 0).
+    """
+    lat = np.asarray(lat, dtype="float64")
+    lon = np.asarray(lon, dtype="float64")
+    values = np.asarray(values, dtype="float64")
+    flat_values = values.ndim == 1
+    if flat_values:
+        values = values[:, None]
+    n_levels = values.shape[1]
+
+    lat_axis = grid_axis(lat, resolution, lat_range)
+    lon_axis = grid_axis(lon, resolution, lon_range)
+    time_axis, time_idx = np.unique(time_bins(times, freq).values.astype("datetime64[ns]"),
+                                    return_inverse=True)
+    lat_idx = np.floor(lat / resolution).astype("int64") - int(np.floor(lat_axis[0] / resolution))
+    lon_idx = np.floor(lon / resolution).astype("int64") - int(np.floor(lon_axis[0] / resolution))
+    inside = (lat_idx >= 0) & (lat_idx < len(lat_axis)) & (lon_idx >= 0) & (lon_idx < len(lon_axis))
+
+    # One flat index per (observation, level) in (time, level, lat, lon) order
+    shape = (len(time_axis), n_levels, len(lat_axis), len(lon_axis))
+    plane = shape[2] * shape[3]
+    cell = (time_idx * n_levels * plane + lat_idx * shape[3] + lon_idx)[:, None] \
+        + np.arange(n_levels)[None, :] * plane
+    valid = inside[:, None] & ~np.isnan(values)
+    cell, obs = cell[valid], values[valid]
+    size = int(np.prod(shape))
+
+    count = np.bincount(cell, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(cell, weights=obs, minlength=size) / count
+    result = {}
+    if "mean" in statistics:
+        result["mean"] = mean
+    if "count" in statistics:
+        result["count"] = count
+    if "std" in statistics:
+        # Two-pass: squared deviations from each cell's own mean, for stability
+        squares = np.bincount(cell, weights=(obs - mean[cell]) ** 2, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result["std"] = np.sqrt(squares / count)
+
+    for name, grid in result.items():
+        grid = grid.reshape(shape)
+        result[name] = grid[:, 0] if flat_values else grid
+    result.update(time=time_axis, latitude=lat_axis, longitude=lon_axis)
+    return result
+
+
+def smooth_grid(data, sigma):
+    """NaN-aware Gaussian smoothing over the latitude/longitude dimensions.
+
+    sigma is in grid cells. Empty cells stay empty; the filter is normalised
+    by the smoothed data mask so coastlines and gaps don't bias values low.
+    """
+    if not sigma:
+        return data
+    # scipy.ndimage is slow to import and only needed for smoothed maps
+    from scipy.ndimage import gaussian_filter
+    sigmas = [sigma if dim in ("latitude", "longitude") else 0 for dim in data.dims]
+    values = data.values.astype("float64")
+    mask = ~np.isnan(values)
+    weight = gaussian_filter(mask.astype("float64"), sigmas, mode="nearest")
+    smoothed = gaussian_filter(np.where(mask, values, 0.0), sigmas, mode="nearest")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        smoothed = np.where(mask, smoothed / weight, np.nan)
+    return data.copy(data=smoothed.astype(data.dtype))
+
+
+def _block_mean(values, factors):
+    """NaN-aware mean over non-overlapping blocks; edges are padded with NaN to whole blocks"""
+    pad = [(0, -n % f) for n, f in zip(values.shape, factors)]
+    values = np.pad(values.astype("float64"), pad, constant_values=np.nan)
+    shape = [s for n, f in zip(values.shape, factors) for s in (n // f, f)]
+    blocks = values.reshape(shape)
+    axes = tuple(range(1, blocks.ndim, 2))
+    counts = (~np.isnan(blocks)).sum(axis=axes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, np.nansum(blocks, axis=axes) / counts, np.nan)
+
+
+def decimate_grid(z, x, y, max_vertices):
+    """Block-average a (y, x) grid and its 1-D axes down to at most max_vertices cells.
+
+    The same factor is used on both axes (fewer on an axis that's already
+    short), so the surface keeps its shape; empty cells stay empty.
+    Returns (z, x, y) unchanged if the grid is already within budget.
+    """
+    ny, nx = z.shape
+    if ny * nx <= max_vertices:
+        return z, x, y
+    factor = int(np.ceil(np.sqrt(ny * nx / max_vertices)))
+    factors = [min(factor, ny), min(factor, nx)]
+    # An axis capped at its length leaves the other to absorb the rest
+    while np.ceil(ny / factors[0]) * np.ceil(nx / factors[1]) > max_vertices:
+        factors[int(np.ceil(ny / factors[0]) <= np.ceil(nx / factors[1]))] += 1
+    return (_block_mean(z, factors), _block_mean(np.asarray(x), factors[1:]),
+            _block_mean(np.asarray(y), factors[:1]))
+
+
+def grid_dataset(lat, lon, times, variables, resolution=1.0, lat_range=None, lon_range=None,
+                 freq="D", levels=None, statistics=("mean",), smooth_sigma=None):
+    """Grid several variables sharing the same observation positions into a Dataset.
+
+    variables maps names to (n_obs,) or (n_obs, n_levels) arrays; levels
+    labels the depth axis of the latter. The mean keeps the variable's name,
+    other statistics are added as ``<name>_count`` / ``<name>_std``.
+    """
+    data_vars, coords = {}, None
+    for name, values in variables.items():
+        binned = bin_observations(lat, lon, times, values, resolution, lat_range, lon_range,
+                                  freq, statistics)
+        dims = ["time", "depth", "latitude", "longitude"] if np.ndim(values) == 2 else \
+            ["time", "latitude", "longitude"]
+        coords = {"time": binned["time"], "latitude": binned["latitude"], "longitude": binned["longitude"]}
+        if "depth" in dims:
+            coords["depth"] = levels if levels is not None else np.arange(np.shape(values)[1])
+        for stat in statistics:
+            key = name if stat == "mean" else f"{name}_{stat}"
+            grid = binned[stat].astype("int32" if stat == "count" else "float32")
+            data_vars[key] = (dims, grid)
+
+    ds = xr.Dataset(data_vars, coords=coords)
+    if smooth_sigma:
+        for name in variables:
+            ds[name] = smooth_grid(ds[name], smooth_sigma)
+    return ds
@@ -0,0 +1,296 @@
+# hot_reload.py
+"""Hot reload of the dataset when its source files change.
+
+A watchdog observer watches the files load_ocean_data reads from (the
+profile store manifest and the sample Argo file; see
+data_handler.dataset_sources). Once a burst of events has settled, the new
+version is loaded and warmed on a background thread while the old one keeps
+serving queries, then swapped in with a single reference assignment.
+
+Derived caches are carried over for whatever didn't change: the new
+dataset is diffed against the old one, and only the variables and regions
+that differ are invalidated (spatial index, climatology, gridded regions,
+time series, contours, all-region tables).
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import xarray as xr
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from climatology import retain_climatology
+from contours import retain_contours
+from data_handler import retain_gridded_regions
+from distributions import retain_histograms
+from query_handler import retain_spatial_index
+from region_stats import retain_region_tables
+from regions import REGION_BOUNDS, region_mask
+from timeseries import retain_series
+
+# Quiet period after the last file event before reloading, so a file being
+# written (or a store being ingested) is only picked up once it's complete
+DEBOUNCE_SECONDS = 1.0
+
+_GRID_DIMS = ("depth", "latitude", "longitude")
+
+# Axes the profile store derives from the data's extent; old and new are aligned on their union
+_EXTENT_DIMS = ("latitude", "longitude")
+
+
+def _same(a, b):
+    return a.shape == b.shape and np.array_equal(a, b, equal_nan=a.dtype.kind == "f")
+
+
+def _changed_cells(old, new):
+    """(latitude, longitude) mask of cells whose values differ between two versions of a variable"""
+    dims = [d for d in new.dims if d not in ("latitude", "longitude")]
+    changed = np.zeros((new.sizes["latitude"], new.sizes["longitude"]), dtype=bool)
+    if "time" in new.dims:
+        old_times, new_times = old["time"].values, new["time"].values
+        common = np.intersect1d(old_times, new_times)
+        # Cells with data at time steps only one version has
+        for data, times in ((old, np.setdiff1d(old_times, common)), (new, np.setdiff1d(new_times, common))):
+            if len(times):
+                extra = data.sel(time=times).notnull().any([d for d in dims if d in data.dims])
+                changed |= extra.transpose("latitude", "longitude").values
+        old, new = old.sel(time=common), new.sel(time=common)
+    a = old.transpose(*dims, "latitude", "longitude").values
+    b = new.transpose(*dims, "latitude", "longitude").values
+    differs = ~((a == b) | (np.isnan(a) & np.isnan(b))) if a.dtype.kind == "f" else a != b
+    return changed | differs.reshape(-1, *differs.shape[-2:]).any(axis=0)
+
+
+def _positions_changed(old, new):
+    """Whether the inputs of the spatial index differ (see spatial_index.build_spatial_index)"""
+    names = ("profile_latitude", "profile_longitude", "profile_platform", "profile_time")
+    if any(name in old.coords or name in new.coords for name in names):
+        return not all(name in old.coords and name in new.coords and _same(old[name].values, new[name].values)
+                       for name in names)
+    if list(old.data_vars)[:1] != list(new.data_vars)[:1]:
+        return True
+    name = list(new.data_vars)[0]
+    last = {dim: -1 if dim == "time" else 0 for dim in ("time", "depth") if dim in new[name].dims}
+    return not _same(old[name].isel(last).notnull().values, new[name].isel(last).notnull().values)
+
+
+def _same_lattice(a, b):
+    """Whether two sorted, evenly spaced axes are cells of one grid (same step, offsets whole steps)"""
+    steps = [np.diff(axis) for axis in (a, b) if len(axis) > 1]
+    if not steps:
+        return False
+    step = steps[0][0]
+    offset = (b[0] - a[0]) / step
+    return step > 0 and all(np.allclose(s, step) for s in steps) and np.isclose(offset, np.round(offset))
+
+
+def _align_extents(old, new):
+    """Put old and new on the union of their latitude/longitude axes, or None if the grids don't line up.
+
+    Grids built from the data (see argo_profiles.profiles_to_dataset) grow
+    and shrink with the profiles' extent, but their cells stay on the same
+    lattice; cells only one version covers are empty (NaN) in the other.
+    """
+    for dim in _EXTENT_DIMS:
+        a, b = old[dim].values, new[dim].values
+        if not _same(a, b) and not _same_lattice(a, b):
+            return None
+    exclude = set(old.dims) | set(new.dims)
+    return xr.align(old, new, join="outer", exclude=exclude - set(_EXTENT_DIMS))
+
+
+def diff_datasets(old, new):
+    """What changed between two versions of the dataset.
+
+    Returns a dict with "full" (the grid itself changed, nothing can be
+    reused), the changed "variables", the REGION_BOUNDS names whose box
+    holds a changed cell ("regions") and whether float "positions" changed.
+    A latitude/longitude extent that grew or shrank on the same grid is
+    compared over the union of both, so a new ingest only invalidates
+    where its data landed.
+    """
+    everything = {"full": True, "variables": set(getattr(new, "data_vars", ())), "regions": set(REGION_BOUNDS),
+                  "positions": True}
+    if old is None or new is None:
+        return everything
+    for dim in _GRID_DIMS:
+        if (dim in old.coords) != (dim in new.coords):
+            return everything
+    if not {"latitude", "longitude"} <= set(new.coords):
+        return everything
+    if "depth" in new.coords and not _same(old["depth"].values, new["depth"].values):
+        return everything
+    aligned = _align_extents(old, new)
+    if aligned is None:
+        return everything
+    old, new = aligned
+
+    variables = set(old.data_vars) ^ set(new.data_vars)
+    cells = np.zeros((new.sizes["latitude"], new.sizes["longitude"]), dtype=bool)
+    for name in set(old.data_vars) & set(new.data_vars):
+        if old[name].dims != new[name].dims or not {"latitude", "longitude"} <= set(new[name].dims):
+            variables.add(name)
+            cells[:] = True
+            continue
+        changed = _changed_cells(old[name], new[name])
+        if changed.any():
+            variables.add(name)
+            cells |= changed
+    lat, lon = np.meshgrid(new["latitude"].values, new["longitude"].values, indexing="ij")
+    regions = {name for name, bounds in REGION_BOUNDS.items() if (cells & region_mask(lat, lon, bounds)).any()}
+    if variables - (set(old.data_vars) & set(new.data_vars)):
+        # A variable was added or removed: every region's answers may differ
+        regions = set(REGION_BOUNDS)
+    return {"full": False, "variables": variables, "regions": regions,
+            "positions": _positions_changed(old, new)}
+
+
+def carry_over(old, new, changes):
+    """Move derived caches of unchanged variables and regions from old to new. Returns what was kept"""
+    kept = []
+    if changes["full"]:
+        return kept
+    if not changes["positions"] and retain_spatial_index(old, new):
+        kept.append("spatial index")
+    climatology = retain_climatology(old, new, changes["variables"])
+    if climatology:
+        kept.append(f"climatology of {', '.join(sorted(climatology))}")
+    gridded = retain_gridded_regions(old.attrs.get("version"), new.attrs.get("version"), changes["regions"])
+    if gridded:
+        kept.append(f"{gridded} gridded regions")
+    series = retain_series(old, new, changes["variables"], changes["regions"])
+    if series:
+        kept.append(f"{series} time series")
+    tables = retain_region_tables(old, new, changes["variables"])
+    if tables:
+        kept.append(f"{tables} all-region tables")
+    histograms = retain_histograms(old, new, changes["variables"])
+    if histograms:
+        kept.append(f"{histograms} histogram tables")
+    contours = retain_contours(old, new, changes["variables"], changes["regions"])
+    if contours:
+        kept.append(f"{contours} contour sets")
+    return kept
+
+
+# Events that mean a file was written or replaced; opens and read-only
+# closes (including the reload's own) are ignored
+_WRITE_EVENTS = {"created", "modified", "moved", "deleted", "closed"}
+
+
+class _SourceHandler(FileSystemEventHandler):
+    def __init__(self, holder):
+        self.holder = holder
+
+    def on_any_event(self, event):
+        if event.event_type not in _WRITE_EVENTS:
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        if event.is_directory and event.event_type == "created":
+            self.holder._watch_new_directory(event.src_path)
+        if any(os.path.abspath(p) in self.holder.sources for p in paths if p):
+            self.holder.schedule_reload()
+
+
+class DatasetHolder:
+    """The current dataset, replaced in the background when its source files change.
+
+    Readers just use .current; a reload never blocks them, and they see
+    either the old or the new dataset, never a half-built one. warm(new) runs
+    before a swap and on_swap(old, new, changes) after it.
+    """
+
+    def __init__(self, loader, sources, warm=None, on_swap=None, debounce=DEBOUNCE_SECONDS):
+        self.loader = loader
+        self.sources = {os.path.abspath(path) for path in sources}
+        self.warm = warm
+        self.on_swap = on_swap
+        self.debounce = debounce
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self._timer = None
+        self._timer_lock = threading.Lock()
+        self._observer = None
+        self._watched = set()
+        self.current = loader()
+        if warm is not None and self.current is not None:
+            warm(self.current)
+
+    def start(self):
+        """Watch the source files' directories (or their nearest existing parents)"""
+        self._observer = Observer()
+        self._observer.daemon = True
+        for path in self.sources:
+            directory = os.path.dirname(path)
+            while not os.path.isdir(directory):
+                directory = os.path.dirname(directory)
+            self._watch(directory)
+        self._observer.start()
+        return self
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+
+    def _watch(self, directory):
+        if directory not in self._watched:
+            self._watched.add(directory)
+            self._observer.schedule(_SourceHandler(self), directory, recursive=False)
+
+    def _watch_new_directory(self, directory):
+        # e.g. the profile store created by a first ingest: watch it for its manifest
+        directory = os.path.abspath(directory)
+        if any(os.path.dirname(path) == directory for path in self.sources):
+            self._watch(directory)
+            self.schedule_reload()
+
+    def schedule_reload(self):
+        """(Re)start the debounce timer; the reload runs once events go quiet"""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.reload)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def reload(self):
+        """Load, diff, warm and swap in the new dataset. Returns the summary dict, or None"""
+        with self._reload_lock:
+            start = time.perf_counter()
+            old = self.current
+            try:
+                new = self.loader()
+            except Exception as e:
+                new = None
+                print(f"⚠️  Reload failed ({e})")
+            if new is None:
+                print("⚠️  Reload produced no dataset; still serving the previous version")
+                return None
+            if old is not None and new.attrs.get("version") and new.attrs.get("version") == old.attrs.get("version"):
+                new.close()
+                return None
+
+            changes = diff_datasets(old, new)
+            kept = carry_over(old, new, changes)
+            if self.warm is not None:
+                self.warm(new)
+            self.current = new
+            self.reloads += 1
+            if self.on_swap is not None:
+                self.on_swap(old, new, changes)
+            if old is not None:
+                # Release its file handles; a reader still holding it reopens the file lazily
+                old.close()
+            summary = dict(changes, kept=kept, seconds=time.perf_counter() - start)
+            what = "everything" if changes["full"] else (
+                f"{', '.join(sorted(changes['variables'])) or 'nothing'} in "
+                f"{', '.join(sorted(changes['regions'])) or 'no region'}")
+            print(f"🔄 Reloaded dataset {new.attrs.get('version', '')} in {summary['seconds']:.2f}s: "
+                  f"changed {what}; kept {', '.join(kept) or 'no caches'}")
+            return summary
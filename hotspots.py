@@ -0,0 +1,67 @@
+# hotspots.py
+"""Threshold and top-k ("hotspot") selections over a region's latest grid.
+
+"Where is temperature above 29 °C" is a vectorized mask over the slab;
+"the 5 saltiest spots" is ``np.argpartition``, which finds the k extreme
+cells in linear time; only those k are sorted. Neither sorts the full grid,
+so both stay fast on global grids.
+"""
+import numpy as np
+import pandas as pd
+
+# Spots returned by "hottest spots" queries that don't give a count
+HOTSPOT_COUNT = 5
+
+# Most cells returned (and drawn as markers) for a threshold query; the rest are only counted
+MAX_MARKERS = 500
+
+
+def latest_grid(data):
+    """The last time step of data as a (latitude, longitude) DataArray"""
+    latest = data.isel(time=-1) if "time" in data.dims else data
+    return latest.transpose("latitude", "longitude")
+
+
+def _extremes(values, k, largest):
+    """Flat indices of the k largest (or smallest) finite values, most extreme first"""
+    key = np.where(np.isnan(values), -np.inf, values if largest else -values)
+    k = min(k, int(np.isfinite(key).sum()))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    picked = np.argpartition(key, -k)[-k:]
+    return picked[np.argsort(key[picked])[::-1]]
+
+
+def find_hotspots(data, above=None, below=None, top=None, bottom=None, limit=MAX_MARKERS):
+    """Cells of the latest time step above/below thresholds, or the top/bottom k.
+
+    Returns (DataFrame of latitude, longitude, value, most extreme first,
+    number of matching cells, number of cells with data).
+    """
+    latest = latest_grid(data)
+    values = latest.values.ravel()
+    valid = int(np.count_nonzero(~np.isnan(values)))
+
+    if top is not None or bottom is not None:
+        index = _extremes(values, int(top if top is not None else bottom), largest=top is not None)
+        matches = len(index)
+    else:
+        mask = ~np.isnan(values)
+        if above is not None:
+            mask &= values > above
+        if below is not None:
+            mask &= values < below
+        index = np.flatnonzero(mask)
+        matches = len(index)
+        # Keep the most extreme matches: highest for "above", lowest for "below" only
+        largest = above is not None or below is None
+        if matches > limit:
+            index = index[_extremes(values[index], limit, largest)]
+        else:
+            index = index[np.argsort(values[index])[::-1 if largest else 1]]
+
+    rows, cols = np.unravel_index(index, latest.shape)
+    spots = pd.DataFrame({"latitude": latest["latitude"].values[rows],
+                          "longitude": latest["longitude"].values[cols],
+                          "value": values[index]})
+    return spots, matches, valid
@@ -0,0 +1,98 @@
+# nc_layout.py
+"""Chunked, compressed NetCDF4 layout tuned for FloatChat queries.
+
+Queries read one region box, usually at one depth, either at the latest
+time step (maps, contours, 3D) or across all steps (trends, stats). Chunks
+are therefore one depth level deep, as wide as the smallest region box (so
+small regions touch only a few chunks and large ones read mostly whole
+chunks), and as many time steps long as fit a small chunk size, compressed
+with zlib behind the shuffle filter. See benchmarks/bench_layout.py.
+
+    python nc_layout.py comprehensive_dummy_data.nc chunked.nc
+"""
+import argparse
+import os
+
+import numpy as np
+import xarray as xr
+
+from regions import REGION_BOUNDS
+
+# Uncompressed bytes per chunk to aim for: small enough that a latest-step
+# map reads little beyond its box, large enough to keep trend reads to a few chunks
+TARGET_CHUNK_BYTES = 16 * 1024
+
+COMPRESSION_LEVEL = 4
+
+
+def _axis_step(values):
+    values = np.asarray(values, dtype="float64")
+    return float(np.median(np.diff(values))) if len(values) > 1 else 1.0
+
+
+def region_box_cells(ds):
+    """Smallest region box extent in grid cells as (n_lat, n_lon)"""
+    lat_step, lon_step = _axis_step(ds["latitude"].values), _axis_step(ds["longitude"].values)
+    heights = [lat[1] - lat[0] for lat, _ in REGION_BOUNDS.values()]
+    widths = [lon[1] - lon[0] for _, lon in REGION_BOUNDS.values()]
+    return (max(1, int(np.ceil(min(heights) / lat_step))),
+            max(1, int(np.ceil(min(widths) / lon_step))))
+
+
+def choose_chunks(ds, name):
+    """Chunk shape for one variable, in its dimension order"""
+    var = ds[name]
+    box_lat, box_lon = region_box_cells(ds)
+    sizes = dict(var.sizes)
+    chunks = {
+        "depth": 1,
+        "latitude": min(box_lat, sizes.get("latitude", 1)),
+        "longitude": min(box_lon, sizes.get("longitude", 1)),
+    }
+    plane = chunks["latitude"] * chunks["longitude"] * var.dtype.itemsize
+    chunks["time"] = int(np.clip(TARGET_CHUNK_BYTES // plane, 1, sizes.get("time", 1)))
+    return tuple(min(chunks.get(dim, size), size) for dim, size in sizes.items())
+
+
+def chunked_encoding(ds, complevel=COMPRESSION_LEVEL):
+    """NetCDF4 encoding with tuned chunks, zlib and shuffle for every gridded variable"""
+    encoding = {}
+    for name in ds.data_vars:
+        if {"latitude", "longitude"} <= set(ds[name].dims):
+            encoding[name] = {"zlib": True, "shuffle": True, "complevel": complevel,
+                              "chunksizes": choose_chunks(ds, name)}
+    return encoding
+
+
+def write_chunked_netcdf(ds, path, complevel=COMPRESSION_LEVEL):
+    """Write a dataset as chunked, compressed NetCDF4 (atomically replacing path)"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    ds.to_netcdf(tmp, engine="netcdf4", format="NETCDF4", encoding=chunked_encoding(ds, complevel))
+    os.replace(tmp, path)
+    return path
+
+
+def convert(src, dst, complevel=COMPRESSION_LEVEL):
+    """Rewrite an existing NetCDF file with the tuned layout"""
+    with xr.open_dataset(src) as ds:
+        ds.load()
+    # Drop the source file's own storage settings so the new ones apply cleanly
+    for var in ds.variables.values():
+        var.encoding = {k: v for k, v in var.encoding.items() if k in ("dtype", "units", "calendar", "_FillValue")}
+    return write_chunked_netcdf(ds, dst, complevel)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite a NetCDF file with FloatChat's chunked, compressed layout")
+    parser.add_argument("src", help="input NetCDF file")
+    parser.add_argument("dst", help="output NetCDF4 file")
+    parser.add_argument("--complevel", type=int, default=COMPRESSION_LEVEL, help="zlib level 1-9")
+    args = parser.parse_args()
+
+    convert(args.src, args.dst, args.complevel)
+    before, after = os.path.getsize(args.src), os.path.getsize(args.dst)
+    print(f"✅ Wrote {args.dst}: {before / 1e6:.2f} MB → {after / 1e6:.2f} MB ({before / max(after, 1):.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
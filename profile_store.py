@@ -0,0 +1,174 @@
+# profile_store.py
+"""Partitioned Parquet store for ingested Argo profile measurements.
+
+Rows are written hive-style under ``<store>/parts`` partitioned by
+year/month and a coarse lat/lon tile, sorted by time and latitude inside each
+file so Parquet row-group statistics stay tight. Region and time queries
+prune partitions from the directory names and skip row groups from their
+min/max statistics, so I/O follows the size of the answer.
+"""
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pads
+import pyarrow.parquet as pq
+
+from argo_profiles import PROFILE_COLUMNS, empty_profile_table
+
+PARTS_DIR = "parts"
+
+# Coarse spatial tile edge in degrees
+TILE_DEGREES = 10
+
+ROW_GROUP_ROWS = 64 * 1024
+
+PARTITIONING = pads.partitioning(
+    pa.schema([("year", pa.int16()), ("month", pa.int8()),
+               ("lat_tile", pa.int16()), ("lon_tile", pa.int16())]),
+    flavor="hive",
+)
+
+
+def _parts_dir(store):
+    return os.path.join(store, PARTS_DIR)
+
+
+def _partition_keys(table):
+    times = table["time"].dt
+    return pd.DataFrame({
+        "year": times.year.astype("int16"),
+        "month": times.month.astype("int8"),
+        "lat_tile": np.floor(table["latitude"] / TILE_DEGREES).astype("int16"),
+        "lon_tile": np.floor(table["longitude"] / TILE_DEGREES).astype("int16"),
+    }, index=table.index)
+
+
+def partition_dirs(table):
+    """Store-relative partition directories the rows of a table are written to"""
+    keys = _partition_keys(table).drop_duplicates()
+    return {os.path.join(PARTS_DIR, f"year={y}", f"month={m}", f"lat_tile={a}", f"lon_tile={b}")
+            for y, m, a, b in keys.itertuples(index=False)}
+
+
+def write_partitioned(store, table):
+    """Append a profile table to the store; returns the written file paths relative to the store"""
+    if table.empty:
+        return []
+    table = pd.concat([table, _partition_keys(table)], axis=1).sort_values(["time", "latitude"], kind="stable")
+
+    written = []
+    parquet = pads.ParquetFileFormat()
+    pads.write_dataset(
+        pa.Table.from_pandas(table, preserve_index=False),
+        _parts_dir(store),
+        format=parquet,
+        file_options=parquet.make_write_options(compression="zstd"),
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+        max_rows_per_group=ROW_GROUP_ROWS,
+        min_rows_per_group=min(ROW_GROUP_ROWS, len(table)),
+        existing_data_behavior="overwrite_or_ignore",
+        file_visitor=lambda f: written.append(os.path.relpath(f.path, store)),
+    )
+    return written
+
+
+def drop_sources(store, paths, source_ids, staging=None):
+    """Rewrite the given store files without rows from the given source ids.
+
+    With a store-relative staging directory the rewritten files go under it
+    and nothing in place changes: the returned (staged file or None to
+    delete, file) moves, relative to the store, are the caller's to swap in.
+    """
+    stale = pa.array(sorted(source_ids), type=pa.int32())
+    moves = []
+    for rel in paths:
+        path = os.path.join(store, rel)
+        if not os.path.exists(path):
+            continue
+        table = pq.read_table(path)
+        kept = table.filter(pc.invert(pc.is_in(table["source_id"], value_set=stale)))
+        if kept.num_rows == table.num_rows:
+            continue
+        if kept.num_rows == 0:
+            moves.append((None, rel))
+            continue
+        target = rel if staging is None else os.path.join(staging, rel)
+        os.makedirs(os.path.dirname(os.path.join(store, target)), exist_ok=True)
+        pq.write_table(kept, os.path.join(store, target), compression="zstd", row_group_size=ROW_GROUP_ROWS)
+        moves.append((target, rel))
+    if staging is None:
+        for staged, rel in moves:
+            if staged is None:
+                os.remove(os.path.join(store, rel))
+    return moves
+
+
+def _lon_ranges(lon_range):
+    """Split a box that runs past 180°E into ranges within [-180, 180]"""
+    lon0, lon1 = lon_range
+    if lon1 - lon0 >= 360:
+        return [(-180, 180)]
+    if lon0 >= 180:
+        return [(lon0 - 360, lon1 - 360)]
+    if lon1 > 180:
+        return [(lon0, 180), (-180, lon1 - 360)]
+    return [(lon0, lon1)]
+
+
+def _tile_span(lo, hi):
+    return int(np.floor(lo / TILE_DEGREES)), int(np.floor(hi / TILE_DEGREES))
+
+
+def store_filter(lat_range=None, lon_range=None, time_range=None, max_pressure=None):
+    """Build the pyarrow filter for a box/time query.
+
+    Partition-key terms prune whole directories; the column terms are pushed
+    down to Parquet row-group statistics.
+    """
+    terms = []
+    if lat_range is not None:
+        t0, t1 = _tile_span(*lat_range)
+        terms.append((pc.field("lat_tile") >= t0) & (pc.field("lat_tile") <= t1))
+        terms.append((pc.field("latitude") >= lat_range[0]) & (pc.field("latitude") <= lat_range[1]))
+    if lon_range is not None:
+        lon_terms = []
+        for lo, hi in _lon_ranges(lon_range):
+            t0, t1 = _tile_span(lo, hi)
+            lon_terms.append((pc.field("lon_tile") >= t0) & (pc.field("lon_tile") <= t1)
+                             & (pc.field("longitude") >= lo) & (pc.field("longitude") <= hi))
+        terms.append(lon_terms[0] if len(lon_terms) == 1 else lon_terms[0] | lon_terms[1])
+    if time_range is not None:
+        start, end = pd.Timestamp(time_range[0]), pd.Timestamp(time_range[1])
+        year, month = pc.field("year"), pc.field("month")
+        terms.append((year > start.year) | ((year == start.year) & (month >= start.month)))
+        terms.append((year < end.year) | ((year == end.year) & (month <= end.month)))
+        terms.append((pc.field("time") >= pa.scalar(start.value, pa.timestamp("ns")))
+                     & (pc.field("time") <= pa.scalar(end.value, pa.timestamp("ns"))))
+    if max_pressure is not None:
+        terms.append(pc.field("pressure") <= max_pressure)
+
+    expression = None
+    for term in terms:
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def query_profile_store(store, lat_range=None, lon_range=None, time_range=None,
+                        max_pressure=None, columns=None):
+    """Read only the store rows inside a lat/lon box, time range and pressure limit"""
+    parts_dir = _parts_dir(store)
+    if not os.path.isdir(parts_dir):
+        return empty_profile_table()
+    dataset = pads.dataset(parts_dir, format="parquet", partitioning=PARTITIONING)
+    columns = columns or list(PROFILE_COLUMNS) + ["source_id"]
+    table = dataset.to_table(columns=columns,
+                             filter=store_filter(lat_range, lon_range, time_range, max_pressure))
+    frame = table.to_pandas()
+    if frame.empty:
+        return empty_profile_table()
+    return frame.astype({k: v for k, v in PROFILE_COLUMNS.items() if k in frame})
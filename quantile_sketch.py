@@ -0,0 +1,303 @@
+# quantile_sketch.py
+"""Mergeable quantile sketches of the profile store, per region, parameter, layer and month.
+
+A QuantileSketch is a KLL sketch: a stack of buffers where an item in
+level h stands for 2**h measurements. When a level outgrows its capacity
+it is sorted and every other item (from a random offset) moves up a level.
+Memory stays around 3 × SKETCH_K items however many values go in, and two
+sketches merge by concatenating levels, so monthly sketches built during
+ingestion combine into any time window at query time. Each compaction
+adds a zero-mean rank error of at most 2**h; the sketch tracks their
+variance, so it can report its own error bound.
+
+Sketches live next to the Parquet parts as ``<store>/sketches/YYYY-MM.npz``.
+Ingestion merges new rows into their month's sketches and rebuilds months
+that lost rows (sketches can't subtract), or whose files were written with
+different SKETCH_LAYERS.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from profile_store import PARTS_DIR, query_profile_store
+from regions import REGION_BOUNDS, region_mask
+
+SKETCH_DIR = "sketches"
+
+# Items kept in the top level; the rank error is about 1/SKETCH_K
+SKETCH_K = 200
+
+# Each level below the top holds this fraction of the level above's items
+CAPACITY_DECAY = 2 / 3
+
+# Pressure layers (dbar ≈ m) sketched separately: the 0–10 m surface layer
+# (what a query without a depth means), 10–200, 200–1000 and below 1000
+SKETCH_LAYERS = (0, 10, 200, 1000)
+
+SKETCH_PARAMETERS = ("temperature", "salinity")
+
+_MONTH_DIR = re.compile(r"year=(\d+)[/\\]month=(\d+)")
+
+
+class QuantileSketch:
+    """KLL quantile sketch: bounded memory, mergeable, rank error about 1/k"""
+
+    def __init__(self, k=SKETCH_K):
+        self.k = k
+        self.count = 0
+        self.variance = 0.0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng()
+
+    def _capacity(self, level):
+        return max(2, int(np.ceil(self.k * CAPACITY_DECAY ** (len(self.levels) - level - 1))))
+
+    def update(self, values):
+        """Add an array of values (NaNs are skipped). Returns self"""
+        values = np.asarray(values, dtype="float64").ravel()
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self.count += values.size
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one. Returns self"""
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.variance += other.variance
+        self._compress()
+        return self
+
+    def _compress(self):
+        while True:
+            full = [level for level, items in enumerate(self.levels) if len(items) > self._capacity(level)]
+            if not full:
+                return
+            level = full[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(self.levels[level])
+            odd = len(items) % 2
+            self.levels[level] = items[:odd]
+            promoted = items[odd + self._rng.integers(2)::2]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            self.variance += 4.0 ** level
+
+    def quantiles(self, q):
+        """Values at percentiles q (0-100)"""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(x), 2.0 ** h) for h, x in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        targets = np.asarray(q, dtype="float64") / 100 * cumulative[-1]
+        index = np.minimum(np.searchsorted(cumulative, targets, side="left"), len(items) - 1)
+        return items[order][index]
+
+    def rank_error(self):
+        """Rank error (as a fraction of count) that holds with about 95% probability"""
+        return 2 * np.sqrt(self.variance) / self.count if self.count else 0.0
+
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+
+def _month_key(region, parameter, layer):
+    return f"{region}|{parameter}|{layer}"
+
+
+def save_sketches(path, sketches):
+    """Write {(region, parameter, layer): QuantileSketch} to one .npz, atomically"""
+    keys = list(sketches)
+    levels = [sketches[key].levels for key in keys]
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp,
+             layers=np.array(SKETCH_LAYERS, dtype="float64"),
+             keys=np.array([_month_key(*key) for key in keys], dtype=str),
+             k=np.array([sketches[key].k for key in keys], dtype="int32"),
+             count=np.array([sketches[key].count for key in keys], dtype="int64"),
+             variance=np.array([sketches[key].variance for key in keys]),
+             n_levels=np.array([len(stack) for stack in levels], dtype="int32"),
+             sizes=np.array([len(items) for stack in levels for items in stack], dtype="int64"),
+             items=np.concatenate([items for stack in levels for items in stack] or [np.empty(0)]))
+    os.replace(tmp, path)
+
+
+def current_layers(path):
+    """True if a sketch file was written with the current SKETCH_LAYERS"""
+    with np.load(path, allow_pickle=False) as f:
+        return "layers" in f.files and np.array_equal(f["layers"], SKETCH_LAYERS)
+
+
+def load_sketches(path):
+    """Read a file written by save_sketches; None if its layers aren't the current SKETCH_LAYERS"""
+    if not current_layers(path):
+        return None
+    with np.load(path, allow_pickle=False) as f:
+        keys, k, count, variance = f["keys"], f["k"], f["count"], f["variance"]
+        n_levels, sizes, items = f["n_levels"], f["sizes"], f["items"]
+    item_splits = np.split(items, np.cumsum(sizes)[:-1]) if len(sizes) else []
+    level_starts = np.concatenate([[0], np.cumsum(n_levels)])
+    sketches = {}
+    for i, key in enumerate(keys):
+        region, parameter, layer = str(key).split("|")
+        sketch = QuantileSketch(int(k[i]))
+        sketch.count, sketch.variance = int(count[i]), float(variance[i])
+        sketch.levels = [np.asarray(x, dtype="float64") for x in item_splits[level_starts[i]:level_starts[i + 1]]]
+        sketches[(region, parameter, int(layer))] = sketch
+    return sketches
+
+
+def sketch_layer(pressure):
+    """Index into SKETCH_LAYERS of each pressure"""
+    return np.searchsorted(SKETCH_LAYERS, pressure, side="right") - 1
+
+
+def layers_for(depth=None):
+    """Layers covering a depth: the top layer for the surface, the layer holding a level,
+    or the layers overlapping a (top, bottom) range"""
+    if depth is None:
+        return [0]
+    if np.isscalar(depth):
+        return [int(sketch_layer(max(float(depth), 0.0)))]
+    top, bottom = sorted(float(d) for d in depth)
+    return list(range(int(sketch_layer(max(top, 0.0))), int(sketch_layer(max(bottom, 0.0))) + 1))
+
+
+def describe_layers(layers):
+    """E.g. "0–200 m" or "below 1000 m" """
+    top = SKETCH_LAYERS[layers[0]]
+    if layers[-1] + 1 >= len(SKETCH_LAYERS):
+        return f"below {top:g} m" if top else "all depths"
+    return f"{top:g}–{SKETCH_LAYERS[layers[-1] + 1]:g} m"
+
+
+def sketch_profiles(table):
+    """Sketches of a profile table, {month: {(region, parameter, layer): QuantileSketch}}"""
+    result = {}
+    if table.empty:
+        return result
+    months = table["time"].dt.strftime("%Y-%m").to_numpy()
+    layers = sketch_layer(table["pressure"].to_numpy())
+    inside = {region: region_mask(table["latitude"].to_numpy(), table["longitude"].to_numpy(), bounds)
+              for region, bounds in REGION_BOUNDS.items()}
+    for month in np.unique(months):
+        in_month = months == month
+        sketches = result.setdefault(month, {})
+        for region, mask in inside.items():
+            for layer in range(len(SKETCH_LAYERS)):
+                rows = in_month & mask & (layers == layer)
+                if not rows.any():
+                    continue
+                for parameter in SKETCH_PARAMETERS:
+                    values = table[parameter].to_numpy()[rows]
+                    if np.isfinite(values).any():
+                        sketches[(region, parameter, layer)] = QuantileSketch().update(values)
+    return result
+
+
+def _sketch_path(store, month):
+    return os.path.join(store, SKETCH_DIR, f"{month}.npz")
+
+
+def has_sketches(store):
+    return os.path.isdir(os.path.join(store, SKETCH_DIR))
+
+
+def month_of_part(rel):
+    """YYYY-MM of a store-relative part path"""
+    found = _MONTH_DIR.search(rel)
+    return f"{int(found.group(1)):04d}-{int(found.group(2)):02d}" if found else None
+
+
+def store_months(store):
+    """Months with data in the store"""
+    months = set()
+    parts = os.path.join(store, PARTS_DIR)
+    for year in os.listdir(parts) if os.path.isdir(parts) else []:
+        for month in os.listdir(os.path.join(parts, year)):
+            found = month_of_part(f"{year}/{month}")
+            if found:
+                months.add(found)
+    return sorted(months)
+
+
+def stale_months(store):
+    """Months whose sketch file was written with other SKETCH_LAYERS (and must be rebuilt)"""
+    directory = os.path.join(store, SKETCH_DIR)
+    names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+    return [name[:-len(".npz")] for name in names
+            if name.endswith(".npz") and not current_layers(os.path.join(directory, name))]
+
+
+def rebuild_month(store, month):
+    """Sketch one month from scratch out of the store's rows; drops its file if it has none"""
+    start = pd.Timestamp(month)
+    end = start + pd.offsets.MonthBegin(1) - pd.Timedelta(1, "ns")
+    table = query_profile_store(store, time_range=(start, end))
+    sketches = sketch_profiles(table).get(month)
+    path = _sketch_path(store, month)
+    if sketches:
+        save_sketches(path, sketches)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def update_store_sketches(store, added, rebuild=()):
+    """Merge an added profile table into the store's monthly sketches and rebuild the given months.
+
+    Months to rebuild are read back from the store, which must already hold
+    the added rows. Returns the number of month files written.
+    """
+    os.makedirs(os.path.join(store, SKETCH_DIR), exist_ok=True)
+    rebuild = set(rebuild)
+    for month in sorted(rebuild):
+        rebuild_month(store, month)
+    new = sketch_profiles(added)
+    for month, sketches in new.items():
+        if month in rebuild:
+            continue
+        path = _sketch_path(store, month)
+        existing = load_sketches(path) if os.path.exists(path) else {}
+        if existing is None:
+            rebuild_month(store, month)
+            rebuild.add(month)
+            continue
+        for key, sketch in sketches.items():
+            existing[key] = existing[key].merge(sketch) if key in existing else sketch
+        save_sketches(path, existing)
+    return len(rebuild | set(new))
+
+
+def merged_sketch(store, parameter, region, time_range=None, depth=None):
+    """One sketch of a region's parameter over whole months overlapping time_range.
+
+    None if there is none, or if a month's file predates the current
+    SKETCH_LAYERS (the next ingest rebuilds it).
+    """
+    directory = os.path.join(store, SKETCH_DIR)
+    if not os.path.isdir(directory):
+        return None
+    first = last = None
+    if time_range is not None:
+        first, last = (pd.Timestamp(t).strftime("%Y-%m") for t in time_range)
+    layers = layers_for(depth)
+    merged = None
+    for name in sorted(os.listdir(directory)):
+        month = name[:-len(".npz")]
+        if not name.endswith(".npz") or (first and not first <= month <= last):
+            continue
+        sketches = load_sketches(os.path.join(directory, name))
+        if sketches is None:
+            return None
+        for layer in layers:
+            sketch = sketches.get((region, parameter, layer))
+            if sketch is not None:
+                merged = sketch if merged is None else merged.merge(sketch)
+    return merged
@@ -0,0 +1,838 @@
+# query_handler.py
+import re
+
+import pandas as pd
+
+from climatology import get_climatology, anomaly as anomaly_from
+from contours import cached_contours
+from data_handler import filter_data, get_enhanced_stats, load_gridded_region, load_archive_sketch
+from chart_maker import (create_temperature_map, create_simple_line_chart,
+                        create_stats_chart, create_3d_surface_plot,
+                        create_contour_map, create_comparison_chart,
+                        create_float_map, create_regions_chart,
+                        create_distribution_chart)
+from distributions import region_distribution, data_distribution, warm_histograms, percentiles
+from gridding import smooth_grid
+from hotspots import find_hotspots, latest_grid, HOTSPOT_COUNT, MAX_MARKERS
+from region_stats import all_region_stats
+from spatial_index import build_spatial_index
+from quantile_sketch import describe_layers, layers_for
+from timeseries import regional_series, weighted_series
+from vertical import describe_depth
+
+AVAILABLE_REGIONS = ["bay of bengal", "arabian sea", "pacific ocean", "atlantic ocean",
+                     "indian ocean", "mediterranean sea", "arctic ocean"]
+
+# Pseudo-region for questions about every region at once ("compare all oceans")
+ALL_REGIONS = "all regions"
+
+CHART_TYPES = ["map", "line", "stats", "3d", "contour", "comparison", "regions", "hotspots",
+               "distribution"]
+
+# Coastal places users ask about, as (latitude, longitude)
+PLACES = {
+    "chennai": (13.08, 80.29), "kolkata": (22.57, 88.36), "mumbai": (18.94, 72.84),
+    "karachi": (24.85, 67.01), "visakhapatnam": (17.69, 83.22), "kochi": (9.97, 76.27),
+    "goa": (15.49, 73.83), "colombo": (6.93, 79.85), "port blair": (11.62, 92.73),
+    "muscat": (23.61, 58.59), "male": (4.18, 73.51), "dhaka": (23.81, 90.41),
+    "chittagong": (22.33, 91.81), "yangon": (16.84, 96.17), "perth": (-31.95, 115.86),
+    "durban": (-29.86, 31.02), "singapore": (1.26, 103.82),
+}
+
+_COORDINATE = re.compile(r"(\d+(?:\.\d+)?)\s*°?\s*([ns])\b[\s,/]*(\d+(?:\.\d+)?)\s*°?\s*([ew])\b")
+_RADIUS = re.compile(r"within\s+(\d+(?:\.\d+)?)\s*(km|kilomet(?:er|re)s?|mi|miles?|nm|nautical miles?)\b")
+_COUNT = re.compile(r"(?:(\d+)\s+(?:nearest|closest)|(?:nearest|closest)\s+(\d+))")
+
+_KM_PER_UNIT = {"km": 1.0, "mi": 1.609344, "nm": 1.852}
+
+_MONTH_NUMBERS = {"jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+                  "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12}
+_MONTH = r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+_TO = r"\s*(?:and|to|until|through|-|–)\s*"
+_ISO_DATE = r"(\d{4}-\d{2}-\d{2})"
+
+_ISO_RANGE = re.compile(rf"{_ISO_DATE}{_TO}{_ISO_DATE}")
+_DAY_RANGE = re.compile(rf"\b{_DAY}(?:\s+{_MONTH})?(?:\s*,?\s*(\d{{4}}))?{_TO}{_DAY}\s+{_MONTH}\b(?:\s*,?\s*(\d{{4}}))?")
+_MONTH_DAY_RANGE = re.compile(rf"\b{_MONTH}\s+{_DAY}{_TO}{_DAY}\b(?:\s*,?\s*(\d{{4}}))?")
+_ISO_DAY = re.compile(rf"\b{_ISO_DATE}\b")
+_DAY_MONTH = re.compile(rf"\b{_DAY}\s+{_MONTH}\b(?:\s*,?\s*(\d{{4}}))?")
+_MONTH_DAY = re.compile(rf"\b{_MONTH}\s+{_DAY}\b(?:\s*,\s*(\d{{4}}))?")
+_MONTH_YEAR = re.compile(rf"\b{_MONTH}\s*,?\s*(\d{{4}})\b")
+# Bare month names only when unambiguous ("may" and abbreviations need a day or year)
+_BARE_MONTH = re.compile(r"\b(january|february|march|april|june|july|august|september|october|november|december)\b")
+_RELATIVE = re.compile(r"\b(?:last|past|previous|(?:over|across|for)(?=\s+\d))\s+(\d+\s+)?(day|week|month|year)s?\b")
+_YEAR = re.compile(r"\b(?:in|during|for)\s+(\d{4})\b")
+
+_DEPTH_UNIT = r"(?:m|metres?|meters?|dbar|decibars?)\b"
+_DEPTH_LAYER = re.compile(rf"\b(\d+(?:\.\d+)?)\s*(?:{_DEPTH_UNIT})?\s*(?:-|–|to|and)\s*(\d+(?:\.\d+)?)\s*{_DEPTH_UNIT}")
+# "upper 500 m" is the 0-500 m layer
+_DEPTH_UPPER = re.compile(rf"\b(?:upper|uppermost|top|first)\s+(\d+(?:\.\d+)?)\s*{_DEPTH_UNIT}")
+_DEPTH_LAYER_AVERAGE = re.compile(rf"(?:{_DEPTH_LAYER.pattern}|{_DEPTH_UPPER.pattern})\s*(?:layer\s+)?(?:average|mean)?")
+# "Surface" as a depth ("sea surface temperature", "at the surface"); only a bare "surface plot" is a 3D chart
+_SURFACE_DEPTH = re.compile(r"\b(?:sea[\s-]+surface|(?:at|near|on|to)\s+the\s+surface|"
+                            r"surface[\s-]+(?:temp(?:erature)?s?|salinit(?:y|ies)|salt|waters?|level|layer|values?))\b")
+_DEPTH_LEVEL = re.compile(rf"\b(\d+(?:\.\d+)?)\s*{_DEPTH_UNIT}")
+_DEPTH_OF = re.compile(r"\bdepths?\s+(?:of\s+)?(\d+(?:\.\d+)?)\b")
+
+_RESOLUTION = re.compile(r"(\d+(?:\.\d+)?)\s*(?:°|deg(?:rees?)?)?\s*(?:grid|resolution)\b")
+_SMOOTH = re.compile(r"\bsmooth(?:ed|ing)?\b")
+_ANOMALY = re.compile(r"\b(?:anomal(?:y|ies|ous)|departures?)\b")
+# Whole words only: "histogram", "which" and "this" contain "hi"
+_GREETING = re.compile(r"\b(?:hello|hi|hey|good morning|good evening)\b")
+
+_ALL_REGIONS = re.compile(r"\b(?:all|every|each)\s+(?:the\s+)?(?:regions?|oceans?|seas?|basins?)\b")
+# A number after a comparison, unless it is a depth, a time span, a count or a year ("over 10 days")
+_THRESHOLD = re.compile(r"\b(above|over|exceed(?:s|ing)?|greater than|more than|higher than|warmer than|saltier than|"
+                        r"below|under|less than|lower than|colder than|cooler than|fresher than)\s+"
+                        r"(?!(?:19|20)\d\d\b)(-?\d+(?:\.\d+)?)(?!\.?\d)"
+                        r"(?!\s*(?:m|metres?|meters?|dbar|decibars?|km|kilomet(?:re|er)s?|miles?|hours?|days?|weeks?|"
+                        r"months?|years?|yrs?|steps?|points?|profiles?|floats?|cells?|spots?|%|percent)\b)")
+# ...and it counts only after a parameter or value word ("temperature above 29", "where it is over 30"),
+# with a unit ("over 29 °C") or as an explicit comparison ("warmer than 28")
+_THRESHOLD_CONTEXT = re.compile(r"\b(?:temp(?:erature)?s?|sst|salinity|salinities|salt|values?|readings?|"
+                                r"anomal(?:y|ies)|cells?|spots?|areas?|places?|waters?|where|is|are|was|were|"
+                                r"it'?s|gets?|goes|rises?|drops?|falls?)\s*$")
+_THRESHOLD_JOIN = re.compile(r"\b(?:and|or|but)\s*$")
+_THRESHOLD_UNIT = re.compile(r"\s*(?:°|deg(?:rees?)?\b|psu\b|g/kg|c\b)")
+_EXTREME = re.compile(r"\b(?:top\s+)?(\d+\s+)?(hottest|warmest|highest|saltiest|coldest|coolest|lowest|freshest|hot\s*spots?)"
+                      r"\b(?:\s+(\d+)\b(?!\s*(?:m|metres?|meters?|dbar)\b))?")
+_QUANTILE = re.compile(r"\b(?:p(\d{1,2})|(\d{1,2})(?:st|nd|rd|th)\s+percentile)\b|\b(median|iqr|interquartile|quartiles)\b")
+_ROLLING = re.compile(r"\b(?:(\d+)[\s-]*(?:days?|steps?|points?)?[\s-]*)?(?:rolling|moving|running)\s+(?:mean|average)")
+
+# Gaussian smoothing width in grid cells for "smoothed" maps
+SMOOTH_SIGMA = 1.0
+
+# Time steps in a "rolling mean" when the query doesn't say
+ROLLING_WINDOW = 7
+
+# Percentiles reported from the archive sketches when none are asked for
+ARCHIVE_QUANTILES = (25.0, 50.0, 75.0, 90.0)
+
+# Spatial index per loaded dataset object, built on first use
+_spatial_indexes = {}
+
+
+def parse_user_input(user_input):
+    """Enhanced natural language parsing with expanded regions and chart types"""
+    # Handle empty or None input
+    if not user_input:
+        return "unknown", None, None, None
+
+    user_input = user_input.lower().strip()
+
+    # Nearest-float and radius searches around a place or coordinate (checked
+    # before greetings, since words like "within" contain "hi")
+    if any(word in user_input for word in ["float", "nearest", "closest", "within"]):
+        location = parse_location_query(user_input)
+        if location:
+            return "find_floats", None, None, location["kind"]
+
+    # First check for greetings and help
+    if any(word in user_input for word in ["help", "what can", "how to", "commands"]):
+        return "help", None, None, None
+    elif _GREETING.search(user_input):
+        return "greeting", None, None, None
+
+    # Check if this looks like a data request (has ocean-related keywords)
+    has_parameter = any(word in user_input for word in ["temperature", "temp", "warm", "hot", "cold", "salinity", "salt", "salty", "saline"])
+    all_regions = bool(_ALL_REGIONS.search(user_input))
+    has_region = all_regions or any(word in user_input for word in ["bengal", "bangladesh", "kolkata", "chennai", "arabian", "arabia", "mumbai", "karachi", "oman", "pacific", "atlantic", "indian", "mediterranean", "arctic", "ocean", "sea"])
+    has_action = any(word in user_input for word in ["show", "display", "get", "find", "tell", "what", "give", "trend", "stats", "statistics", "map", "heatmap", "3d", "surface", "contour", "compare", "comparison",
+                                                     "histogram", "percentile", "distribution"])
+
+    # If it doesn't look like a data request, it's unknown
+    if not (has_parameter or has_region or has_action):
+        return "unknown", None, None, None
+
+    # Extract parameter (only if found)
+    parameter = None
+    if any(word in user_input for word in ["temperature", "temp", "warm", "hot", "cold"]):
+        parameter = "temperature"
+    elif any(word in user_input for word in ["salinity", "salt", "salty", "saline"]):
+        parameter = "salinity"
+
+    # Extract region with expanded coverage
+    region = None
+    if all_regions:
+        region = ALL_REGIONS
+    elif any(word in user_input for word in ["bengal", "bangladesh", "kolkata", "chennai"]):
+        region = "bay of bengal"
+    elif any(word in user_input for word in ["arabian", "arabia", "mumbai", "karachi", "oman"]):
+        region = "arabian sea"
+    elif any(word in user_input for word in ["pacific"]):
+        region = "pacific ocean"
+    elif any(word in user_input for word in ["atlantic"]):
+        region = "atlantic ocean"
+    elif any(word in user_input for word in ["indian"]) and any(word in user_input for word in ["ocean"]):
+        region = "indian ocean"
+    elif any(word in user_input for word in ["mediterranean", "med"]):
+        region = "mediterranean sea"
+    elif any(word in user_input for word in ["arctic"]):
+        region = "arctic ocean"
+
+    # Extract chart type with more options ("0-200 m average" is a depth layer, not a stats request,
+    # and "surface temperature" a depth, not a 3D surface)
+    user_input = _SURFACE_DEPTH.sub(" ", _DEPTH_LAYER_AVERAGE.sub(" ", user_input))
+    chart_type = "map"  # default for valid data requests
+    if any(word in user_input for word in ["trend", "line", "time", "over time", "change", "history", "rolling",
+                                           "moving average", "running mean"]):
+        chart_type = "line"
+    elif any(word in user_input for word in ["histogram", "percentile", "quartile", "box plot", "boxplot",
+                                             "distribution of", "spread of"]):
+        chart_type = "distribution"
+    elif any(word in user_input for word in ["stats", "statistics", "numbers", "average", "min", "max"]):
+        chart_type = "stats"
+    elif any(word in user_input for word in ["3d", "surface", "three dimensional"]):
+        chart_type = "3d"
+    elif any(word in user_input for word in ["contour", "isolines", "levels"]):
+        chart_type = "contour"
+    elif any(word in user_input for word in ["compare", "comparison", "both", "versus", "vs"]):
+        chart_type = "comparison"
+    elif any(word in user_input for word in ["map", "heatmap", "spatial", "distribution", "show"]):
+        chart_type = "map"
+    if parse_quantiles(user_input):
+        chart_type = "distribution"
+    if parse_hotspots(user_input):
+        chart_type = "hotspots"
+    if region == ALL_REGIONS:
+        chart_type = "regions"
+
+    # Better validation - need BOTH parameter AND region, OR clear action
+    if parameter and region:
+        return "show_data", parameter, region, chart_type
+    elif parameter and not region:
+        return "need_region", parameter, None, chart_type
+    elif region and not parameter:
+        return "need_parameter", None, region, chart_type
+    else:
+        return "unclear", None, None, None
+
+
+def parse_location_query(user_input):
+    """Extract a nearest/radius float search from text, or None.
+
+    Understands coordinates like "15N 88E" or known places like "Chennai",
+    an optional radius ("within 200 km") and count ("5 nearest").
+    """
+    text = user_input.lower()
+    match = _COORDINATE.search(text)
+    if match:
+        lat = float(match.group(1)) * (1 if match.group(2) == "n" else -1)
+        lon = float(match.group(3)) * (1 if match.group(4) == "e" else -1)
+        place = f"{abs(lat):g}°{match.group(2).upper()} {abs(lon):g}°{match.group(4).upper()}"
+    else:
+        names = [name for name in PLACES if re.search(rf"\b{name}\b", text)]
+        if not names:
+            return None
+        lat, lon = PLACES[names[0]]
+        place = names[0].title()
+
+    location = {"kind": "nearest", "lat": lat, "lon": lon, "place": place, "k": 5, "radius_km": None}
+    radius = _RADIUS.search(text)
+    if radius:
+        unit = radius.group(2)
+        unit = "nm" if unit.startswith("n") else "mi" if unit.startswith("mi") else "km"
+        location["kind"] = "radius"
+        location["radius_km"] = float(radius.group(1)) * _KM_PER_UNIT[unit]
+    count = _COUNT.search(text)
+    if count:
+        location["k"] = max(1, min(100, int(count.group(1) or count.group(2))))
+    return location
+
+
+def _month(name):
+    return _MONTH_NUMBERS[name[:3]]
+
+
+def _day_span(start, end=None):
+    """Inclusive range covering whole days from start to end"""
+    end = start if end is None else end
+    return start.normalize(), end.normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+
+
+def _dated(day, month, year, anchor):
+    """Build a date, defaulting the year to the latest one not after the anchor"""
+    if year:
+        return pd.Timestamp(int(year), month, int(day))
+    date = pd.Timestamp(anchor.year, month, int(day))
+    return date if date <= anchor else pd.Timestamp(anchor.year - 1, month, int(day))
+
+
+def _month_span(month, year):
+    start = pd.Timestamp(year, month, 1)
+    return _day_span(start, start + pd.offsets.MonthEnd(0))
+
+
+def parse_time_range(user_input, anchor=None):
+    """Extract an inclusive (start, end) time range from text, or None.
+
+    Handles "last week" / "past 3 days" / "over 10 days", "March 2024", "between 1 and 5 Jan",
+    "Jan 3-7, 2024", "2024-01-01 to 2024-01-05", single days and "in 2024".
+    Relative phrases and dates without a year count back from the anchor,
+    normally the latest time in the dataset.
+    """
+    if not user_input:
+        return None
+    text = user_input.lower()
+    anchor = pd.Timestamp(anchor if anchor is not None else pd.Timestamp.now()).tz_localize(None)
+
+    match = _ISO_RANGE.search(text)
+    if match:
+        return _day_span(pd.Timestamp(match.group(1)), pd.Timestamp(match.group(2)))
+
+    match = _DAY_RANGE.search(text)
+    if match:
+        day1, month1, year1, day2, month2, year2 = match.groups()
+        end = _dated(day2, _month(month2), year2, anchor)
+        start = _dated(day1, _month(month1 or month2), year1, end)
+        return _day_span(start, end)
+
+    match = _MONTH_DAY_RANGE.search(text)
+    if match:
+        month, day1, day2, year = match.groups()
+        end = _dated(day2, _month(month), year, anchor)
+        return _day_span(_dated(day1, _month(month), None, end), end)
+
+    match = _ISO_DAY.search(text)
+    if match:
+        return _day_span(pd.Timestamp(match.group(1)))
+
+    match = _DAY_MONTH.search(text)
+    if match:
+        day, month, year = match.groups()
+        return _day_span(_dated(day, _month(month), year, anchor))
+
+    match = _MONTH_DAY.search(text)
+    if match:
+        month, day, year = match.groups()
+        return _day_span(_dated(day, _month(month), year, anchor))
+
+    match = _MONTH_YEAR.search(text)
+    if match:
+        return _month_span(_month(match.group(1)), int(match.group(2)))
+
+    match = _BARE_MONTH.search(text)
+    if match:
+        month = _month(match.group(1))
+        return _month_span(month, anchor.year if month <= anchor.month else anchor.year - 1)
+
+    match = _RELATIVE.search(text)
+    if match:
+        count = int(match.group(1)) if match.group(1) else 1
+        unit = match.group(2)
+        offset = {"day": pd.Timedelta(days=count), "week": pd.Timedelta(weeks=count),
+                  "month": pd.DateOffset(months=count), "year": pd.DateOffset(years=count)}[unit]
+        # "last week" covers the 7 days ending on the anchor day
+        return _day_span(anchor - offset + pd.Timedelta(days=1), anchor)
+
+    if "yesterday" in text:
+        return _day_span(anchor - pd.Timedelta(days=1))
+    if "today" in text:
+        return _day_span(anchor)
+
+    match = _YEAR.search(text)
+    if match:
+        year = int(match.group(1))
+        return _day_span(pd.Timestamp(year, 1, 1), pd.Timestamp(year, 12, 31))
+    return None
+
+
+def parse_depth(user_input):
+    """Extract a depth selection from text: metres, a (top, bottom) layer, or None.
+
+    Handles "0-200 m average", "between 100 and 500 m", "upper 500 m"
+    (0-500 m), "at 500 m", "1000 dbar" and "depth of 300". Anything else,
+    "surface" included, is None: the surface level.
+    """
+    if not user_input:
+        return None
+    text = user_input.lower()
+
+    match = _DEPTH_LAYER.search(text)
+    if match:
+        top, bottom = sorted((float(match.group(1)), float(match.group(2))))
+        return (top, bottom) if bottom > top else top
+    match = _DEPTH_UPPER.search(text)
+    if match and float(match.group(1)) > 0:
+        return (0.0, float(match.group(1)))
+    match = _DEPTH_LEVEL.search(text) or _DEPTH_OF.search(text)
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def parse_anomaly(user_input):
+    """True if the text asks for departures from the climatology"""
+    return bool(_ANOMALY.search((user_input or "").lower()))
+
+
+def parse_hotspots(user_input):
+    """Threshold or top-k selection from text, or None.
+
+    "temperature above 29 °C" / "salinity below 34" give {"above": 29.0} /
+    {"below": 34.0} (both may appear); a bare "over 10" needs a parameter
+    or value word before it, or a unit, so "trend over 10 days" is no
+    threshold. "5 saltiest spots" / "coldest 3" give {"top": 5} /
+    {"bottom": 3}; "hottest spots" alone takes HOTSPOT_COUNT. A count of 0
+    is no selection at all.
+    """
+    text = (user_input or "").lower()
+    spec = {}
+    for match in _THRESHOLD.finditer(text):
+        word, value = match.groups()
+        if not (word.endswith("than") or word.startswith("exceed")
+                or _THRESHOLD_CONTEXT.search(text, 0, match.start())
+                or (spec and _THRESHOLD_JOIN.search(text, 0, match.start()))
+                or _THRESHOLD_UNIT.match(text, match.end())):
+            continue
+        lower = word.startswith(("below", "under", "less", "lower", "colder", "cooler", "fresher"))
+        spec["below" if lower else "above"] = float(value)
+    if spec:
+        return spec
+    match = _EXTREME.search(text)
+    if not match:
+        return None
+    count = min(int(match.group(1) or match.group(3) or HOTSPOT_COUNT), MAX_MARKERS)
+    if count < 1:
+        return None
+    lowest = match.group(2) in ("coldest", "coolest", "lowest", "freshest")
+    return {"bottom" if lowest else "top": count}
+
+
+def coerce_hotspots(payload):
+    """Hotspot selection from a structured request's above/below/top/bottom fields, or None.
+
+    Raises ValueError for a value that isn't a number or a top/bottom below 1.
+    """
+    spec = {}
+    for key, kind in (("above", float), ("below", float), ("top", int), ("bottom", int)):
+        if payload.get(key) not in (None, ""):
+            spec[key] = kind(payload[key])
+            if kind is int and spec[key] < 1:
+                raise ValueError(f"{key} must be at least 1 cell")
+    return spec or None
+
+
+def parse_quantiles(user_input):
+    """Percentiles (0-100) asked for in text, sorted, or None.
+
+    "median" gives 50, "p90" / "90th percentile" give 90, "IQR" gives 25
+    and 75, "quartiles" 25, 50 and 75.
+    """
+    found = set()
+    for p, nth, word in _QUANTILE.findall((user_input or "").lower()):
+        if p or nth:
+            found.add(float(p or nth))
+        elif word == "median":
+            found.add(50.0)
+        else:
+            found.update((25.0, 75.0) if word in ("iqr", "interquartile") else (25.0, 50.0, 75.0))
+    return tuple(sorted(found)) or None
+
+
+def coerce_quantiles(value):
+    """Percentiles from a structured request: a list of numbers or a comma-separated string, or None"""
+    if value in (None, "", []):
+        return None
+    items = value.split(",") if isinstance(value, str) else value
+    found = sorted({float(q) for q in items})
+    if found[0] < 0 or found[-1] > 100:
+        raise ValueError("quantiles must be between 0 and 100")
+    return tuple(found)
+
+
+def parse_rolling(user_input):
+    """Rolling-mean window in time steps from text ("7-day rolling mean"), or None"""
+    match = _ROLLING.search((user_input or "").lower())
+    if not match:
+        return None
+    return int(match.group(1)) if match.group(1) else ROLLING_WINDOW
+
+
+def parse_grid_options(user_input):
+    """Gridding options from text: {"resolution": degrees or None, "smooth": bool}"""
+    text = (user_input or "").lower()
+    match = _RESOLUTION.search(text)
+    resolution = float(match.group(1)) if match and float(match.group(1)) > 0 else None
+    return {"resolution": resolution, "smooth": bool(_SMOOTH.search(text))}
+
+
+def coerce_depth(value):
+    """Depth from a structured request: a number, a [top, bottom] pair ("0,200" in URLs), or None"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str) and "," in value:
+        value = value.split(",")
+    if isinstance(value, (list, tuple)):
+        if len(value) != 2:
+            raise ValueError("depth must be metres or [top, bottom]")
+        top, bottom = (float(v) for v in value)
+        return (top, bottom)
+    return float(value)
+
+
+def coerce_time_range(value):
+    """Time range from a structured request: a [start, end] pair of dates, or None"""
+    if not value:
+        return None
+    if isinstance(value, str) or len(value) != 2:
+        raise ValueError("time_range must be [start, end]")
+    # pandas' DateParseError is a ValueError
+    time_range = tuple(pd.Timestamp(t) for t in value)
+    if any(pd.isna(t) for t in time_range):
+        raise ValueError("time_range needs a start and an end date")
+    return time_range
+
+
+def dataset_time_anchor(ds):
+    """Latest time in a dataset, the reference point for relative dates"""
+    if ds is not None and "time" in ds.dims and ds.sizes["time"]:
+        return pd.Timestamp(ds["time"].values[-1])
+    return None
+
+
+def format_time_range(time_range):
+    start, end = time_range
+    if start.normalize() == end.normalize():
+        return start.strftime("%d %b %Y")
+    return f"{start.strftime('%d %b %Y')} – {end.strftime('%d %b %Y')}"
+
+
+def get_spatial_index(ds):
+    """Return the float position index for a dataset, building it once"""
+    cached = _spatial_indexes.get(id(ds))
+    if cached is not None and cached[0] is ds:
+        return cached[1]
+    index = build_spatial_index(ds)
+    _remember_spatial_index(ds, index)
+    return index
+
+
+def _remember_spatial_index(ds, index):
+    # The live dataset and, during a hot reload, its replacement; drop older ones
+    while len(_spatial_indexes) >= 2:
+        _spatial_indexes.pop(next(iter(_spatial_indexes)))
+    _spatial_indexes[id(ds)] = (ds, index)
+
+
+def retain_spatial_index(old_ds, new_ds):
+    """Reuse old_ds's index for new_ds, whose positions are unchanged. True if there was one"""
+    cached = _spatial_indexes.get(id(old_ds))
+    if cached is None or cached[0] is not old_ds:
+        return False
+    _remember_spatial_index(new_ds, cached[1])
+    return True
+
+
+def run_float_query(ds, location):
+    """Answer a nearest/radius float search. Returns (response_text, figure, floats)"""
+    index = get_spatial_index(ds) if ds is not None else None
+    if index is None or index.float_count == 0:
+        return "❌ Sorry, I don't have any float positions loaded right now.", None, None
+
+    lat, lon, place = location["lat"], location["lon"], location["place"]
+    label = "grid station" if index.stand_in else "float"
+    if location["kind"] == "radius":
+        radius_km = location["radius_km"]
+        floats = index.floats_within(lat, lon, radius_km)
+        profiles = index.count_profiles_within(lat, lon, radius_km)
+        if floats.empty:
+            return f"📍 No {label}s found within {radius_km:,.0f} km of {place}.", None, floats
+        response = (f"📍 Found {len(floats)} {label}s ({profiles:,} profiles) "
+                    f"within {radius_km:,.0f} km of {place}!")
+        title = f"{label.title()}s within {radius_km:,.0f} km of {place}"
+    else:
+        radius_km = None
+        floats = index.nearest_floats(lat, lon, location["k"])
+        response = f"📍 Here are the {len(floats)} nearest {label}s to {place}!"
+        title = f"Nearest {label.title()}s to {place}"
+
+    for row in floats.head(10).itertuples():
+        name = f"Station {row.platform_number}" if index.stand_in else f"Float {row.platform_number}"
+        when = f", last seen {str(row.time)[:10]}" if hasattr(row, "time") else ""
+        response += f"\n            - **{name}:** {row.distance_km:,.0f} km away ({row.latitude:.2f}°, {row.longitude:.2f}°{when})"
+
+    fig = create_float_map(floats, lat, lon, title, radius_km)
+    return response, fig, floats
+
+
+def contour_set(ds, data, parameter, region, depth=None, regridded=False, smooth=False, anomaly=False):
+    """Server-side contours of the latest time step of data, cached per dataset version and query"""
+    latest = data.isel(time=-1) if "time" in data.dims else data
+    if latest.dims != ("latitude", "longitude"):
+        latest = latest.transpose("latitude", "longitude")
+    version = ds.attrs.get("version")
+    when = str(latest["time"].values) if "time" in latest.coords else None
+    # Re-gridded data comes from the profile store, not this dataset version
+    key = None if regridded or not version else (version, parameter, region, when, depth, smooth, anomaly)
+    return cached_contours(key, latest.values, latest["longitude"].values, latest["latitude"].values)
+
+
+def validate_query(parameter, region, chart_type):
+    """Return an error message for an unanswerable structured query, or None"""
+    if not parameter or not region:
+        return "Query needs both a parameter and a region"
+    if region not in AVAILABLE_REGIONS and region != ALL_REGIONS:
+        return f"Unknown region '{region}'"
+    if chart_type not in CHART_TYPES:
+        return f"Unknown chart type '{chart_type}'"
+    return None
+
+
+def parameter_unit(parameter):
+    """Display unit of a parameter"""
+    if parameter == "temperature":
+        return "°C"
+    return "PSU" if parameter == "salinity" else "units"
+
+
+def format_stats_summary(stats, parameter, region):
+    """Format enhanced statistics as a markdown block for chat responses"""
+    unit = parameter_unit(parameter)
+
+    return f"""
+
+            **📋 Enhanced Stats for {region.title()}:**
+            - **Average:** {stats['mean']:.2f}{unit} (±{stats['std']:.2f}{unit})
+            - **Range:** {stats['min']:.2f}{unit} to {stats['max']:.2f}{unit}
+            - **Data Quality:** {stats['data_points']:,} measurements
+            - **Region Info:** {stats['description']}
+            - **Coverage:** {stats['shape'][0]} days, {stats['shape'][1]}×{stats['shape'][2]} grid points"""
+
+
+def format_distribution(summary, unit):
+    """Percentiles and spread of a distribution summary as markdown lines"""
+    p = summary['percentiles']
+    marks = ", ".join(f"p{q} {v:.2f}" for q, v in p.items() if q != 50)
+    return f"""
+
+            - **Median:** {p[50]:.2f}{unit} (IQR {summary['iqr']:.2f}{unit}: {p[25]:.2f}–{p[75]:.2f}{unit})
+            - **Percentiles:** {marks} ({unit}, to within {summary['bin_width']:.2g}{unit})"""
+
+
+def describe_quantiles(quantiles, values, unit):
+    """E.g. "median 24.57°C, p90 30.68°C, IQR 7.08°C" """
+    named = dict(zip(quantiles, values))
+    parts = [f"{'median' if q == 50 else f'p{q:g}'} {v:.2f}{unit}" for q, v in named.items()]
+    if 25 in named and 75 in named:
+        parts.append(f"IQR {named[75] - named[25]:.2f}{unit}")
+    return ", ".join(parts)
+
+
+def format_archive_quantiles(sketch, quantiles, values, depth, unit):
+    """Archive percentiles from a merged quantile sketch as a markdown line"""
+    source = f"{sketch.count:,} profile measurements, {describe_layers(layers_for(depth))}, whole months"
+    error = f"rank error ±{sketch.rank_error():.1%}" if sketch.rank_error() else "exact"
+    return f"\n            - **Archive ({source}):** {describe_quantiles(quantiles, values, unit)} ({error})"
+
+
+def warm_caches(ds):
+    """Build the per-version structures queries read for a newly loaded dataset"""
+    get_spatial_index(ds)
+    warm_histograms(ds)
+
+
+def describe_hotspots(spec, parameter):
+    """Short phrase for a hotspot selection, e.g. "above 29.00°C" or "5 highest" """
+    unit = parameter_unit(parameter)
+    if spec.get("top") is not None:
+        return f"{spec['top']} highest"
+    if spec.get("bottom") is not None:
+        return f"{spec['bottom']} lowest"
+    parts = [f"{word} {spec[word]:.2f}{unit}" for word in ("above", "below") if spec.get(word) is not None]
+    return " and ".join(parts)
+
+
+def run_hotspot_query(data, spec, parameter, region, where, label):
+    """Mark the cells of the latest time step matching a threshold or top-k spec on the heatmap.
+
+    Returns (headline, listing of the first spots, figure, summary dict).
+    """
+    spec = spec or {"top": HOTSPOT_COUNT}
+    spots, matches, valid = find_hotspots(data, **spec)
+    unit = parameter_unit(parameter)
+    phrase = describe_hotspots(spec, parameter)
+    latest = latest_grid(data)
+    when = f" on {str(latest['time'].values)[:10]}" if "time" in latest.coords else ""
+    fig = create_temperature_map(data, f"{label.title()} {phrase} in {where}", markers=spots)
+    if spec.get("top") is not None or spec.get("bottom") is not None:
+        response = f"🔥 Here are the {phrase} {label} spots in {region}{when}!"
+    elif matches:
+        share = matches / valid if valid else 0.0
+        response = (f"🔥 {matches:,} grid cells in {region} have {label} {phrase}{when} "
+                    f"({share:.0%} of cells with data).")
+        if matches > len(spots):
+            response += f" Showing the {len(spots)} most extreme."
+    else:
+        response = f"🔥 No grid cells in {region} have {label} {phrase}{when}."
+    listing = "".join(f"\n            - **{row.value:.2f}{unit}** at ({row.latitude:.2f}°, {row.longitude:.2f}°)"
+                      for row in spots.head(10).itertuples())
+    summary = {"matches": matches, "cells": valid, "spots": spots.to_dict(orient="records")}
+    return response, listing, fig, summary
+
+
+def run_regions_query(ds, parameter, time_range=None, depth=None):
+    """Compare every region in one pass over the grid (see region_stats.py).
+
+    Returns (response_text, figure, {region: stats}).
+    """
+    stats = all_region_stats(ds, parameter, time_range, depth)
+    if not stats:
+        return f"❌ Sorry, I couldn't find {parameter} data for any region.", None, None
+    unit = parameter_unit(parameter)
+    fig = create_regions_chart(stats, parameter.title(), unit)
+    response = f"🌍 Here's {parameter} across all {len(stats)} regions!"
+    if depth is not None:
+        response += f" ({describe_depth(depth)})"
+    if time_range is not None:
+        response += f" ({format_time_range(time_range)})"
+    response += "\n"
+    for region, s in sorted(stats.items(), key=lambda item: -item[1]['mean']):
+        response += (f"\n            - **{region.title()}:** {s['mean']:.2f}{unit} (±{s['std']:.2f}), "
+                     f"{s['min']:.2f}–{s['max']:.2f}{unit}, {s['data_points']:,} measurements")
+    return response, fig, stats
+
+
+def run_query(ds, parameter, region, chart_type="map", time_range=None, depth=None,
+              resolution=None, smooth=False, anomaly=False, rolling=None, hotspots=None, quantiles=None):
+    """Run a structured query against a loaded dataset.
+
+    depth is None (surface), a level in metres or a (top, bottom) layer.
+    resolution (degrees) re-grids ingested profiles for the region, as does
+    a time_range starting before the loaded store's "window_start" (at 1°);
+    smooth applies Gaussian smoothing to the gridded field before charting.
+    anomaly charts the departure from the dataset's day-of-year climatology.
+    rolling adds a rolling mean over that many time steps to line charts.
+    hotspots ({"above"/"below": value} or {"top"/"bottom": k}) marks the
+    matching cells of the latest time step on the map.
+    quantiles (percentiles, 0-100) are reported by distribution charts, from
+    the gridded data and from the profile archive's quantile sketches.
+    Returns (response_text, figure, stats). This is the single data pipeline
+    shared by the chat UI, the JSON API and the batch CLI.
+    """
+    if ds is None:
+        return "❌ Sorry, I couldn't load the ocean data right now.", None, None
+    if region == ALL_REGIONS or chart_type == "regions":
+        return run_regions_query(ds, parameter, time_range, depth)
+
+    # Re-grid the region's profiles at the requested resolution, or for a time range that starts before
+    # the loaded window of the profile store (cached)
+    regridded = False
+    window_start = ds.attrs.get("window_start")
+    earlier = time_range is not None and window_start and pd.Timestamp(time_range[0]) < pd.Timestamp(window_start)
+    if resolution is not None or earlier:
+        resolution = resolution or 1.0
+        gridded = load_gridded_region(region, resolution, time_range)
+        if gridded is not None:
+            ds, regridded = gridded, True
+
+    # Filter data
+    data = filter_data(ds, parameter, region, time_range, depth)
+    if data is None:
+        return "❌ Sorry, I couldn't find that data.", None, None
+    if data.size == 0 and time_range is not None:
+        available = (pd.Timestamp(ds["time"].values[0]), pd.Timestamp(ds["time"].values[-1]))
+        return (f"📅 No {parameter} data for {region} in {format_time_range(time_range)}. "
+                f"Available data covers {format_time_range(available)}."), None, None
+    if data.size == 0 and depth is not None:
+        levels = ds["depth"].values if "depth" in ds.dims else [0]
+        return (f"🌊 No {parameter} data for {region} ({describe_depth(depth)}). "
+                f"Available depths are {levels[0]:g}–{levels[-1]:g} m."), None, None
+    if data.size == 0:
+        return f"🌍 No {parameter} data in {region} in the loaded dataset.", None, None
+    where = region.title() if depth is None else f"{region.title()}, {describe_depth(depth)}"
+    if anomaly:
+        climatology = get_climatology(ds)
+        data = anomaly_from(data, climatology, depth)
+        where = f"{where} (vs. climatology)"
+    label = f"{parameter} anomaly" if anomaly else parameter
+
+    # Get statistics
+    stats = get_enhanced_stats(data, region)
+    if smooth:
+        data = smooth_grid(data, SMOOTH_SIGMA)
+
+    # Create appropriate chart
+    listing = ""
+    if chart_type == "hotspots" or hotspots:
+        response, listing, fig, summary = run_hotspot_query(data, hotspots, parameter, region, where, label)
+        if stats:
+            stats = dict(stats, hotspots=summary)
+    elif chart_type == "line":
+        # The cached series of the loaded grid, unless the data was re-gridded or transformed
+        series = None
+        if not (regridded or anomaly or smooth):
+            series = regional_series(ds, parameter, region, time_range, depth)
+        fig = create_simple_line_chart(series if series is not None else weighted_series(data),
+                                       f"{label.title()} Trend in {where}", window=rolling)
+        response = f"📈 Here's the {label} trend for {region}!"
+    elif chart_type == "distribution":
+        # The precomputed histograms of the loaded grid, unless the data was re-gridded or transformed
+        summary = None
+        if not (regridded or anomaly or smooth):
+            summary = region_distribution(ds, parameter, region, time_range, depth)
+        if summary is None:
+            summary = data_distribution(data)
+        unit = parameter_unit(parameter)
+        fig = create_distribution_chart(summary, f"{label.title()} Distribution in {where}", unit) if summary else None
+        response = f"📊 Here's the {label} distribution for {region}!"
+        if summary and quantiles:
+            values = percentiles(summary['counts'], summary['edges'], quantiles)
+            response = f"📊 {label.title()} in {region}: {describe_quantiles(quantiles, values, unit)}."
+        if summary:
+            listing = format_distribution(summary, unit)
+            if stats:
+                stats = dict(stats, percentiles=summary['percentiles'], iqr=summary['iqr'])
+        # Raw profile measurements, summarized by the ingestion's mergeable sketches
+        sketch = None if anomaly else load_archive_sketch(parameter, region, time_range, depth)
+        if sketch is not None:
+            asked = quantiles or ARCHIVE_QUANTILES
+            values = sketch.quantiles(asked)
+            listing += format_archive_quantiles(sketch, asked, values, depth, unit)
+            if stats:
+                stats = dict(stats, archive={"quantiles": dict(zip(asked, values.tolist())),
+                                             "count": sketch.count, "rank_error": float(sketch.rank_error())})
+    elif chart_type == "stats":
+        fig = create_stats_chart(stats, label.title())
+        response = f"📊 Here are the {label} statistics for {region}!"
+    elif chart_type == "3d":
+        fig = create_3d_surface_plot(data, f"{label.title()} in {where}")
+        response = f"🌐 Here's a 3D surface view of {label} in {region}! Rotate and zoom to explore."
+    elif chart_type == "contour":
+        fig = create_contour_map(data, f"{label.title()} in {where}", contour_set(ds, data, parameter, region, depth,
+                                                                               regridded, smooth, anomaly))
+        response = f"📈 Here's a contour map of {label} in {region}! Lines show equal values."
+    elif chart_type == "comparison":
+        # Need both temperature and salinity data
+        temp_data = filter_data(ds, "temperature", region, time_range, depth)
+        salt_data = filter_data(ds, "salinity", region, time_range, depth)
+        if anomaly and temp_data is not None and salt_data is not None:
+            temp_data = anomaly_from(temp_data, climatology, depth)
+            salt_data = anomaly_from(salt_data, climatology, depth)
+        if temp_data is not None and salt_data is not None:
+            fig = create_comparison_chart(temp_data, salt_data, region)
+            response = f"🌊 Here's a side-by-side comparison of temperature and salinity{' anomalies' if anomaly else ''} in {region}!"
+        else:
+            fig = create_temperature_map(data, f"{label.title()} in {where}")
+            response = f"🗺️ Comparison unavailable, showing {label} map instead."
+    else:  # map
+        fig = create_temperature_map(data, f"{label.title()} in {where}")
+        response = f"🗺️ Here's the {label} distribution map for {region}!"
+
+    if depth is not None:
+        response += f" ({describe_depth(depth)})"
+    if regridded or smooth:
+        grid_notes = [f"{resolution:g}° grid"] if regridded else []
+        response += f" ({', '.join(grid_notes + (['smoothed'] if smooth else []))})"
+    if time_range is not None:
+        response += f" ({format_time_range(time_range)})"
+    if rolling and chart_type == "line":
+        response += f" (with a {rolling}-step rolling mean)"
+    response += listing
+
+    # Add detailed statistics
+    if stats:
+        response += format_stats_summary(stats, parameter, region)
+
+    return response, fig, stats
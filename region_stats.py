@@ -0,0 +1,168 @@
+# region_stats.py
+"""Statistics for every region at once, from a region label raster.
+
+Regions overlap (the Bay of Bengal lies inside the Indian Ocean), so each
+grid cell gets a bitmask with one bit per REGION_BOUNDS entry, and each
+distinct bitmask becomes an integer label. A single pass of ``np.bincount``
+over (time step, label) gives counts, sums and sums of squares for every
+label (``np.fmin.at``/``np.fmax.at`` the extremes, on the same index), and
+a label-to-region membership matrix folds those into per-region totals.
+
+The per-time-step table is cached per dataset version, variable and depth,
+so any time window is a slice of it.
+"""
+import numpy as np
+
+from data_handler import time_slice
+from regions import REGION_BOUNDS, REGION_CONTEXT, region_columns
+from vertical import select_depth
+
+REGION_NAMES = list(REGION_BOUNDS)
+
+# Label rasters keyed by grid axes
+_rasters = {}
+RASTER_CACHE_SIZE = 4
+
+# Per-time-step tables keyed by (dataset version, parameter, depth)
+_table_cache = {}
+TABLE_CACHE_SIZE = 16
+
+
+def region_bitmask(latitude, longitude):
+    """(latitude, longitude) raster with bit k set in cells inside the k-th REGION_BOUNDS box.
+
+    Columns come from regions.region_columns, as in filter_data, so every
+    region gets the same cells as a single-region query, on -180..180 and
+    0..360 grids alike.
+    """
+    bits = np.zeros((len(latitude), len(longitude)), dtype=np.uint32)
+    for bit, ((lat0, lat1), lon_range) in enumerate(REGION_BOUNDS.values()):
+        rows = (latitude >= lat0) & (latitude <= lat1)
+        cols = np.zeros(len(longitude), dtype=bool)
+        cols[region_columns(longitude, lon_range)[0]] = True
+        bits |= np.outer(rows, cols).astype(np.uint32) << bit
+    return bits
+
+
+def region_labels(latitude, longitude):
+    """Label raster and (labels, regions) membership matrix for a grid, cached per grid"""
+    latitude, longitude = np.asarray(latitude), np.asarray(longitude)
+    key = (latitude.tobytes(), longitude.tobytes())
+    if key not in _rasters:
+        bits = region_bitmask(latitude, longitude)
+        codes, labels = np.unique(bits, return_inverse=True)
+        membership = ((codes[:, None] >> np.arange(len(REGION_NAMES))) & 1).astype(bool)
+        if len(_rasters) >= RASTER_CACHE_SIZE:
+            _rasters.pop(next(iter(_rasters)))
+        _rasters[key] = (labels.reshape(bits.shape), membership)
+    return _rasters[key]
+
+
+def label_statistics(values, labels, n_labels):
+    """Per (time step, label) count, sum, sum of squares, min and max of a (time, lat, lon) array"""
+    steps = values.shape[0]
+    flat = values.reshape(steps, -1)
+    valid = ~np.isnan(flat)
+    index = (np.arange(steps)[:, None] * n_labels + labels.ravel()[None, :])[valid]
+    # float64 throughout: ufunc.at falls back to a slow path when dtypes differ
+    data = flat[valid].astype("float64")
+    size = steps * n_labels
+    mins, maxs = np.full(size, np.inf), np.full(size, -np.inf)
+    np.fmin.at(mins, index, data)
+    np.fmax.at(maxs, index, data)
+    table = {"count": np.bincount(index, minlength=size), "sum": np.bincount(index, data, size),
+             "squares": np.bincount(index, data * data, size), "min": mins, "max": maxs}
+    return {name: column.reshape(steps, n_labels) for name, column in table.items()}
+
+
+def _fold(table, membership):
+    """Label statistics -> per-region statistics, (time, region) each"""
+    weights = membership.astype("float64")
+    folded = {name: table[name] @ weights for name in ("count", "sum", "squares")}
+    folded["min"] = np.stack([table["min"][:, m].min(axis=1) if m.any() else np.full(len(table["min"]), np.inf)
+                              for m in membership.T], axis=1)
+    folded["max"] = np.stack([table["max"][:, m].max(axis=1) if m.any() else np.full(len(table["max"]), -np.inf)
+                              for m in membership.T], axis=1)
+    return folded
+
+
+def region_table(ds, parameter, depth=None):
+    """Per-time-step statistics of every region, cached per dataset version, parameter and depth.
+
+    Returns a dict of (time, region) arrays (count, sum, squares, min, max)
+    plus "times" and "extent" (rows, columns of each region holding data),
+    or None if the dataset lacks the parameter.
+    """
+    if parameter not in ds:
+        return None
+    version = ds.attrs.get("version")
+    key = (version, parameter, tuple(depth) if isinstance(depth, (list, tuple)) else depth)
+    if version and key in _table_cache:
+        return _table_cache[key]
+
+    data = select_depth(ds[parameter], depth)
+    if "time" not in data.dims:
+        data = data.expand_dims("time")
+    data = data.transpose("time", "latitude", "longitude")
+    labels, membership = region_labels(data["latitude"].values, data["longitude"].values)
+    values = data.values
+    table = _fold(label_statistics(values, labels, len(membership)), membership)
+
+    # Rows and columns with any data, per region (what filter_data would keep)
+    has_data = ~np.isnan(values).all(axis=0)
+    inside = membership[labels] & has_data[..., None]
+    table["extent"] = np.stack([inside.any(axis=1).sum(axis=0), inside.any(axis=0).sum(axis=0)], axis=1)
+    table["times"] = data["time"].values
+
+    if version:
+        if len(_table_cache) >= TABLE_CACHE_SIZE:
+            _table_cache.pop(next(iter(_table_cache)))
+        _table_cache[key] = table
+    return table
+
+
+def all_region_stats(ds, parameter, time_range=None, depth=None):
+    """get_enhanced_stats-style statistics for every region, {region: stats}; regions without data are left out"""
+    table = region_table(ds, parameter, depth)
+    if table is None:
+        return None
+    steps = slice(None)
+    if time_range is not None and np.issubdtype(table["times"].dtype, np.datetime64):
+        steps = time_slice(table["times"], time_range)
+
+    count = table["count"][steps].sum(axis=0)
+    total = table["sum"][steps].sum(axis=0)
+    squares = table["squares"][steps].sum(axis=0)
+    results = {}
+    for r, name in enumerate(REGION_NAMES):
+        if count[r] == 0:
+            continue
+        mean = total[r] / count[r]
+        results[name] = {
+            'mean': float(mean),
+            'min': float(table["min"][steps, r].min()),
+            'max': float(table["max"][steps, r].max()),
+            'std': float(np.sqrt(max(squares[r] / count[r] - mean * mean, 0.0))),
+            'shape': (int((table["count"][steps, r] > 0).sum()), int(table["extent"][r, 0]),
+                      int(table["extent"][r, 1])),
+            'region': name,
+            'data_points': int(count[r]),
+            'description': REGION_CONTEXT.get(name, 'Ocean region'),
+        }
+    return results
+
+
+def retain_region_tables(old_ds, new_ds, changed_variables):
+    """Re-key cached tables of unchanged variables to a reloaded dataset. Returns the number carried over.
+
+    A table covers every region, so any change to its variable drops it.
+    """
+    old_version, new_version = old_ds.attrs.get("version"), new_ds.attrs.get("version")
+    carried = 0
+    for key in [k for k in _table_cache if k[0] == old_version]:
+        table = _table_cache.pop(key)
+        if new_version and key[1] not in changed_variables:
+            _table_cache[(new_version,) + key[1:]] = table
+            carried += 1
+    return carried
+
@@ -0,0 +1,97 @@
+# regions.py
+"""Named ocean regions and their lat/lon boxes."""
+import numpy as np
+
+# Region boxes as ((lat_min, lat_max), (lon_min, lon_max)); longitudes above 180 wrap
+REGION_BOUNDS = {
+    'bay of bengal': ((5, 25), (80, 100)),
+    'arabian sea': ((5, 25), (50, 80)),
+    'pacific ocean': ((-40, 60), (120, 240)),
+    'atlantic ocean': ((-60, 70), (280, 380)),
+    'indian ocean': ((-50, 30), (20, 120)),
+    'mediterranean sea': ((30, 46), (-5, 36)),
+    'arctic ocean': ((65, 90), (-180, 180)),
+}
+
+# One-line descriptions shown with each region's statistics
+REGION_CONTEXT = {
+    'bay of bengal': 'Tropical region with monsoon effects',
+    'arabian sea': 'High evaporation, elevated salinity',
+    'pacific ocean': 'World\'s largest ocean with diverse conditions',
+    'atlantic ocean': 'Meridional circulation patterns',
+    'indian ocean': 'Monsoon-driven seasonal patterns',
+    'mediterranean sea': 'Enclosed sea with high salinity',
+    'arctic ocean': 'Ice-covered, extreme seasonal variation',
+}
+
+def get_region_bounds(region):
+    """Match a free-text region name to its lat/lon box, or None"""
+    region_lower = region.lower()
+    if "bengal" in region_lower:
+        return REGION_BOUNDS['bay of bengal']
+    elif "arabian" in region_lower:
+        return REGION_BOUNDS['arabian sea']
+    elif "pacific" in region_lower:
+        return REGION_BOUNDS['pacific ocean']
+    elif "atlantic" in region_lower:
+        return REGION_BOUNDS['atlantic ocean']
+    elif "indian" in region_lower and "ocean" in region_lower:
+        return REGION_BOUNDS['indian ocean']
+    elif "mediterranean" in region_lower:
+        return REGION_BOUNDS['mediterranean sea']
+    elif "arctic" in region_lower:
+        return REGION_BOUNDS['arctic ocean']
+    return None
+
+def lon_in_range(lon, lon_range):
+    """Longitudes (any convention) inside a box whose bounds may run past 180°E"""
+    lon0, lon1 = lon_range
+    lon = np.asarray(lon)
+    if lon1 - lon0 >= 360:
+        return ~np.isnan(lon)
+    return (lon - lon0) % 360 <= lon1 - lon0
+
+def region_mask(latitude, longitude, bounds):
+    """Points inside a ((lat_min, lat_max), (lon_min, lon_max)) box"""
+    (lat0, lat1), lon_range = bounds
+    latitude = np.asarray(latitude)
+    return (latitude >= lat0) & (latitude <= lat1) & lon_in_range(longitude, lon_range)
+
+def region_columns(longitude, lon_range):
+    """Indices of a longitude axis inside a box, west to east, and their labels in the box's convention.
+
+    Columns match on their own labels first, like ``sel(slice(...))``, so a
+    -180..180 grid keeps its Atlantic (280..380 → -80..20) and Pacific east
+    of 180°. Columns of the other convention only fill the part of the box
+    the axis doesn't cover literally, so axes spanning both conventions
+    never count a place twice.
+    """
+    lon0, lon1 = lon_range
+    longitude = np.asarray(longitude, dtype="float64")
+    literal = (longitude >= lon0) & (longitude <= lon1)
+    offset = (longitude - lon0) % 360
+    extra = lon_in_range(longitude, lon_range) & ~literal
+    if literal.any():
+        extra &= (offset < longitude[literal].min() - lon0) | (offset > longitude[literal].max() - lon0)
+    labels = np.where(literal, longitude, lon0 + offset)
+    columns = np.flatnonzero(literal | extra)
+    columns = columns[np.argsort(labels[columns], kind="stable")]
+    return columns, labels[columns]
+
+def lon_positions(longitude, labels):
+    """Positions on a longitude axis of labels in either convention, exact matches first.
+
+    Maps region_columns' labels (e.g. 190 on a -180..180 grid) back to the
+    axis they came from; raises KeyError for a label with no column.
+    """
+    longitude = np.asarray(longitude, dtype="float64")
+    labels = np.asarray(labels, dtype="float64")
+    positions = np.full(labels.shape, -1, dtype=np.intp)
+    for axis, wanted in ((longitude, labels), (longitude % 360, labels % 360)):
+        order = np.argsort(axis, kind="stable")
+        index = np.clip(np.searchsorted(axis[order], wanted), 0, len(axis) - 1)
+        found = np.isclose(axis[order][index], wanted)
+        positions = np.where((positions < 0) & found, order[index], positions)
+    if (positions < 0).any():
+        raise KeyError(f"longitudes not on the grid: {labels[positions < 0][:5].tolist()}")
+    return positions
@@ -0,0 +1,206 @@
+# shared_dataset.py
+"""One dataset in RAM for many app processes.
+
+A loader process loads the dataset (with hot reload) and publishes every
+variable and coordinate as a raw .npy file under a version directory on a
+tmpfs such as /dev/shm, then points ``current.json`` at it. App processes
+started with FLOATCHAT_SHARED_DATASET set attach to the current version by
+memory-mapping those files read-only and wrapping them as an xarray Dataset:
+no copy is made, so every worker maps the same physical pages.
+
+On a new version, workers attach to it on their next access, reusing the
+caches the loader's diff says are still valid (see hot_reload.carry_over).
+The loader keeps the previous version for workers still switching over and
+deletes older ones; mapped files stay readable until unmapped, so a worker
+never loses data out from under a query.
+
+    python shared_dataset.py --root /dev/shm/floatchat
+    FLOATCHAT_SHARED_DATASET=/dev/shm/floatchat streamlit run app.py --server.port 8502
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+import xarray as xr
+
+POINTER_NAME = "current.json"
+MANIFEST_NAME = "manifest.json"
+
+# Seconds between a worker's checks for a new version
+CHECK_INTERVAL = 1.0
+
+# Seconds a worker waits for the loader's first version at startup
+ATTACH_TIMEOUT = 60.0
+
+
+def default_root():
+    """A tmpfs directory when there is one, so published arrays live in RAM"""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else os.path.join(os.path.sep, "tmp")
+    return os.path.join(base, "floatchat")
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _mappable(values):
+    """Object arrays (e.g. strings) can't be memory-mapped; store them as fixed-width unicode"""
+    values = np.asarray(values)
+    return values.astype(str) if values.dtype.kind == "O" else values
+
+
+def _write_atomic(path, payload):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def publish(ds, root, changes=None, previous=None):
+    """Write ds as memory-mappable arrays and make it the current version.
+
+    changes (from hot_reload.diff_datasets) and the previous version's name
+    let workers keep caches that are still valid. Returns the version name.
+    """
+    os.makedirs(root, exist_ok=True)
+    name = f"{ds.attrs.get('version', 'data')}-{uuid.uuid4().hex[:8]}"
+    staging = os.path.join(root, f".staging-{name}")
+    os.makedirs(staging)
+
+    variables = {}
+    for key, var in ds.variables.items():
+        filename = f"{len(variables)}.npy"
+        np.save(os.path.join(staging, filename), _mappable(var.values), allow_pickle=False)
+        variables[key] = {"file": filename, "dims": list(var.dims), "coord": key in ds.coords,
+                          "attrs": {k: _jsonable(v) for k, v in var.attrs.items()}}
+    manifest = {"version": name, "attrs": {k: _jsonable(v) for k, v in ds.attrs.items()},
+                "variables": variables, "previous": previous,
+                "changes": None if changes is None else {k: sorted(v) if isinstance(v, set) else v
+                                                         for k, v in changes.items()}}
+    _write_atomic(os.path.join(staging, MANIFEST_NAME), manifest)
+
+    os.rename(staging, os.path.join(root, name))
+    _write_atomic(os.path.join(root, POINTER_NAME), {"version": name, "published": time.time()})
+    cleanup(root, keep=[name, previous])
+    return name
+
+
+def cleanup(root, keep=()):
+    """Remove published versions (and abandoned staging directories) not in keep"""
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if os.path.isdir(path) and entry not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def attach(root, version):
+    """Read-only, zero-copy Dataset over a published version's arrays"""
+    directory = os.path.join(root, version)
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    data_vars, coords = {}, {}
+    for key, spec in manifest["variables"].items():
+        values = np.load(os.path.join(directory, spec["file"]), mmap_mode="r")
+        variable = xr.Variable(spec["dims"], values, attrs=spec["attrs"])
+        (coords if spec["coord"] else data_vars)[key] = variable
+    ds = xr.Dataset(data_vars, coords=coords, attrs=manifest["attrs"])
+    return ds, manifest
+
+
+class SharedDataset:
+    """A worker's view of the loader's current version, with the same .current as hot_reload.DatasetHolder"""
+
+    def __init__(self, root, warm=None, timeout=ATTACH_TIMEOUT):
+        self.root = root
+        self.warm = warm
+        self.version = None
+        self._dataset = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        deadline = time.monotonic() + timeout
+        while self.current is None:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"no dataset published under {root}; is the loader running?")
+            time.sleep(0.5)
+            self._checked = 0.0
+
+    def _pointer(self):
+        try:
+            with open(os.path.join(self.root, POINTER_NAME)) as f:
+                return json.load(f)["version"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @property
+    def current(self):
+        if time.monotonic() - self._checked < CHECK_INTERVAL:
+            return self._dataset
+        with self._lock:
+            self._checked = time.monotonic()
+            version = self._pointer()
+            if version is not None and version != self.version:
+                self._switch(version)
+        return self._dataset
+
+    def _switch(self, version):
+        try:
+            new, manifest = attach(self.root, version)
+        except (OSError, ValueError) as e:
+            # Superseded and removed between reading the pointer and attaching; try again next time
+            print(f"⚠️  Couldn't attach shared dataset {version}: {e}")
+            return
+        old = self._dataset
+        changes, kept = manifest.get("changes"), []
+        if old is not None and changes and manifest.get("previous") == self.version:
+            from hot_reload import carry_over
+            kept = carry_over(old, new, changes)
+        if self.warm is not None:
+            self.warm(new)
+        self._dataset, self.version = new, version
+        print(f"✅ Attached shared dataset {version} ({len(new.data_vars)} variables, zero-copy)"
+              + (f"; kept {', '.join(kept)}" if kept else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the dataset once and share it with app processes")
+    parser.add_argument("--root", default=default_root(), help="directory to publish into (ideally on tmpfs)")
+    parser.add_argument("--no-watch", action="store_true", help="publish once instead of following file changes")
+    args = parser.parse_args()
+
+    from data_handler import load_ocean_data, dataset_sources
+    from hot_reload import DatasetHolder
+
+    published = {}
+
+    def on_swap(old, new, changes):
+        published["version"] = publish(new, args.root, changes, previous=published.get("version"))
+        print(f"✅ Published {published['version']} to {args.root}")
+
+    holder = DatasetHolder(load_ocean_data, dataset_sources(), on_swap=on_swap)
+    if holder.current is None:
+        print("❌ No dataset to publish")
+        raise SystemExit(1)
+    on_swap(None, holder.current, None)
+    if args.no_watch:
+        return
+    holder.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        holder.stop()
+
+
+if __name__ == "__main__":
+    main()
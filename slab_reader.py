@@ -0,0 +1,151 @@
+# slab_reader.py
+"""Direct h5py hyperslab reads for HDF5-backed NetCDF files.
+
+A region query maps to index ranges on the (sorted) coordinate axes, which
+are read and decoded once per file and cached. The variable's slab is then
+read straight into a preallocated buffer and wrapped in a DataArray at the
+very end, skipping xarray's per-query indexing machinery.
+"""
+import os
+
+import h5py
+import numpy as np
+import xarray as xr
+from xarray.coding.times import decode_cf_datetime
+
+# Open readers by (path, mtime_ns), so a regenerated file gets a fresh one
+_readers = {}
+
+
+def _attr(obj, name, default=None):
+    value = obj.attrs.get(name, default)
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, np.ndarray) and value.size == 1:
+        return value.item()
+    return value
+
+
+def _trim_empty(values, dims, coords):
+    """Drop labels whose slices are all NaN, in NumPy"""
+    if not np.issubdtype(values.dtype, np.floating):
+        return values, coords
+    valid = ~np.isnan(values)
+    keep = [valid.any(axis=tuple(a for a in range(values.ndim) if a != axis)) for axis in range(values.ndim)]
+    if all(k.all() for k in keep):
+        return values, coords
+    return values[np.ix_(*keep)], {dim: coords[dim][k] for dim, k in zip(dims, keep)}
+
+
+def drop_empty(data):
+    """NumPy equivalent of ``data.where(data.notnull(), drop=True)`` for plain gridded arrays"""
+    coords = {dim: data[dim].values for dim in data.dims}
+    values, coords = _trim_empty(data.values, data.dims, coords)
+    return xr.DataArray(values, dims=data.dims, coords=coords, name=data.name)
+
+
+class SlabReader:
+    """One open HDF5 file with its coordinate axes decoded once"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = h5py.File(path, "r")
+        self.axes = {}
+        self._variables = {}
+        for name in ("time", "depth", "latitude", "longitude"):
+            if name in self.file:
+                self.axes[name] = self._decode_axis(name)
+
+    def _decode_axis(self, name):
+        values = self.file[name][:]
+        units = _attr(self.file[name], "units")
+        if name == "time" and units and " since " in units:
+            return np.asarray(decode_cf_datetime(values, units, _attr(self.file[name], "calendar", "standard")),
+                              dtype="datetime64[ns]")
+        return values
+
+    def _variable(self, name):
+        """HDF5 dataset plus its fill/scale/offset attributes, looked up once"""
+        if name not in self._variables:
+            dset = self.file[name]
+            self._variables[name] = (dset, dset.shape, _attr(dset, "_FillValue"),
+                                     _attr(dset, "scale_factor"), _attr(dset, "add_offset"))
+        return self._variables[name]
+
+    def can_read(self, name, shape):
+        """True if the file holds the variable with this exact shape on ascending lat/lon axes"""
+        if name not in self.file or self._variable(name)[1] != tuple(shape):
+            return False
+        return all(axis in self.axes and np.all(np.diff(self.axes[axis]) > 0)
+                   for axis in ("latitude", "longitude"))
+
+    def _range(self, axis, lo, hi):
+        """Index slice of a sorted axis between inclusive bounds, like .sel(slice(lo, hi))"""
+        values = self.axes[axis]
+        return slice(int(np.searchsorted(values, lo, side="left")), int(np.searchsorted(values, hi, side="right")))
+
+    def read(self, name, dims, lat_range, lon_range, time_index=slice(None), depth_index=slice(None),
+             drop_empty=False):
+        """Read one variable's slab and wrap it as a DataArray.
+
+        dims is the variable's dimension order (from the open Dataset).
+        depth_index is an int (dimension dropped) or a slice. drop_empty
+        trims labels that are all-NaN, like ``where(notnull, drop=True)``.
+        """
+        dset, _, fill, scale, offset = self._variable(name)
+        selection = {"time": time_index, "depth": depth_index,
+                     "latitude": self._range("latitude", *lat_range),
+                     "longitude": self._range("longitude", *lon_range)}
+        index = tuple(selection.get(dim, slice(None)) for dim in dims)
+
+        # h5py selects an integer index several times slower than the
+        # equivalent one-wide slice, so read slices and drop the axis after
+        coords, out_dims, read_shape, read_index = {}, [], [], []
+        for dim, idx in zip(dims, index):
+            if isinstance(idx, slice):
+                axis = self.axes[dim][idx]
+                coords[dim] = axis
+                out_dims.append(dim)
+                read_shape.append(len(axis))
+                read_index.append(idx)
+            else:
+                read_shape.append(1)
+                read_index.append(slice(idx, idx + 1))
+
+        buffer = np.empty(read_shape, dtype=dset.dtype)
+        if buffer.size:
+            dset.read_direct(buffer, tuple(read_index))
+        buffer = buffer.reshape([len(coords[dim]) for dim in out_dims])
+
+        if fill is not None or scale is not None or offset is not None:
+            buffer = buffer.astype("float32" if buffer.dtype.itemsize <= 4 else "float64", copy=False)
+            if fill is not None:
+                buffer[buffer == fill] = np.nan
+            if scale is not None:
+                buffer *= scale
+            if offset is not None:
+                buffer += offset
+        if drop_empty:
+            buffer, coords = _trim_empty(buffer, out_dims, coords)
+        return xr.DataArray(buffer, dims=out_dims, coords=coords, name=name)
+
+
+def get_slab_reader(path, mtime_ns=None):
+    """Cached reader for an HDF5-backed file, or None for other formats.
+
+    With mtime_ns, also None if the file has changed since that version.
+    """
+    try:
+        key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    if mtime_ns is not None and key[1] != mtime_ns:
+        return None
+    if key not in _readers:
+        if not h5py.is_hdf5(path):
+            return None
+        # Drop readers of older versions of the same file
+        for old in [k for k in _readers if k[0] == key[0]]:
+            _readers.pop(old).file.close()
+        _readers[key] = SlabReader(path)
+    return _readers[key]
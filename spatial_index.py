@@ -0,0 +1,118 @@
+# spatial_index.py
+"""KD-tree index over float and profile positions.
+
+Positions are embedded as unit vectors on the sphere, so Euclidean (chord)
+distance in the tree is monotonic in great-circle distance. Nearest and
+radius lookups are then exact haversine queries at tree speed.
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def lat_lon_to_xyz(lat, lon):
+    """Unit vectors for latitude/longitude arrays in degrees, shape (n, 3)"""
+    lat = np.radians(np.asarray(lat, dtype="float64"))
+    lon = np.radians(np.asarray(lon, dtype="float64"))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def km_to_chord(km):
+    return 2.0 * np.sin(np.minimum(km / EARTH_RADIUS_KM, np.pi) / 2.0)
+
+
+def chord_to_km(chord):
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+
+
+class SpatialIndex:
+    """Profile positions plus the latest known position of each float"""
+
+    def __init__(self, latitudes, longitudes, platforms=None, times=None):
+        self.latitudes = np.asarray(latitudes, dtype="float64")
+        self.longitudes = (np.asarray(longitudes, dtype="float64") + 180.0) % 360.0 - 180.0
+        n = len(self.latitudes)
+        # Without platform numbers every position is its own stand-in "float"
+        self.stand_in = platforms is None
+        self.platforms = np.asarray(platforms) if platforms is not None else np.arange(n)
+        self.times = np.asarray(times) if times is not None else None
+        self.profile_tree = cKDTree(lat_lon_to_xyz(self.latitudes, self.longitudes))
+
+        # Latest profile per float: sort by (platform, time) and keep each platform's last row
+        order = (np.lexsort((self.times, self.platforms)) if self.times is not None
+                 else np.argsort(self.platforms, kind="stable"))
+        last = np.ones(n, bool)
+        last[:-1] = self.platforms[order][1:] != self.platforms[order][:-1]
+        self.float_rows = order[last]
+        self.float_tree = cKDTree(lat_lon_to_xyz(self.latitudes[self.float_rows],
+                                                 self.longitudes[self.float_rows]))
+
+    @property
+    def profile_count(self):
+        return len(self.latitudes)
+
+    @property
+    def float_count(self):
+        return len(self.float_rows)
+
+    def _frame(self, rows, distances_km):
+        frame = pd.DataFrame({
+            "platform_number": self.platforms[rows],
+            "latitude": self.latitudes[rows],
+            "longitude": self.longitudes[rows],
+            "distance_km": distances_km,
+        })
+        if self.times is not None:
+            frame["time"] = self.times[rows]
+        return frame.sort_values("distance_km", kind="stable").reset_index(drop=True)
+
+    def nearest_floats(self, lat, lon, k=5):
+        """The k floats whose latest position is closest to (lat, lon)"""
+        k = min(k, self.float_count)
+        if k == 0:
+            return self._frame(np.array([], int), np.array([]))
+        chord, idx = self.float_tree.query(lat_lon_to_xyz([lat], [lon])[0], k=k)
+        idx, chord = np.atleast_1d(idx), np.atleast_1d(chord)
+        return self._frame(self.float_rows[idx], chord_to_km(chord))
+
+    def floats_within(self, lat, lon, radius_km):
+        """Floats whose latest position lies within radius_km of (lat, lon)"""
+        center = lat_lon_to_xyz([lat], [lon])[0]
+        idx = np.asarray(self.float_tree.query_ball_point(center, km_to_chord(radius_km)), dtype=int)
+        rows = self.float_rows[idx]
+        chord = np.linalg.norm(lat_lon_to_xyz(self.latitudes[rows], self.longitudes[rows]) - center, axis=1)
+        return self._frame(rows, chord_to_km(chord))
+
+    def count_profiles_within(self, lat, lon, radius_km):
+        """Number of profiles (any float, any time) within radius_km of (lat, lon)"""
+        center = lat_lon_to_xyz([lat], [lon])[0]
+        return int(self.profile_tree.query_ball_point(center, km_to_chord(radius_km), return_length=True))
+
+
+def build_spatial_index(ds):
+    """Build the index from a loaded dataset.
+
+    Uses the per-profile coordinates of ingested Argo data. Gridded datasets
+    without profiles fall back to the valid cells of the latest time step as
+    stand-in stations.
+    """
+    if ds is None:
+        return None
+    if "profile_latitude" in ds.coords:
+        return SpatialIndex(ds["profile_latitude"].values, ds["profile_longitude"].values,
+                            ds["profile_platform"].values, ds["profile_time"].values)
+
+    field = ds[list(ds.data_vars)[0]]
+    if "time" in field.dims:
+        field = field.isel(time=-1)
+    if "depth" in field.dims:
+        field = field.isel(depth=0)
+    lat_mesh, lon_mesh = np.meshgrid(ds["latitude"].values, ds["longitude"].values, indexing="ij")
+    valid = ~np.isnan(field.transpose("latitude", "longitude").values)
+    lats, lons = lat_mesh[valid], (lon_mesh[valid] + 180.0) % 360.0 - 180.0
+    # The dummy grid repeats longitudes past 180°, which would index the same point twice
+    _, unique = np.unique(np.column_stack([lats, lons]).round(6), axis=0, return_index=True)
+    return SpatialIndex(lats[unique], lons[unique])
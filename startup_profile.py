@@ -0,0 +1,37 @@
+# startup_profile.py
+"""Import-time profile of the app's lazily loaded stacks.
+
+app.py imports its data, query/chart and API stacks on first use instead
+of at the top, so the page starts painting before they load. Each stack is
+timed the first time it's imported, and report() prints the breakdown once
+per process, so a cold start shows where its time went.
+"""
+import sys
+import time
+from contextlib import contextmanager
+
+_timings = {}
+_reported = False
+
+
+@contextmanager
+def import_timer(label):
+    """Time the imports in the block, recording only the first (cold) load"""
+    if label in _timings:
+        yield
+        return
+    start, modules = time.perf_counter(), len(sys.modules)
+    yield
+    _timings[label] = (time.perf_counter() - start, len(sys.modules) - modules)
+
+
+def report(total=None):
+    """Print the import profile once per process"""
+    global _reported
+    if _reported or not _timings:
+        return
+    _reported = True
+    parts = ", ".join(f"{label} {seconds:.2f}s ({modules} modules)"
+                      for label, (seconds, modules) in _timings.items())
+    suffix = f"; first run {total:.2f}s" if total is not None else ""
+    print(f"⏱️  Startup imports: {parts}{suffix}")
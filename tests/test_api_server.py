@@ -0,0 +1,59 @@
+# tests/test_api_server.py
+"""Every answer of the JSON API is JSON: 200, 400 for bad requests, 500 for failures."""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from tornado.testing import AsyncHTTPTestCase
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api_server  # noqa: E402
+
+
+def make_dataset():
+    lat, lon = np.arange(-60, 61, 2.0), np.arange(-180, 180, 2.0)
+    times = pd.date_range("2024-01-01", periods=10, freq="D")
+    values = 20 + np.random.default_rng(0).normal(0, 1, (len(times), len(lat), len(lon)))
+    return xr.Dataset({"temperature": (("time", "latitude", "longitude"), values.astype("float32")),
+                       "salinity": (("time", "latitude", "longitude"), (35 + values / 100).astype("float32"))},
+                      coords={"time": times, "latitude": lat, "longitude": lon})
+
+
+class QueryApiTest(AsyncHTTPTestCase):
+    ds = make_dataset()
+
+    def get_app(self):
+        return api_server.make_app(lambda: self.ds, max_workers=2)
+
+    def post(self, body):
+        response = self.fetch("/api/query", method="POST", body=body)
+        return response.code, json.loads(response.body)
+
+    def test_answers(self):
+        code, result = self.post(json.dumps({"query": "temperature stats in pacific ocean"}))
+        assert code == 200 and result["stats"]
+        code, result = self.post(json.dumps({"parameter": "salinity", "region": "atlantic ocean",
+                                             "time_range": ["2024-01-02", "2024-01-05"]}))
+        assert code == 200 and result["time_range"][0].startswith("2024-01-02")
+
+    def test_bad_requests_are_json_400s(self):
+        for body in ("[1, 2]", '"temperature"', "not json", '{"query": 5}', '{"query": ["temperature"]}',
+                     '{"parameter": "temperature", "region": "pacific ocean", "time_range": "2024"}',
+                     '{"parameter": "temperature", "region": "pacific ocean", "depth": "deep"}'):
+            code, result = self.post(body)
+            assert code == 400 and result["error"], body
+
+    def test_pipeline_failure_is_a_json_500(self):
+        def broken(*args, **kwargs):
+            raise KeyError("longitude")
+
+        original, api_server.run_query = api_server.run_query, broken
+        try:
+            code, result = self.post(json.dumps({"query": "temperature map in pacific ocean"}))
+        finally:
+            api_server.run_query = original
+        assert code == 500 and "KeyError" in result["error"]
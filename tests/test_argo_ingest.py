@@ -0,0 +1,130 @@
+# tests/test_argo_ingest.py
+"""Incremental ingestion keeps the manifest and the Parquet parts in step, crashes included."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argo_ingest  # noqa: E402
+from argo_ingest import JOURNAL_NAME, STAGING_DIR, ingest_directory, load_manifest  # noqa: E402
+from profile_store import query_profile_store  # noqa: E402
+
+
+def write_profiles(path, platform, lat, lon, day, n_prof=3, n_levels=20, offset=0.0):
+    """A small native-layout Argo profile file"""
+    rng = np.random.default_rng(platform)
+    pressure = np.tile(np.linspace(5, 1000, n_levels), (n_prof, 1)).astype("float32")
+    ds = xr.Dataset({
+        "PLATFORM_NUMBER": ("N_PROF", np.array([str(platform).encode()] * n_prof, dtype="S8")),
+        "CYCLE_NUMBER": ("N_PROF", np.arange(1, n_prof + 1, dtype="int32")),
+        "JULD": ("N_PROF", pd.Timestamp(day) + pd.to_timedelta(np.arange(n_prof) * 10, "D")),
+        "LATITUDE": ("N_PROF", lat + rng.uniform(-1, 1, n_prof)),
+        "LONGITUDE": ("N_PROF", lon + rng.uniform(-1, 1, n_prof)),
+        "PRES": (("N_PROF", "N_LEVELS"), pressure),
+        "TEMP": (("N_PROF", "N_LEVELS"), (28 - pressure / 50 + offset).astype("float32")),
+        "PSAL": (("N_PROF", "N_LEVELS"), np.full((n_prof, n_levels), 35.0, dtype="float32")),
+    })
+    ds.to_netcdf(path)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    write_profiles(root / "a.nc", 5900001, 15.0, 88.0, "2024-01-05")
+    write_profiles(root / "b.nc", 5900002, -10.0, 70.0, "2024-02-05")
+    write_profiles(root / "c.nc", 5900003, 30.0, -40.0, "2024-01-20")
+    return root
+
+
+def assert_consistent(store):
+    """Every row in the parts belongs to a file the manifest lists, exactly once"""
+    manifest = load_manifest(store)
+    table = query_profile_store(store)
+    assert len(table) == sum(entry["rows"] for entry in manifest["files"].values())
+    assert sorted(table["source_id"].unique()) == sorted(entry["source_id"] for entry in manifest["files"].values())
+    assert not table.duplicated(["platform_number", "cycle_number", "level"]).any()
+    assert not os.path.exists(os.path.join(store, JOURNAL_NAME))
+    assert not os.path.exists(os.path.join(store, STAGING_DIR))
+    return manifest, table
+
+
+def change_tree(root):
+    os.remove(root / "b.nc")
+    write_profiles(root / "a.nc", 5900001, 15.0, 88.0, "2024-01-05", n_prof=4, offset=1.0)
+    write_profiles(root / "d.nc", 5900004, 0.0, 160.0, "2024-03-01")
+
+
+def test_incremental_run(tree, tmp_path):
+    store = str(tmp_path / "store")
+    assert ingest_directory(str(tree), store, workers=1)["ingested"] == 3
+    assert_consistent(store)
+    change_tree(tree)
+    summary = ingest_directory(str(tree), store, workers=1)
+    assert (summary["ingested"], summary["deleted"]) == (2, 1)
+    manifest, table = assert_consistent(store)
+    assert sorted(manifest["files"]) == ["a.nc", "c.nc", "d.nc"]
+    assert table["platform_number"].nunique() == 3
+
+
+def test_crash_before_commit_leaves_old_store(tree, tmp_path, monkeypatch):
+    store = str(tmp_path / "store")
+    ingest_directory(str(tree), store, workers=1)
+    before = query_profile_store(store)
+    change_tree(tree)
+
+    def crash(*args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(argo_ingest, "_commit", crash)
+    with pytest.raises(KeyboardInterrupt):
+        ingest_directory(str(tree), store, workers=1)
+    assert len(query_profile_store(store)) == len(before)
+
+    monkeypatch.undo()
+    ingest_directory(str(tree), store, workers=1)
+    manifest, _ = assert_consistent(store)
+    assert sorted(manifest["files"]) == ["a.nc", "c.nc", "d.nc"]
+
+
+def test_crash_mid_commit_is_rolled_forward(tree, tmp_path, monkeypatch):
+    store = str(tmp_path / "store")
+    ingest_directory(str(tree), store, workers=1)
+    change_tree(tree)
+
+    # Parts swapped in, then the run dies before the manifest is
+    def crash(*args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(argo_ingest, "save_manifest", crash)
+    with pytest.raises(KeyboardInterrupt):
+        ingest_directory(str(tree), store, workers=1)
+    assert os.path.exists(os.path.join(store, JOURNAL_NAME))
+
+    monkeypatch.undo()
+    summary = ingest_directory(str(tree), store, workers=1)
+    assert summary["ingested"] == 0
+    manifest, _ = assert_consistent(store)
+    assert sorted(manifest["files"]) == ["a.nc", "c.nc", "d.nc"]
+
+
+def test_sketches_owed_by_a_crashed_run_are_rebuilt(tree, tmp_path, monkeypatch):
+    store = str(tmp_path / "store")
+
+    def crash(*args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(argo_ingest, "update_store_sketches", crash)
+    with pytest.raises(KeyboardInterrupt):
+        ingest_directory(str(tree), store, workers=1)
+    assert load_manifest(store)["pending_sketches"] == ["2024-01", "2024-02"]
+
+    monkeypatch.undo()
+    assert ingest_directory(str(tree), store, workers=1)["sketched_months"] == 2
+    assert "pending_sketches" not in load_manifest(store)
+    assert sorted(os.listdir(os.path.join(store, "sketches"))) == ["2024-01.npz", "2024-02.npz"]
@@ -0,0 +1,70 @@
+# tests/test_batch_query.py
+"""A bad line or a failing query in a batch file only costs its own report."""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_query  # noqa: E402
+from batch_query import read_queries  # noqa: E402
+
+LINES = [
+    '["temperature", "bay of bengal", "stats"]',
+    '{"parameter": "salinity", "region": "arabian sea", "depth": [1, 2, 3]}',
+    '{"parameter": "salinity", "region": "arabian sea", "top": 0}',
+    '{"parameter": "salinity", "region": "arabian sea", "time_range": ["soon", "later"]}',
+    '["temperature", "bay of bengal", "map"',
+    '["temperature"]',
+    "temperature map in arabian sea",
+]
+
+
+@pytest.fixture
+def query_file(tmp_path):
+    path = tmp_path / "queries.txt"
+    path.write_text("# nightly\n" + "\n".join(LINES) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def worker_ds(monkeypatch):
+    lat, lon = np.arange(-60, 61, 2.0), np.arange(0, 360, 2.0)
+    times = pd.date_range("2024-01-01", periods=10, freq="D")
+    values = 20 + np.random.default_rng(0).normal(0, 1, (len(times), len(lat), len(lon)))
+    ds = xr.Dataset({"temperature": (("time", "latitude", "longitude"), values.astype("float32")),
+                     "salinity": (("time", "latitude", "longitude"), (35 + values / 100).astype("float32"))},
+                    coords={"time": times, "latitude": lat, "longitude": lon})
+    monkeypatch.setattr(batch_query, "_worker_ds", ds)
+    return ds
+
+
+def test_bad_lines_keep_their_place(query_file):
+    queries = read_queries(query_file)
+    assert [q[0] for q in queries] == LINES
+    errors = [q[6].get("error") for q in queries]
+    assert errors[0] is None and errors[-1] is None
+    assert all(error and error.startswith(f"Line {n}:") for n, error in zip(range(3, 8), errors[1:6]))
+    assert queries[0][1:4] == ("temperature", "bay of bengal", "stats")
+
+
+def test_failures_are_reported_per_query(query_file, worker_ds, tmp_path, monkeypatch):
+    queries = read_queries(query_file)
+    out_dir = str(tmp_path / "out")
+    os.makedirs(out_dir)
+
+    def broken(*args, **kwargs):
+        raise KeyError("longitude")
+
+    results = [batch_query._run_one((i, q, out_dir, "none")) for i, q in enumerate(queries)]
+    assert [ok for _, ok in results] == [True, False, False, False, False, False, True]
+
+    monkeypatch.setattr(batch_query, "run_query", broken)
+    name, ok = batch_query._run_one((0, queries[0], out_dir, "none"))
+    with open(os.path.join(out_dir, f"{name}.json")) as f:
+        assert not ok and json.load(f)["error"] == "KeyError: 'longitude'"
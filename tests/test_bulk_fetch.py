@@ -0,0 +1,119 @@
+# tests/test_bulk_fetch.py
+"""bulk_fetch.fetch_files against a local stand-in GDAC server."""
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bulk_fetch  # noqa: E402
+from bulk_fetch import fetch_files  # noqa: E402
+
+BODY = b"CDF\x01" + b"\x00" * 4096
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            status = server.failures.get(self.path, []).pop(0) if server.failures.get(self.path) else 200
+        try:
+            time.sleep(server.delay)
+            if status != 200:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.requests, httpd.failures, httpd.lock = [], {}, threading.Lock()
+    httpd.active = httpd.peak = 0
+    httpd.delay = 0.0
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/dac/"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    # Keep tenacity's exponential backoff, just at millisecond scale
+    original = bulk_fetch.wait_exponential
+    monkeypatch.setattr(bulk_fetch, "wait_exponential", lambda **kwargs: original(multiplier=0.01, max=0.05))
+
+
+def entries(n):
+    return [f"incois/2902115/profiles/R2902115_{i:03d}.nc" for i in range(1, n + 1)]
+
+
+def test_fetches_and_mirrors_paths(server, tmp_path):
+    summary = fetch_files(entries(3), str(tmp_path), base_url=server.url, workers=2, rate=0)
+    assert (summary["fetched"], summary["failed"], summary["bytes"]) == (3, 0, 3 * len(BODY))
+    assert open(tmp_path / "incois/2902115/profiles/R2902115_002.nc", "rb").read() == BODY
+
+
+def test_retries_503_and_429(server, tmp_path):
+    server.failures = {"/dac/incois/2902115/profiles/R2902115_001.nc": [503, 429],
+                       "/dac/incois/2902115/profiles/R2902115_002.nc": [503, 503, 503, 503]}
+    summary = fetch_files(entries(2), str(tmp_path), base_url=server.url, workers=2, rate=0, attempts=4)
+    assert (summary["fetched"], summary["failed"]) == (1, 1)
+    assert server.requests.count("/dac/incois/2902115/profiles/R2902115_001.nc") == 3
+    assert server.requests.count("/dac/incois/2902115/profiles/R2902115_002.nc") == 4
+    assert "503" in next(iter(summary["errors"].values()))
+
+
+def test_not_found_is_not_retried(server, tmp_path):
+    server.failures = {"/dac/incois/2902115/profiles/R2902115_001.nc": [404]}
+    summary = fetch_files(entries(1), str(tmp_path), base_url=server.url, rate=0)
+    assert summary["failed"] == 1 and len(server.requests) == 1
+
+
+def test_skips_existing_files(server, tmp_path):
+    existing = tmp_path / "incois/2902115/profiles/R2902115_001.nc"
+    existing.parent.mkdir(parents=True)
+    existing.write_bytes(BODY)
+    summary = fetch_files(entries(2), str(tmp_path), base_url=server.url, rate=0)
+    assert (summary["skipped"], summary["fetched"]) == (1, 1)
+    assert server.requests == ["/dac/incois/2902115/profiles/R2902115_002.nc"]
+    summary = fetch_files(entries(2), str(tmp_path), base_url=server.url, rate=0, refresh=True)
+    assert (summary["skipped"], summary["fetched"]) == (0, 2)
+
+
+def test_concurrency_is_bounded_by_workers(server, tmp_path):
+    server.delay = 0.05
+    summary = fetch_files(entries(8), str(tmp_path), base_url=server.url, workers=3, rate=0)
+    assert summary["fetched"] == 8
+    assert server.peak == 3
+
+
+def test_unsafe_paths_and_write_errors_fail_alone(server, tmp_path):
+    dest = tmp_path / "dest"
+    # A file where a directory should be: os.makedirs raises an OSError for that entry only
+    (dest / "blocked").parent.mkdir(parents=True)
+    (dest / "blocked").write_text("")
+    summary = fetch_files(entries(2) + ["../../escape.nc", "blocked/R1_001.nc", f"{server.url}"],
+                          str(dest), base_url=server.url, rate=0)
+    assert (summary["requested"], summary["fetched"], summary["failed"]) == (5, 2, 3)
+    assert not (tmp_path / "escape.nc").exists()
+    assert set(summary["errors"]) == {"../../escape.nc", f"{server.url}blocked/R1_001.nc", server.url}
@@ -0,0 +1,41 @@
+# tests/test_climatology.py
+"""Anomalies of regions that wrap past 180°E on a -180..180 grid."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from climatology import anomaly, compute_climatology  # noqa: E402
+from data_handler import filter_data  # noqa: E402
+
+
+@pytest.fixture
+def ds():
+    rng = np.random.default_rng(0)
+    lat, lon = np.arange(-60, 61, 4.0), np.arange(-180, 180, 4.0)
+    times = pd.date_range("2022-01-01", periods=30, freq="7D")
+    values = 20 + rng.normal(0, 1, (len(times), len(lat), len(lon)))
+    return xr.Dataset({"temperature": (("time", "latitude", "longitude"), values.astype("float32"))},
+                      coords={"time": times, "latitude": lat, "longitude": lon})
+
+
+@pytest.mark.parametrize("region", ["pacific ocean", "atlantic ocean", "bay of bengal"])
+def test_anomaly_on_wrapped_region(ds, region):
+    climatology = compute_climatology(ds["temperature"]).to_dataset()
+    data = filter_data(ds, "temperature", region)
+    result = anomaly(data, climatology)
+    assert result.shape == data.shape
+    np.testing.assert_array_equal(result["longitude"].values, data["longitude"].values)
+
+    # Each wrapped label is compared with the climatology of the same place
+    label = float(data["longitude"].values[-1])
+    source = (label + 180) % 360 - 180
+    day = int(data["time"].dt.dayofyear.values[0])
+    expected = (data.isel(time=0, longitude=-1).values
+                - climatology["temperature"].sel(dayofyear=day, longitude=source, latitude=data["latitude"]).values)
+    np.testing.assert_allclose(result.isel(time=0, longitude=-1).values, expected, rtol=1e-6)
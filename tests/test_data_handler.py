@@ -0,0 +1,79 @@
+# tests/test_data_handler.py
+"""The startup grid of the profile store is bounded by a time window and a cell budget."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_handler  # noqa: E402
+import query_handler  # noqa: E402
+from argo_profiles import PROFILE_COLUMNS  # noqa: E402
+from data_handler import load_window, trim_to_grid_budget  # noqa: E402
+from profile_store import query_profile_store, write_partitioned  # noqa: E402
+from vertical import DEPTH_LEVELS  # noqa: E402
+
+
+def measurements(days, lat=15.5, lon=88.5):
+    """One shallow profile a day, starting 2023-01-01"""
+    times = pd.Timestamp("2023-01-01") + pd.to_timedelta(np.arange(days), "D")
+    rows = [{"platform_number": 1, "cycle_number": i, "level": level, "time": t, "latitude": lat + i % 3,
+             "longitude": lon + i % 5, "pressure": p, "temperature": 28 - p / 50, "salinity": 35.0}
+            for i, t in enumerate(times) for level, p in enumerate((5.0, 100.0, 500.0))]
+    return pd.DataFrame(rows).astype(PROFILE_COLUMNS)
+
+
+@pytest.fixture
+def store(tmp_path):
+    write_partitioned(str(tmp_path), measurements(365).assign(source_id=np.int32(0)))
+    return str(tmp_path)
+
+
+def test_load_window_counts_back_from_the_latest_measurement(store):
+    start, end = load_window(store, days=30)
+    assert end == pd.Timestamp("2023-12-31")
+    assert start == pd.Timestamp("2023-12-02")
+    assert load_window(store, days=0) is None
+
+
+def test_trim_keeps_the_latest_days_within_budget():
+    table = measurements(100)
+    # 3 × 5 cells of extent on every standard level
+    plane = 3 * 5 * len(DEPTH_LEVELS)
+    trimmed = trim_to_grid_budget(table, max_cells=10 * plane)
+    days = trimmed["time"].dt.floor("D").unique()
+    assert len(days) == 10 and days.max() == table["time"].max()
+    assert trim_to_grid_budget(table, max_cells=1000 * plane) is table
+
+
+def test_load_ocean_data_grids_only_the_window(store, monkeypatch):
+    monkeypatch.setattr(data_handler, "PROFILE_STORE_DIR", store)
+    monkeypatch.setattr(data_handler, "has_profile_store", lambda: True)
+    monkeypatch.setattr(data_handler, "profile_store_version", lambda: 1)
+    monkeypatch.setattr(data_handler, "load_window", lambda: load_window(store, days=30))
+    monkeypatch.setattr(data_handler, "load_profile_store",
+                        lambda store_dir=store, **query: query_profile_store(store_dir, **query))
+
+    ds = data_handler.load_ocean_data()
+    assert ds.sizes["time"] == 30
+    assert ds.attrs["window_start"] == "2023-12-02 00:00:00"
+
+
+def test_query_before_the_window_is_gridded_on_demand(monkeypatch):
+    table = measurements(40)
+    ds = data_handler.profiles_to_dataset(table[table["time"] >= "2023-01-21"])
+    ds.attrs["window_start"] = "2023-01-21"
+    earlier = data_handler.profiles_to_dataset(table)
+    calls = []
+    monkeypatch.setattr(query_handler, "load_gridded_region",
+                        lambda region, resolution, time_range: calls.append(resolution) or earlier)
+
+    window = (pd.Timestamp("2023-01-01"), pd.Timestamp("2023-01-10"))
+    _, _, stats = query_handler.run_query(ds, "temperature", "bay of bengal", "line", window)
+    assert calls == [1.0] and stats is not None
+    query_handler.run_query(ds, "temperature", "bay of bengal", "line", (pd.Timestamp("2023-01-25"),
+                                                                         pd.Timestamp("2023-02-05")))
+    assert calls == [1.0]
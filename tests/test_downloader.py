@@ -0,0 +1,133 @@
+# tests/test_downloader.py
+"""downloader.download_file against a local stand-in HTTP server.
+
+The server serves one body with an ETag and honours Range and If-Range
+like a real file server; tests can truncate, replace or force a 416.
+"""
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downloader import DownloadError, download_file  # noqa: E402
+
+BODY = b"CDF\x01" + bytes(range(256)) * 64
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body, etag = server.body, f'"{hashlib.md5(server.body).hexdigest()}"'
+        ranged = self.headers.get("Range")
+        if ranged and self.headers.get("If-Range") not in (None, etag):
+            ranged = None  # validator doesn't match: send the whole (new) file
+        if ranged:
+            start = int(ranged.split("=")[1].split("-")[0])
+            if start >= len(body) or server.force_416:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            body = body[start:]
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.body, httpd.requests, httpd.force_416 = BODY, [], False
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/R0000001_001.nc"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def interrupted(server, dest, keep):
+    """Download, then cut the .part file back to its first `keep` bytes as a dropped connection would"""
+    download_file(server.url, dest)
+    os.replace(dest, f"{dest}.part")
+    with open(f"{dest}.part", "r+b") as f:
+        f.truncate(keep)
+    with open(f"{dest}.part.validator", "w") as f:
+        f.write(f'"{hashlib.md5(server.body).hexdigest()}"')
+    server.requests.clear()
+
+
+def test_fresh_download(server, tmp_path):
+    dest = str(tmp_path / "profile.nc")
+    result = download_file(server.url, dest, checksum=hashlib.sha256(BODY).hexdigest())
+    assert result["resumed_from"] == 0 and result["bytes"] == len(BODY)
+    assert open(dest, "rb").read() == BODY
+    assert not os.path.exists(f"{dest}.part") and not os.path.exists(f"{dest}.part.validator")
+
+
+def test_resume_after_truncation(server, tmp_path):
+    dest = str(tmp_path / "profile.nc")
+    interrupted(server, dest, 1000)
+    result = download_file(server.url, dest, checksum=hashlib.sha256(BODY).hexdigest())
+    request = server.requests[0]
+    assert request["Range"] == "bytes=1000-" and request["If-Range"].startswith('"')
+    assert result["resumed_from"] == 1000 and result["received"] == len(BODY) - 1000
+    assert open(dest, "rb").read() == BODY
+
+
+def test_changed_remote_restarts_from_zero(server, tmp_path):
+    dest = str(tmp_path / "profile.nc")
+    interrupted(server, dest, 1000)
+    server.body = b"CDF\x02" + b"new" * 3000
+    result = download_file(server.url, dest)
+    assert result["resumed_from"] == 0
+    assert open(dest, "rb").read() == server.body
+
+
+def test_part_without_validator_restarts(server, tmp_path):
+    dest = str(tmp_path / "profile.nc")
+    interrupted(server, dest, 1000)
+    os.remove(f"{dest}.part.validator")
+    download_file(server.url, dest)
+    assert "Range" not in server.requests[0]
+    assert open(dest, "rb").read() == BODY
+
+
+def test_416_with_complete_part(server, tmp_path):
+    dest = str(tmp_path / "profile.nc")
+    interrupted(server, dest, len(BODY))
+    result = download_file(server.url, dest)
+    assert [r["Range"] for r in server.requests] == [f"bytes={len(BODY)}-"]
+    assert result["received"] == 0 and open(dest, "rb").read() == BODY
+
+
+def test_416_with_mismatched_part_restarts(server, tmp_path):
+    dest = str(tmp_path / "profile.nc")
+    interrupted(server, dest, 1000)
+    server.force_416 = True
+    result = download_file(server.url, dest)
+    assert len(server.requests) == 2 and "Range" not in server.requests[1]
+    assert result["resumed_from"] == 0 and open(dest, "rb").read() == BODY
+
+
+def test_checksum_mismatch(server, tmp_path):
+    dest = str(tmp_path / "profile.nc")
+    with pytest.raises(DownloadError) as error:
+        download_file(server.url, dest, checksum="sha256:" + "0" * 64)
+    assert not error.value.retryable
+    assert not os.path.exists(dest) and not os.path.exists(f"{dest}.part")
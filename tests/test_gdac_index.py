@@ -0,0 +1,81 @@
+# tests/test_gdac_index.py
+"""Selecting profile files from a small synthetic GDAC index."""
+import gzip
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gdac_index import file_list, load_index, parse_index, select_profiles  # noqa: E402
+
+INDEX = """\
+# Title : Profile directory file of the Argo Global Data Assembly Center
+# Description : The directory file describes all individual profile files of the argo GDAC ftp site.
+# Project : ARGO
+# Format version : 2.0
+# Date of update : 20240101000000
+# FTP root number 1 : ftp://ftp.ifremer.fr/ifremer/argo/dac
+# GDAC node : CORIOLIS
+file,date,latitude,longitude,ocean,profiler_type,institution,date_update
+incois/2902115/profiles/R2902115_001.nc,20231201060000,15.2,88.1,I,846,IN,20231202000000
+incois/2902115/profiles/R2902115_002.nc,20231231235959,14.8,89.4,I,846,IN,20240101000000
+incois/2902115/profiles/R2902115_003.nc,20240101000000,15.0,88.0,I,846,IN,20240102000000
+aoml/5906241/profiles/R5906241_010.nc,20231215120000,10.0,-170.0,P,851,AO,20231216000000
+aoml/5906241/profiles/R5906241_011.nc,20231215120000,10.0,175.0,P,851,AO,20231216000000
+aoml/5906242/profiles/R5906242_001.nc,20231210000000,10.0,-110.0,P,851,AO,20231211000000
+coriolis/6901234/profiles/R6901234_001.nc,20231220000000,40.0,-30.0,A,844,IF,20231221000000
+coriolis/6901234/profiles/R6901234_002.nc,,40.5,-30.5,A,844,IF,20231221000000
+coriolis/6901234/profiles/R6901234_003.nc,20231222000000,,,A,844,IF,20231223000000
+"""
+
+
+@pytest.fixture(params=[".txt", ".txt.gz"])
+def index(tmp_path, request):
+    path = str(tmp_path / f"ar_index_global_prof{request.param}")
+    with (gzip.open if path.endswith(".gz") else open)(path, "wt") as f:
+        f.write(INDEX)
+    return load_index(path)
+
+
+def names(selection):
+    return [path.rsplit("/", 1)[1][1:-3] for path in file_list(selection)]
+
+
+def test_parse(index):
+    assert index.num_rows == 9
+    assert index["ocean"].type.value_type == "string" and str(index["ocean"].type).startswith("dictionary")
+    assert index["date"].null_count == 1 and index["latitude"].null_count == 1
+
+
+def test_region_box(index):
+    assert names(select_profiles(index, ["bay of bengal"])) == ["2902115_001", "2902115_002", "2902115_003"]
+    # The Pacific box (120..240°E) crosses the antimeridian: -170 and 175 are in, -110 is not
+    assert names(select_profiles(index, ["pacific ocean"])) == ["5906241_010", "5906241_011"]
+    assert names(select_profiles(index, ["nowhere"])) == []
+
+
+def test_date_only_end_covers_the_whole_day(index):
+    selection = select_profiles(index, ["bay of bengal"], ("2023-12-01", "2023-12-31"))
+    assert names(selection) == ["2902115_001", "2902115_002"]
+    selection = select_profiles(index, ["bay of bengal"], ("2023-12-01", "2023-12-31 12:00"))
+    assert names(selection) == ["2902115_001"]
+
+
+def test_ocean_codes(index):
+    assert names(select_profiles(index, oceans=["a"])) == ["6901234_001", "6901234_002", "6901234_003"]
+    assert len(names(select_profiles(index, oceans=["I", "P"]))) == 6
+
+
+def test_blank_dates_and_positions_never_match(index):
+    everything = select_profiles(index, ["atlantic ocean"], ("2000-01-01", "2100-01-01"))
+    assert names(everything) == ["6901234_001"]
+    assert names(select_profiles(index, ["atlantic ocean"])) == ["6901234_001", "6901234_002"]
+    assert "6901234_003" in names(select_profiles(index, time_range=("2023-12-22", "2023-12-22")))
+
+
+def test_empty_index(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_text(INDEX.split("incois")[0])
+    assert select_profiles(parse_index(str(path)), ["bay of bengal"]).num_rows == 0
@@ -0,0 +1,91 @@
+# tests/test_hot_reload.py
+"""Reloads of a data-derived grid keep the caches of what an ingest didn't touch."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from argo_profiles import PROFILE_COLUMNS, profiles_to_dataset  # noqa: E402
+import climatology  # noqa: E402
+from climatology import get_climatology, retain_climatology  # noqa: E402
+from hot_reload import DatasetHolder, carry_over, diff_datasets  # noqa: E402
+
+
+def profiles(platform, lat, lon, day, n_prof=3):
+    """Rows of n_prof profiles of one float, ten days apart"""
+    pressure = np.linspace(5, 1000, 20)
+    rows = [{"platform_number": platform, "cycle_number": cycle, "level": level,
+             "time": pd.Timestamp(day) + pd.Timedelta(days=10 * cycle), "latitude": lat, "longitude": lon,
+             "pressure": p, "temperature": 28 - p / 50 + platform % 7, "salinity": 35.0}
+            for cycle in range(n_prof) for level, p in enumerate(pressure)]
+    return pd.DataFrame(rows).astype(PROFILE_COLUMNS)
+
+
+def grid(*tables, version):
+    ds = profiles_to_dataset(pd.concat(tables, ignore_index=True))
+    ds.attrs["version"] = version
+    return ds
+
+
+def test_new_ingest_outside_the_old_extent_only_changes_its_region():
+    bengal = profiles(1, 15.5, 88.5, "2023-01-01")
+    arabian = profiles(2, 12.5, 64.5, "2023-01-01")
+    # The new float widens both axes and adds days
+    mediterranean = profiles(3, 35.5, 15.5, "2023-03-01")
+    old = grid(bengal, arabian, version="argo_store-1")
+    new = grid(bengal, arabian, mediterranean, version="argo_store-2")
+    assert old.sizes["latitude"] != new.sizes["latitude"] and old.sizes["time"] != new.sizes["time"]
+
+    changes = diff_datasets(old, new)
+    assert not changes["full"]
+    assert changes["variables"] == {"temperature", "salinity"}
+    assert "mediterranean sea" in changes["regions"]
+    assert not {"bay of bengal", "arabian sea", "indian ocean", "pacific ocean"} & changes["regions"]
+
+
+def test_unchanged_variable_keeps_its_climatology_on_the_wider_grid(tmp_path, monkeypatch):
+    monkeypatch.setattr(climatology, "CLIMATOLOGY_DIR", str(tmp_path))
+    old_rows = profiles(1, 15.5, 88.5, "2023-01-01")
+    # Same temperatures, but salinity only where the new float is
+    added = profiles(3, -40.5, 150.5, "2023-01-01").assign(temperature=np.float32("nan"))
+    old, new = grid(old_rows, version="argo_store-1"), grid(old_rows, added, version="argo_store-2")
+
+    changes = diff_datasets(old, new)
+    assert not changes["full"] and changes["variables"] == {"salinity"}
+    get_climatology(old)
+    assert retain_climatology(old, new, changes["variables"]) == ["temperature"]
+    normals = get_climatology(new)
+    assert normals["temperature"].sizes["latitude"] == new.sizes["latitude"]
+    assert normals["salinity"].sizes["longitude"] == new.sizes["longitude"]
+
+
+def test_different_lattice_is_a_full_change():
+    rows = pd.concat([profiles(1, 15.5, 88.5, "2023-01-01"), profiles(2, 12.5, 84.5, "2023-01-01")])
+    old = grid(rows, version="argo_store-1")
+    new = profiles_to_dataset(rows, resolution=0.5)
+    assert diff_datasets(old, new)["full"]
+    assert carry_over(old, new, diff_datasets(old, new)) == []
+
+
+def test_reload_closes_the_old_dataset(tmp_path):
+    versions = iter(range(10))
+
+    def loader():
+        version = next(versions)
+        path = tmp_path / f"data-{version}.nc"
+        xr.Dataset({"temperature": (("latitude", "longitude"), np.full((2, 2), float(version)))},
+                   coords={"latitude": [0.5, 1.5], "longitude": [0.5, 1.5]}).to_netcdf(path)
+        ds = xr.open_dataset(path)
+        ds.attrs["version"] = f"file-{version}"
+        return ds
+
+    holder = DatasetHolder(loader, [str(tmp_path / "data-0.nc")])
+    first = holder.current
+    closed = []
+    first.set_close(lambda: closed.append(True))
+    assert holder.reload() is not None
+    assert closed == [True]
@@ -0,0 +1,57 @@
+# tests/test_query_handler.py
+"""Parsing of chat queries into intents, thresholds, depths and time ranges."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_handler import parse_depth, parse_hotspots, parse_time_range, parse_user_input  # noqa: E402
+
+
+@pytest.mark.parametrize("text, spec", [
+    ("where is temperature above 29 °C in the bay of bengal", {"above": 29.0}),
+    ("salinity below 34.5 in arabian sea", {"below": 34.5}),
+    ("temperature above 28 and below 30 in indian ocean", {"above": 28.0, "below": 30.0}),
+    ("cells warmer than 28 in pacific ocean", {"above": 28.0}),
+    ("5 saltiest spots in arabian sea", {"top": 5}),
+    ("temperature trend over 10 days in pacific ocean", None),
+    ("salinity over 2021 in arabian sea", None),
+    ("temperature above 500 m in pacific ocean", None),
+    ("floats with more than 10 profiles", None),
+    ("0 hottest spots", None),
+])
+def test_parse_hotspots(text, spec):
+    assert parse_hotspots(text) == spec
+
+
+def test_trend_over_days_keeps_intent_and_time_range():
+    text = "temperature trend over 10 days in pacific ocean"
+    assert parse_user_input(text) == ("show_data", "temperature", "pacific ocean", "line")
+    start, end = parse_time_range(text, anchor="2024-06-30")
+    assert (start, end.normalize()) == (pd.Timestamp("2024-06-21"), pd.Timestamp("2024-06-30"))
+
+
+@pytest.mark.parametrize("text, chart_type", [
+    ("surface temperature in atlantic ocean", "map"),
+    ("sea surface temperature map of pacific ocean", "map"),
+    ("salinity at the surface in arabian sea", "map"),
+    ("surface temperature trend in indian ocean", "line"),
+    ("surface plot of temperature in pacific ocean", "3d"),
+    ("3d view of salinity in bay of bengal", "3d"),
+])
+def test_surface_is_a_depth_unless_it_is_a_plot(text, chart_type):
+    assert parse_user_input(text)[3] == chart_type
+    assert parse_depth(text) is None
+
+
+@pytest.mark.parametrize("text, depth", [
+    ("temperature in the upper 500 m of the atlantic ocean", (0.0, 500.0)),
+    ("top 200 m salinity in arabian sea", (0.0, 200.0)),
+    ("0-200 m average temperature in bay of bengal", (0.0, 200.0)),
+    ("temperature at 500 m in pacific ocean", 500.0),
+])
+def test_parse_depth(text, depth):
+    assert parse_depth(text) == depth
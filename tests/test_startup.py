@@ -0,0 +1,25 @@
+# tests/test_startup.py
+"""The app's cold-start budget (see benchmarks/bench_startup.py), enforced under pytest."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_startup import BUDGETS, DEFERRED_MODULES, sample  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def cold_start():
+    # One fresh process; no JSON API port clashes with a running app
+    return sample(dict(os.environ, FLOATCHAT_API_PORT="0"))
+
+
+def test_heavy_stacks_load_after_first_paint(cold_start):
+    assert cold_start["loaded_before_paint"] == [], f"{DEFERRED_MODULES} must be imported on first use"
+
+
+@pytest.mark.parametrize("metric", sorted(BUDGETS))
+def test_within_budget(cold_start, metric):
+    assert cold_start[metric] <= BUDGETS[metric], f"{metric} {cold_start[metric]:.2f}s > {BUDGETS[metric]}s"
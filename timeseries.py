@@ -0,0 +1,114 @@
+# timeseries.py
+"""Area-weighted regional time series.
+
+On a regular lat/lon grid a cell's area scales with cos(latitude), so a plain
+mean over latitude and longitude lets high-latitude cells count for far more
+ocean than they cover. Series here weight each cell by cos(latitude), in one
+vectorized reduction over the whole (time, latitude, longitude) block.
+
+The full-length series of a (dataset version, variable, region, depth) is
+cached, so a trend query for any time window just slices it. Rolling means
+use cumulative sums, one pass whatever the window.
+"""
+import numpy as np
+import pandas as pd
+
+from data_handler import filter_data, time_slice
+from regions import REGION_BOUNDS, get_region_bounds
+
+# Full-length series keyed by (dataset version, parameter, region, depth)
+_series_cache = {}
+SERIES_CACHE_SIZE = 64
+
+
+def latitude_weights(latitude):
+    """cos(latitude) area weights, zero at the poles"""
+    return np.clip(np.cos(np.deg2rad(np.asarray(latitude, dtype="float64"))), 0.0, None)
+
+
+def weighted_series(data):
+    """Area-weighted mean over latitude and longitude at each time step, as a pd.Series.
+
+    NaN cells are left out of both the sum and the weights, so a step's mean
+    covers only the cells with data; steps with none are NaN. Data without
+    latitude/longitude falls back to a plain mean over its other dimensions.
+    """
+    if "time" in data.dims:
+        times = pd.DatetimeIndex(data["time"].values)
+    else:
+        times = pd.DatetimeIndex([pd.Timestamp("2024-01-01")])
+    if not {"latitude", "longitude"} <= set(data.dims):
+        other = [d for d in data.dims if d != "time"]
+        return pd.Series(np.atleast_1d(data.mean(dim=other).values).astype("float64"), index=times)
+
+    other = [d for d in data.dims if d not in ("time", "latitude", "longitude")]
+    order = (["time"] if "time" in data.dims else []) + other + ["latitude", "longitude"]
+    values = data.transpose(*order).values
+    values = values.reshape(len(times), -1, data.sizes["latitude"], data.sizes["longitude"])
+    valid = ~np.isnan(values)
+    weights = latitude_weights(data["latitude"].values)
+    # Sum each row, then weight the rows: (time, level, lat) @ (lat,)
+    total = np.where(valid, values, 0.0).sum(axis=-1, dtype="float64").sum(axis=1) @ weights
+    area = valid.sum(axis=-1).sum(axis=1) @ weights
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(area > 0, total / area, np.nan)
+    return pd.Series(means, index=times)
+
+
+def _depth_key(depth):
+    return tuple(float(d) for d in depth) if isinstance(depth, (tuple, list)) else depth
+
+
+def regional_series(ds, parameter, region, time_range=None, depth=None):
+    """Area-weighted series of a region, cached per dataset version and sliced to time_range.
+
+    Returns None if the region has no data.
+    """
+    version = ds.attrs.get("version")
+    key = (version, parameter, region, _depth_key(depth))
+    series = _series_cache.get(key) if version else None
+    if series is None:
+        data = filter_data(ds, parameter, region, None, depth)
+        if data is None or data.size == 0:
+            return None
+        series = weighted_series(data)
+        if version:
+            if len(_series_cache) >= SERIES_CACHE_SIZE:
+                _series_cache.pop(next(iter(_series_cache)))
+            _series_cache[key] = series
+    if time_range is not None:
+        series = series.iloc[time_slice(series.index.values, time_range)]
+    return series
+
+
+def retain_series(old_ds, new_ds, changed_variables, changed_regions):
+    """Re-key cached series to a reloaded dataset, except changed variables and regions.
+
+    Returns the number carried over.
+    """
+    old_version, new_version = old_ds.attrs.get("version"), new_ds.attrs.get("version")
+    changed = [REGION_BOUNDS[name] for name in changed_regions]
+    carried = 0
+    for key in [k for k in _series_cache if k[0] == old_version]:
+        series = _series_cache.pop(key)
+        if new_version and key[1] not in changed_variables and get_region_bounds(key[2]) not in changed:
+            _series_cache[(new_version,) + key[1:]] = series
+            carried += 1
+    return carried
+
+
+def rolling_mean(series, window):
+    """Trailing mean over window steps from cumulative sums, skipping NaN.
+
+    The first window - 1 steps, and windows with no data, are NaN.
+    """
+    values = series.to_numpy(dtype="float64")
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    window_sums = sums[window:] - sums[:-window]
+    window_counts = counts[window:] - counts[:-window]
+    means = np.full(len(values), np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means[window - 1:] = np.where(window_counts > 0, window_sums / window_counts, np.nan)
+    return pd.Series(means, index=series.index)
@@ -0,0 +1,118 @@
+# vertical.py
+"""Vectorized vertical slicing and interpolation.
+
+Profiles are rows of (pressure, value) pairs; every function here works on
+whole 2-D arrays of profiles at once, so no per-profile Python loops are
+needed. Pressure in dbar is used as depth in metres (they differ by under 1%
+in the upper 2000 m).
+"""
+import numpy as np
+import xarray as xr
+
+# Standard depth levels (m) of the gridded data model
+DEPTH_LEVELS = np.array([0, 10, 20, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000], dtype="float64")
+
+# A profile's shallowest sample stands in for the levels above it if it is this close (m)
+SURFACE_TOLERANCE = 10.0
+
+# Row offset for the single flattened searchsorted; must exceed any pressure
+_ROW_STRIDE = 1.0e5
+
+
+def interpolate_profiles(pressure, values, levels, surface_tolerance=SURFACE_TOLERANCE):
+    """Linearly interpolate every profile onto the given levels in one pass.
+
+    pressure and values are (n_profiles, n_samples) arrays with NaN for
+    missing samples, in any order along each row. Returns an
+    (n_profiles, n_levels) array, NaN where a level is outside a profile's
+    sampled range.
+    """
+    pressure = np.asarray(pressure, dtype="float64")
+    values = np.asarray(values, dtype="float64")
+    levels = np.asarray(levels, dtype="float64")
+    n_prof, n_samples = pressure.shape
+    if n_prof == 0 or n_samples == 0:
+        return np.full((n_prof, len(levels)), np.nan)
+
+    # Sort each row by pressure with invalid samples pushed to the end
+    valid = ~(np.isnan(pressure) | np.isnan(values))
+    keyed = np.where(valid, np.maximum(pressure, 0.0), np.inf)
+    order = np.argsort(keyed, axis=1, kind="stable")
+    p = np.take_along_axis(keyed, order, axis=1)
+    v = np.take_along_axis(values, order, axis=1)
+    n_valid = valid.sum(axis=1)
+
+    # One searchsorted over all rows: offset each row into its own band
+    rows = np.arange(n_prof)[:, None]
+    banded = np.where(np.isfinite(p), p, _ROW_STRIDE - 1.0) + rows * _ROW_STRIDE
+    targets = levels[None, :] + rows * _ROW_STRIDE
+    upper = np.searchsorted(banded.ravel(), targets.ravel(), side="left").reshape(n_prof, -1)
+    upper -= rows * n_samples
+
+    lower = np.clip(upper - 1, 0, n_samples - 1)
+    upper_c = np.clip(upper, 0, n_samples - 1)
+    p0, p1 = np.take_along_axis(p, lower, axis=1), np.take_along_axis(p, upper_c, axis=1)
+    v0, v1 = np.take_along_axis(v, lower, axis=1), np.take_along_axis(v, upper_c, axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(p1 > p0, (levels[None, :] - p0) / (p1 - p0), 0.0)
+    result = v0 + weight * (v1 - v0)
+
+    inside = (upper >= 1) & (upper < n_valid[:, None])
+    # Levels at or just above the shallowest sample take its value
+    shallow = (upper == 0) & (n_valid[:, None] > 0) & (p[:, :1] - levels[None, :] <= surface_tolerance)
+    result = np.where(shallow, v[:, :1], result)
+    return np.where(inside | shallow, result, np.nan)
+
+
+def _level_weights(depths, target):
+    """Bracketing indexes and linear weight for one target depth on a sorted axis"""
+    upper = int(np.clip(np.searchsorted(depths, target, side="left"), 1, len(depths) - 1))
+    lower = upper - 1
+    weight = (target - depths[lower]) / (depths[upper] - depths[lower])
+    return lower, upper, weight
+
+
+def select_depth(data, depth=None):
+    """Reduce a DataArray's depth dimension to a level or a layer average.
+
+    depth is None (surface), a number of metres (linear interpolation between
+    the bracketing levels), or a (top, bottom) tuple for a thickness-weighted
+    layer mean. Arrays without a depth dimension are returned unchanged.
+    """
+    if "depth" not in data.dims:
+        return data
+    depths = data["depth"].values.astype("float64")
+    if depth is None:
+        return data.isel(depth=0, drop=True)
+
+    if np.isscalar(depth):
+        if depth < depths[0] or depth > depths[-1]:
+            return data.isel(depth=0, drop=True) * np.nan
+        exact = np.flatnonzero(depths == depth)
+        if len(exact):
+            return data.isel(depth=int(exact[0]), drop=True)
+        lower, upper, weight = _level_weights(depths, float(depth))
+        below = data.isel(depth=lower, drop=True)
+        above = data.isel(depth=upper, drop=True)
+        return below + weight * (above - below)
+
+    top, bottom = (float(d) for d in depth)
+    top, bottom = max(min(top, bottom), depths[0]), min(max(top, bottom), depths[-1])
+    if bottom <= top:
+        return select_depth(data, top)
+
+    # Sample at the layer edges plus every level inside, then integrate with the trapezoid rule
+    samples = np.concatenate([[top], depths[(depths > top) & (depths < bottom)], [bottom]])
+    stacked = xr.concat([select_depth(data, d) for d in samples], dim="depth")
+    stacked = stacked.assign_coords(depth=samples)
+    return stacked.integrate("depth") / (bottom - top)
+
+
+def describe_depth(depth):
+    """Human-readable label for a depth selection"""
+    if depth is None:
+        return "surface"
+    if np.isscalar(depth):
+        return "surface" if depth == 0 else f"{depth:g} m"
+    return f"{depth[0]:g}–{depth[1]:g} m average"